@@ -0,0 +1,4 @@
+"""Entry point for `python -m backend`; see backend/cli.py."""
+from backend.cli import main
+
+main()
@@ -0,0 +1,221 @@
+"""
+Price alerts: "tell me when item X is listed at or below Y per unit".
+
+Rules live in price_alerts. evaluate_alerts() runs inside every ingest and
+checks all active rules in one statement, joining them against the new
+snapshot's cheapest non-outlier unit price per item. A rule fires when its
+item crosses to at or below the threshold, not again while it stays there,
+and is re-armed once the price rises above it or the item is no longer listed.
+Firings are stored in alert_events. They are served by GET /api/alerts/events
+and, with ALERT_WEBHOOK_URL set, POSTed there in batches by the ingest's
+caller once it has committed and released its locks. Failed deliveries are
+retried after the next ingest or with `python -m backend alerts --deliver`.
+cleanup_old_data() drops events older than the retention window.
+"""
+import os
+
+from psycopg2.extras import execute_values
+
+from backend import config
+from backend.db import connect
+
+config.load_env()
+# Receives {"alerts": [...]} for new alert events; unset stores them for the API only
+ALERT_WEBHOOK_URL = os.getenv("ALERT_WEBHOOK_URL", "")
+
+# Alert events per webhook request
+ALERT_WEBHOOK_BATCH = 500
+
+# Webhook deliveries are retried less than Blizzard calls; what fails stays pending
+ALERT_WEBHOOK_RETRIES = 2
+ALERT_WEBHOOK_TIMEOUT = (5, 15)
+
+ALERT_COLUMNS = ["id", "item_id", "max_unit_price", "label", "active", "triggered", "created_at", "last_triggered_at"]
+ALERT_EVENT_COLUMNS = ["id", "alert_id", "label", "item_id", "name", "unit_price", "max_unit_price",
+                       "snapshot_time", "delivered_at"]
+
+def evaluate_alerts(cur):
+    """
+    Evaluates every active rule against the staged snapshot in one statement and
+    records the rules that fired in alert_events. Runs in a savepoint so a
+    failure here never aborts the ingest. Returns the number of alerts fired.
+    """
+    try:
+        cur.execute("SAVEPOINT price_alerts")
+        cur.execute("""
+            WITH snapshot AS (
+                SELECT MAX(last_seen) AS snapshot_time FROM incoming_auctions
+            ),
+            prices AS (
+                SELECT item_id, COALESCE(MIN(unit_price) FILTER (WHERE NOT is_outlier), MIN(unit_price)) AS unit_price
+                FROM incoming_auctions
+                WHERE item_id IN (SELECT item_id FROM price_alerts WHERE active)
+                GROUP BY item_id
+            ),
+            evaluated AS (
+                SELECT r.id, p.unit_price, COALESCE(p.unit_price <= r.max_unit_price, FALSE) AS hit
+                FROM price_alerts r
+                LEFT JOIN prices p ON p.item_id = r.item_id
+                WHERE r.active
+            ),
+            changed AS (
+                UPDATE price_alerts r
+                SET triggered = e.hit,
+                    last_triggered_at = CASE WHEN e.hit THEN s.snapshot_time ELSE r.last_triggered_at END
+                FROM evaluated e
+                CROSS JOIN snapshot s
+                WHERE r.id = e.id AND r.triggered <> e.hit
+                RETURNING r.id, r.item_id, r.max_unit_price, e.unit_price, e.hit, s.snapshot_time
+            )
+            INSERT INTO alert_events (alert_id, item_id, snapshot_time, unit_price, max_unit_price)
+            SELECT id, item_id, snapshot_time, unit_price, max_unit_price
+            FROM changed
+            WHERE hit
+        """)
+        fired = cur.rowcount
+        cur.execute("RELEASE SAVEPOINT price_alerts")
+        print(f"Fired {fired} price alerts.")
+        return fired
+    except Exception as e:
+        cur.execute("ROLLBACK TO SAVEPOINT price_alerts")
+        print(f"Error evaluating price alerts: {e}")
+        return 0
+
+# ============================================================================
+# RULES
+# ============================================================================
+
+def create_alerts(rules, conn=None):
+    """Stores rules given as (item_id, max_unit_price, label) tuples. Returns their IDs in order."""
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
+    cur = conn.cursor()
+    try:
+        rows = execute_values(cur, """
+            INSERT INTO price_alerts (item_id, max_unit_price, label)
+            VALUES %s
+            RETURNING id
+        """, rules, page_size=1000, fetch=True)
+        conn.commit()
+        return [row[0] for row in rows]
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        if own_conn:
+            conn.close()
+
+def list_alerts(item_id=None, after_id=0, limit=1000, conn=None):
+    """Rules in ID order, resuming after after_id."""
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
+    cur = conn.cursor()
+    try:
+        cur.execute(f"""
+            SELECT {', '.join(ALERT_COLUMNS)}
+            FROM price_alerts
+            WHERE id > %s AND (%s IS NULL OR item_id = %s)
+            ORDER BY id
+            LIMIT %s
+        """, (after_id, item_id, item_id, limit))
+        return cur.fetchall()
+    finally:
+        cur.close()
+        if own_conn:
+            conn.close()
+
+def delete_alert(alert_id, conn=None):
+    """Deletes a rule and its events. Returns False if it did not exist."""
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
+    cur = conn.cursor()
+    try:
+        cur.execute("DELETE FROM price_alerts WHERE id = %s", (alert_id,))
+        conn.commit()
+        return cur.rowcount > 0
+    finally:
+        cur.close()
+        if own_conn:
+            conn.close()
+
+# ============================================================================
+# EVENTS AND DELIVERY
+# ============================================================================
+
+ALERT_EVENTS_SQL = """
+    SELECT e.id, e.alert_id, r.label, e.item_id, i.name, e.unit_price, e.max_unit_price,
+           e.snapshot_time, e.delivered_at
+    FROM alert_events e
+    JOIN price_alerts r ON r.id = e.alert_id
+    LEFT JOIN items i ON i.item_id = e.item_id
+    WHERE {where}
+    ORDER BY e.id
+    LIMIT %s
+"""
+
+def list_alert_events(after_id=0, limit=1000, pending_only=False, conn=None):
+    """Fired alerts in ID order, resuming after after_id."""
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
+    cur = conn.cursor()
+    try:
+        where = "e.id > %s" + (" AND e.delivered_at IS NULL" if pending_only else "")
+        cur.execute(ALERT_EVENTS_SQL.format(where=where), (after_id, limit))
+        return cur.fetchall()
+    finally:
+        cur.close()
+        if own_conn:
+            conn.close()
+
+def deliver_alert_events(conn=None):
+    """
+    POSTs pending alert events to ALERT_WEBHOOK_URL in batches and marks the
+    accepted ones delivered. Stops at the first failed batch; it stays pending.
+    Never raises, so it can run right after an ingest. Returns the number delivered.
+    """
+    if not ALERT_WEBHOOK_URL:
+        return 0
+    from backend.api_client import get_client
+
+    own_conn = conn is None
+    delivered = 0
+    try:
+        if own_conn:
+            conn = connect()
+        cur = conn.cursor()
+        try:
+            after_id = 0
+            while True:
+                rows = list_alert_events(after_id, ALERT_WEBHOOK_BATCH, pending_only=True, conn=conn)
+                if not rows:
+                    break
+                events = [dict(zip(ALERT_EVENT_COLUMNS[:-1], row[:-1])) for row in rows]
+                for event in events:
+                    event["snapshot_time"] = event["snapshot_time"].isoformat()
+                response = get_client().post(ALERT_WEBHOOK_URL, json={"alerts": events},
+                                             retries=ALERT_WEBHOOK_RETRIES, timeout=ALERT_WEBHOOK_TIMEOUT)
+                if not 200 <= response.status_code < 300:
+                    print(f"Alert webhook returned {response.status_code}, {len(rows)} alerts stay pending")
+                    break
+                cur.execute("UPDATE alert_events SET delivered_at = NOW() WHERE id = ANY(%s)",
+                            ([row[0] for row in rows],))
+                conn.commit()
+                delivered += len(rows)
+                after_id = rows[-1][0]
+        finally:
+            cur.close()
+    except Exception as e:
+        if conn is not None and not conn.closed:
+            conn.rollback()
+        print(f"Error delivering price alerts: {e}")
+    finally:
+        if own_conn and conn is not None:
+            conn.close()
+    if delivered:
+        print(f"Delivered {delivered} price alerts to the webhook.")
+    return delivered
@@ -1,15 +1,43 @@
-from fastapi import FastAPI, Query
+from fastapi import Body, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-import psycopg2
+from typing import List, Optional
+from pydantic import BaseModel, Field
+import numpy as np
+import asyncio
+import base64
+import csv
+import io
 import os
+import time
 
-from backend.config import DB_URI
-from backend.tier_detector import get_cached_item_tier_info
+import orjson
 
-app = FastAPI()
+from backend import alerts
+from backend.db import connect
+from backend.downsample import lttb
+from backend.events import SnapshotBroadcaster, SnapshotEvent
+from backend.metrics import CONTENT_TYPE, HTTP_DURATION, query_timer, render_metrics
+from backend.tier_detector import get_cached_item_tier_info, warm_tier_cache
+from backend.serialization import ROW_FORMATS, ndjson_lines, rows_response
+from backend.static_assets import get_asset_bundle
+
+@asynccontextmanager
+async def lifespan(app):
+    # Fingerprint and precompress static assets once, before serving requests
+    get_asset_bundle()
+    # Tier detection scans every item; start it now without holding up startup
+    warm_tier_cache()
+    # Push snapshot-completed events to /api/events streams
+    snapshot_broadcaster.start(asyncio.get_running_loop())
+    yield
+    snapshot_broadcaster.stop()
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # Mount static files
 app.mount("/static", StaticFiles(directory="web"), name="static")
@@ -22,36 +50,69 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+# Compress API responses; precompressed assets already carry Content-Encoding and pass through
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    # Streamed responses are timed until their headers are sent
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_DURATION.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        route=route.path if route else "unmatched",
+        status=response.status_code,
+    )
+    return response
+
 @app.get("/")
-async def read_root():
-    return FileResponse("web/index.html")
+async def read_root(request: Request):
+    return get_asset_bundle().pages["index.html"].response(request)
 
 @app.get("/item.html")
-async def read_item():
-    return FileResponse("web/item.html")
+async def read_item(request: Request):
+    return get_asset_bundle().pages["item.html"].response(request)
 
+@app.get("/assets/{name}")
+async def read_asset(name: str, request: Request):
+    """Content-hashed assets referenced by the HTML pages; cached forever by browsers."""
+    asset = get_asset_bundle().hashed.get(name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    return asset.response(request)
+
+# Unversioned URLs kept for old bookmarks and cached pages
 @app.get("/script.js")
-async def read_script():
-    return FileResponse("web/script.js")
+async def read_script(request: Request):
+    return get_asset_bundle().by_name["script.js"].response(request)
 
 @app.get("/style.css")
-async def read_style():
-    return FileResponse("web/style.css")
+async def read_style(request: Request):
+    return get_asset_bundle().by_name["style.css"].response(request)
 
 @app.get("/item.js")
-async def read_item_script():
-    return FileResponse("web/item.js")
+async def read_item_script(request: Request):
+    return get_asset_bundle().by_name["item.js"].response(request)
 
 @app.get("/api/health")
 def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics of this worker process."""
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
 @app.get("/api/items")
 def get_all_items():
-    conn = psycopg2.connect(DB_URI)
+    conn = connect()
     cur = conn.cursor()
-    cur.execute("SELECT item_id, name, icon_url FROM items ORDER BY name")
-    items = [{"item_id": r[0], "name": r[1], "icon_url": r[2]} for r in cur.fetchall()]
+    with query_timer("items"):
+        cur.execute("SELECT item_id, name, icon_url FROM items ORDER BY name")
+        rows = cur.fetchall()
+    items = [{"item_id": r[0], "name": r[1], "icon_url": r[2]} for r in rows]
     cur.close()
     conn.close()
     return items
@@ -60,247 +121,566 @@ def get_all_items():
 from fastapi import Query
 from datetime import datetime, timedelta
 
+# Per-item summary of the current snapshot. Outlier listings are ignored for the
+# lowest price unless an item has nothing else; robust statistics come from the
+# item_price_stats row computed for the current snapshot at ingest.
+AUCTION_SUMMARY_SQL = """
+    SELECT a.item_id, 
+           i.name, 
+           i.icon_url,
+           COALESCE(MIN(a.buyout) FILTER (WHERE NOT a.is_outlier), MIN(a.buyout)) as lowest_price,
+           COALESCE(MIN(a.unit_price) FILTER (WHERE NOT a.is_outlier), MIN(a.unit_price)) as lowest_unit_price,
+           SUM(a.quantity) as total_quantity,
+           COUNT(*) as auction_count,
+           ps.min_unit_price,
+           ps.p25_unit_price,
+           ps.median_unit_price,
+           ps.p75_unit_price,
+           ps.outlier_count
+    FROM auctions a
+    JOIN items i ON a.item_id = i.item_id
+    LEFT JOIN item_price_stats ps
+           ON ps.item_id = a.item_id
+          AND ps.snapshot_time = (SELECT MAX(last_seen) FROM auctions)
+    {where}
+    GROUP BY a.item_id, i.name, i.icon_url, ps.id
+"""
+
+AUCTION_SUMMARY_COLUMNS = [
+    "item_id", "name", "icon_url", "lowest_price", "lowest_unit_price", "total_quantity",
+    "auction_count", "min_unit_price", "p25_unit_price", "median_unit_price", "p75_unit_price",
+    "outlier_count", "tier", "total_tiers"
+]
+
 @app.get("/api/auctions")
 def get_auctions(
     query: str = Query(None, description="Search query for item names"),
-    item_id: int = Query(None, description="Specific item ID to get data for")
+    item_id: int = Query(None, description="Specific item ID to get data for"),
+    format: str = Query("json", pattern=f"^({'|'.join(ROW_FORMATS)})$", description="json (list of objects) or columnar (object of arrays)")
 ):
-    conn = psycopg2.connect(DB_URI)
+    conn = connect()
     cur = conn.cursor()
     
     if item_id:
         # Get data for specific item ID
-        cur.execute("""
-            SELECT a.item_id, 
-                   i.name, 
-                   i.icon_url,
-                   MIN(a.buyout) as lowest_price,
-                   SUM(a.quantity) as total_quantity,
-                   COUNT(*) as auction_count
-            FROM auctions a
-            JOIN items i ON a.item_id = i.item_id
-            WHERE a.item_id = %s
-            GROUP BY a.item_id, i.name, i.icon_url
-        """, (item_id,))
+        with query_timer("auctions_item"):
+            cur.execute(AUCTION_SUMMARY_SQL.format(where="WHERE a.item_id = %s"), (item_id,))
+            summaries = cur.fetchall()
     elif query:
         # Search by item name - group by item and aggregate
-        cur.execute("""
-            SELECT a.item_id, 
-                   i.name, 
-                   i.icon_url,
-                   MIN(a.buyout) as lowest_price,
-                   SUM(a.quantity) as total_quantity,
-                   COUNT(*) as auction_count
-            FROM auctions a
-            JOIN items i ON a.item_id = i.item_id
-            WHERE i.name ILIKE %s
-            GROUP BY a.item_id, i.name, i.icon_url
-            ORDER BY lowest_price ASC
-        """, (f"%{query}%",))
+        with query_timer("auctions_query"):
+            cur.execute(
+                AUCTION_SUMMARY_SQL.format(where="WHERE i.name ILIKE %s") + " ORDER BY lowest_unit_price ASC",
+                (f"%{query}%",)
+            )
+            summaries = cur.fetchall()
     else:
         # Get all auctions - group by item and aggregate
-        cur.execute("""
-            SELECT a.item_id, 
-                   i.name, 
-                   i.icon_url,
-                   MIN(a.buyout) as lowest_price,
-                   SUM(a.quantity) as total_quantity,
-                   COUNT(*) as auction_count
-            FROM auctions a
-            JOIN items i ON a.item_id = i.item_id
-            GROUP BY a.item_id, i.name, i.icon_url
-            ORDER BY lowest_price ASC
-        """)
+        with query_timer("auctions_all"):
+            cur.execute(AUCTION_SUMMARY_SQL.format(where="") + " ORDER BY lowest_unit_price ASC")
+            summaries = cur.fetchall()
     
-    results = []
-    for row in cur.fetchall():
-        item_id, name, icon_url, lowest_price, total_quantity, auction_count = row
-        
+    rows = []
+    for row in summaries:
         # Get tier information for this item
-        tier_info = get_cached_item_tier_info(item_id)
+        tier_info = get_cached_item_tier_info(row[0]) or {}
+        rows.append(row + (tier_info.get("tier"), tier_info.get("total_tiers")))
+    
+    cur.close()
+    conn.close()
+    return rows_response(rows, AUCTION_SUMMARY_COLUMNS, format)
+
+BATCH_MAX_ITEMS = 1000
+
+def get_batch_summaries(item_ids, hours):
+    """
+    Current summaries plus hourly lowest unit price sparklines for many items,
+    using one connection and two = ANY(%s) queries regardless of the item count.
+    """
+    conn = connect()
+    cur = conn.cursor()
+    
+    try:
+        with query_timer("batch_summaries"):
+            cur.execute(AUCTION_SUMMARY_SQL.format(where="WHERE a.item_id = ANY(%s)"), (item_ids,))
+            rows = cur.fetchall()
+        summaries = {}
+        for row in rows:
+            tier_info = get_cached_item_tier_info(row[0]) or {}
+            summary = dict(zip(AUCTION_SUMMARY_COLUMNS, row + (tier_info.get("tier"), tier_info.get("total_tiers"))))
+            summary["sparkline"] = {"hour": [], "min_unit_price": []}
+            summaries[row[0]] = summary
         
-        result = {
-            "item_id": item_id,
-            "name": name,
-            "icon_url": icon_url,
-            "lowest_price": lowest_price,
-            "total_quantity": total_quantity,
-            "auction_count": auction_count
-        }
+        with query_timer("batch_sparklines"):
+            cur.execute("""
+                SELECT item_id, DATE_TRUNC('hour', snapshot_time) as hour, MIN(unit_price) as min_unit_price
+                FROM auction_history
+                WHERE item_id = ANY(%s) AND snapshot_time > NOW() - INTERVAL '%s hours'
+                GROUP BY item_id, DATE_TRUNC('hour', snapshot_time)
+                ORDER BY item_id, hour
+            """, (list(summaries), hours))
+            rows = cur.fetchall()
         
-        # Add tier information if available
-        if tier_info:
-            result["tier"] = tier_info["tier"]
-            result["total_tiers"] = tier_info["total_tiers"]
+        for item_id, hour, min_unit_price in rows:
+            sparkline = summaries[item_id]["sparkline"]
+            sparkline["hour"].append(hour)
+            sparkline["min_unit_price"].append(min_unit_price)
         
-        results.append(result)
+        return {
+            "items": list(summaries.values()),
+            "missing_item_ids": [i for i in item_ids if i not in summaries]
+        }
+    finally:
+        cur.close()
+        conn.close()
+
+def parse_item_ids(item_ids):
+    ids = list(dict.fromkeys(item_ids))  # De-duplicate, keep order
+    if not ids:
+        raise HTTPException(status_code=400, detail="No item IDs given")
+    if len(ids) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_ITEMS} item IDs per request")
+    return ids
+
+@app.get("/api/auctions/batch")
+def get_auctions_batch(
+    item_ids: str = Query(..., description="Comma-separated item IDs, e.g. 2589,2592"),
+    hours: int = Query(24, description="Number of hours of sparkline history")
+):
+    """Current summaries and recent price sparklines for many items in one request."""
+    try:
+        ids = [int(i) for i in item_ids.split(",") if i.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="item_ids must be comma-separated integers")
+    return ORJSONResponse(get_batch_summaries(parse_item_ids(ids), hours))
+
+@app.post("/api/auctions/batch")
+def post_auctions_batch(
+    item_ids: List[int] = Body(..., embed=True, description="Item IDs to look up"),
+    hours: int = Body(24, embed=True, description="Number of hours of sparkline history")
+):
+    """Same as GET /api/auctions/batch, for ID lists too long for a query string."""
+    return ORJSONResponse(get_batch_summaries(parse_item_ids(item_ids), hours))
+
+# Seconds between SSE comments that keep idle streams open through proxies
+EVENTS_KEEPALIVE_SECONDS = 15
+
+def build_snapshot_event(conn, payload):
+    """
+    Summaries of the items whose listings changed in a snapshot, built once per
+    snapshot for every stream. Changed items no longer listed are reported as removed.
+    """
+    cur = conn.cursor()
+    try:
+        with query_timer("snapshot_event"):
+            cur.execute("""
+                SELECT c.item_id, EXISTS (SELECT 1 FROM auctions a WHERE a.item_id = c.item_id)
+                FROM (SELECT DISTINCT item_id FROM auction_events WHERE snapshot_time = %s) c
+            """, (payload["snapshot_time"],))
+            changed = cur.fetchall()
+            cur.execute(AUCTION_SUMMARY_SQL.format(where="WHERE a.item_id = ANY(%s)"),
+                        ([item_id for item_id, listed in changed if listed],))
+            rows = cur.fetchall()
+    finally:
+        cur.close()
+    items = {}
+    for row in rows:
+        tier_info = get_cached_item_tier_info(row[0]) or {}
+        items[row[0]] = orjson.dumps(dict(zip(AUCTION_SUMMARY_COLUMNS, row + (tier_info.get("tier"), tier_info.get("total_tiers")))))
+    return SnapshotEvent(payload, items, [item_id for item_id, listed in changed if not listed])
+
+snapshot_broadcaster = SnapshotBroadcaster(build_snapshot_event)
+
+@app.get("/api/events")
+async def snapshot_events(
+    request: Request,
+    item_ids: str = Query(None, description="Comma-separated item IDs to receive changes for (default: all changed items)")
+):
+    """
+    Server-sent events stream. After each ingest a `snapshot` event carries the
+    current summaries (as in /api/auctions) of the items that changed, and the
+    IDs of changed items that are no longer listed. A client reconnecting with
+    an older Last-Event-ID first receives the latest event.
+    """
+    ids = None
+    if item_ids:
+        try:
+            ids = set(parse_item_ids([int(i) for i in item_ids.split(",") if i.strip()]))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="item_ids must be comma-separated integers")
+
+    queue = snapshot_broadcaster.subscribe()
+    last_event = snapshot_broadcaster.last_event
+    missed = request.headers.get("Last-Event-ID")
+
+    async def stream():
+        try:
+            yield b"retry: 10000\n\n"
+            if missed and last_event is not None and missed != last_event.id:
+                yield last_event.render(ids)
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield event.render(ids)
+        finally:
+            snapshot_broadcaster.unsubscribe(queue)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# Keyset pagination over (snapshot_time, id), newest first. The time window and
+# optional item filter are applied first; cursor_filter resumes after the last row.
+HISTORY_SQL = """
+    SELECT ah.id, ah.item_id, ah.quantity, ah.buyout, ah.unit_price, ah.time_left, ah.snapshot_time,
+           i.name, i.icon_url, ah.listing_count, COALESCE(ah.total_quantity, ah.quantity),
+           COALESCE(ah.min_buyout, ah.buyout), COALESCE(ah.max_buyout, ah.buyout),
+           COALESCE(ah.max_unit_price, ah.unit_price)
+    FROM auction_history ah
+    JOIN items i ON ah.item_id = i.item_id
+    WHERE ah.snapshot_time > NOW() - INTERVAL '%s hours'
+      {item_filter}
+      {cursor_filter}
+    ORDER BY ah.snapshot_time DESC, ah.id DESC
+"""
+
+HISTORY_MAX_PAGE_SIZE = 10000
+HISTORY_STREAM_BATCH = 5000
+# quantity to time_left describe the item's cheapest listing in the snapshot
+HISTORY_COLUMNS = ["item_id", "name", "icon_url", "quantity", "buyout", "unit_price", "time_left", "listing_count",
+                   "total_quantity", "min_buyout", "max_buyout", "max_unit_price", "snapshot_time"]
+
+def encode_history_cursor(snapshot_time, row_id):
+    raw = f"{snapshot_time.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_history_cursor(cursor):
+    try:
+        snapshot_time, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(snapshot_time), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def history_row(row):
+    """Reorders a HISTORY_SQL row to HISTORY_COLUMNS, dropping the pagination id."""
+    (_, item_id, quantity, buyout, unit_price, time_left, snapshot_time, name, icon_url,
+     listing_count, total_quantity, min_buyout, max_buyout, max_unit_price) = row
+    return (item_id, name, icon_url, quantity, buyout, unit_price, time_left, listing_count,
+            total_quantity, min_buyout, max_buyout, max_unit_price, snapshot_time)
+
+def stream_history(sql, params, fmt):
+    """Yields history rows as NDJSON or CSV from a server-side cursor, one batch at a time."""
+    conn = connect()
+    cur = conn.cursor(name="auction_history_export")
+    cur.itersize = HISTORY_STREAM_BATCH
     
-    cur.close()
-    conn.close()
-    return results
+    try:
+        # Only the time to the first batch; the export itself is paced by the client
+        with query_timer("history_export"):
+            cur.execute(sql, params)
+        
+        if fmt == "csv":
+            yield ",".join(HISTORY_COLUMNS) + "\r\n"
+        
+        while True:
+            rows = cur.fetchmany(HISTORY_STREAM_BATCH)
+            if not rows:
+                break
+            
+            if fmt == "csv":
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(
+                    history_row(row)[:-1] + (row[6].isoformat(),) for row in rows
+                )
+                yield buffer.getvalue()
+            else:
+                yield ndjson_lines(dict(zip(HISTORY_COLUMNS, history_row(row))) for row in rows)
+    finally:
+        cur.close()
+        conn.close()
 
 @app.get("/api/auctions/history")
 def get_auction_history(
     item_id: int = Query(None, description="Specific item ID to get history for"),
-    hours: int = Query(24, description="Number of hours of history to retrieve")
+    hours: int = Query(24, description="Number of hours of history to retrieve"),
+    limit: int = Query(1000, ge=1, le=HISTORY_MAX_PAGE_SIZE, description="Page size for JSON responses"),
+    cursor: str = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    format: str = Query("json", pattern="^(json|columnar|ndjson|csv)$", description="json/columnar (paginated), or ndjson/csv (streamed export)")
 ):
-    """Get historical auction data for analytics and trends."""
-    conn = psycopg2.connect(DB_URI)
+    """
+    Get historical auction data for analytics and trends.
+    json and columnar responses are paginated: follow the X-Next-Cursor header until it is absent.
+    ndjson and csv stream every row in the window (from cursor onwards) with bounded memory.
+    """
+    params = [hours]
+    item_filter = ""
+    cursor_filter = ""
+    
+    if item_id:
+        item_filter = "AND ah.item_id = %s"
+        params.append(item_id)
+    if cursor:
+        cursor_filter = "AND (ah.snapshot_time, ah.id) < (%s, %s)"
+        params.extend(decode_history_cursor(cursor))
+    
+    sql = HISTORY_SQL.format(item_filter=item_filter, cursor_filter=cursor_filter)
+    
+    if format not in ROW_FORMATS:
+        media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+        return StreamingResponse(stream_history(sql, params, format), media_type=media_type)
+    
+    conn = connect()
     cur = conn.cursor()
     
     try:
-        if item_id:
-            # Get history for specific item
-            cur.execute("""
-                SELECT ah.item_id, ah.quantity, ah.buyout, ah.time_left, ah.snapshot_time,
-                       i.name, i.icon_url
-                FROM auction_history ah
-                JOIN items i ON ah.item_id = i.item_id
-                WHERE ah.item_id = %s AND ah.snapshot_time > NOW() - INTERVAL '%s hours'
-                ORDER BY ah.snapshot_time DESC
-            """, (item_id, hours))
-        else:
-            # Get history for all items
-            cur.execute("""
-                SELECT ah.item_id, ah.quantity, ah.buyout, ah.time_left, ah.snapshot_time,
-                       i.name, i.icon_url
-                FROM auction_history ah
-                JOIN items i ON ah.item_id = i.item_id
-                WHERE ah.snapshot_time > NOW() - INTERVAL '%s hours'
-                ORDER BY ah.snapshot_time DESC
-            """, (hours,))
+        # Fetch one extra row to know whether another page exists
+        with query_timer("history_item" if item_id else "history_page"):
+            cur.execute(sql + " LIMIT %s", params + [limit + 1])
+            rows = cur.fetchall()
         
-        results = []
-        for row in cur.fetchall():
-            item_id, quantity, buyout, time_left, snapshot_time, name, icon_url = row
-            results.append({
-                "item_id": item_id,
-                "name": name,
-                "icon_url": icon_url,
-                "quantity": quantity,
-                "buyout": buyout,
-                "time_left": time_left,
-                "snapshot_time": snapshot_time.isoformat() if snapshot_time else None
-            })
+        headers = {}
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last_id, last_time = rows[-1][0], rows[-1][6]
+            headers["X-Next-Cursor"] = encode_history_cursor(last_time, last_id)
         
-        return results
+        return rows_response([history_row(row) for row in rows], HISTORY_COLUMNS, format, headers)
     except Exception as e:
         return {"error": str(e)}
     finally:
         cur.close()
         conn.close()
 
+# Trend bucket widths in seconds (hour, 6 hours, day, week). The narrowest width
+# that keeps the series under TRENDS_MAX_POINTS is picked from the data's span.
+TREND_BUCKET_SECONDS = [3600, 6 * 3600, 24 * 3600, 7 * 24 * 3600]
+TRENDS_MAX_POINTS = 720
+
+# With max_points the query keeps hourly buckets up to this many points and
+# LTTB picks the points to return, so spikes survive the downsampling
+TRENDS_LTTB_SOURCE_POINTS = 10000
+
+# History and the live snapshot in one pass, bucketed server-side and returned oldest first.
+# Both branches give one row per snapshot; buckets spanning several snapshots
+# average their listing counts and quantities and keep the extreme prices.
+TRENDS_SQL = """
+    WITH series AS (
+        SELECT ah.snapshot_time, ah.listing_count, COALESCE(ah.total_quantity, ah.quantity) AS total_quantity,
+               COALESCE(ah.min_buyout, ah.buyout) AS min_buyout, COALESCE(ah.max_buyout, ah.buyout) AS max_buyout,
+               ah.unit_price AS min_unit_price, COALESCE(ah.max_unit_price, ah.unit_price) AS max_unit_price,
+               ps.p25_unit_price, ps.median_unit_price, ps.p75_unit_price
+        FROM auction_history ah
+        LEFT JOIN item_price_stats ps
+               ON ps.item_id = ah.item_id AND ps.snapshot_time = ah.snapshot_time
+        WHERE ah.item_id = %(item_id)s
+          AND (%(hours)s IS NULL OR ah.snapshot_time > NOW() - %(hours)s * INTERVAL '1 hour')
+        UNION ALL
+        SELECT a.last_seen, COUNT(*), SUM(a.quantity),
+               MIN(a.buyout) FILTER (WHERE NOT a.is_outlier), MAX(a.buyout) FILTER (WHERE NOT a.is_outlier),
+               MIN(a.unit_price) FILTER (WHERE NOT a.is_outlier), MAX(a.unit_price) FILTER (WHERE NOT a.is_outlier),
+               ps.p25_unit_price, ps.median_unit_price, ps.p75_unit_price
+        FROM auctions a
+        LEFT JOIN item_price_stats ps
+               ON ps.item_id = a.item_id AND ps.snapshot_time = a.last_seen
+        WHERE a.item_id = %(item_id)s
+        GROUP BY a.last_seen, ps.id
+    ),
+    bucket AS (
+        SELECT COALESCE(MIN(width), %(max_width)s) AS seconds
+        FROM unnest(%(widths)s::int[]) AS width,
+             (SELECT EXTRACT(EPOCH FROM MAX(snapshot_time) - MIN(snapshot_time)) AS span FROM series) bounds
+        WHERE bounds.span / width < %(max_points)s
+    )
+    SELECT
+        TO_TIMESTAMP(FLOOR(EXTRACT(EPOCH FROM s.snapshot_time) / b.seconds) * b.seconds) AT TIME ZONE 'UTC' AS hour,
+        b.seconds AS bucket_seconds,
+        ROUND(AVG(s.listing_count))::bigint AS auction_count,
+        MIN(s.min_buyout) AS min_price,
+        MAX(s.max_buyout) AS max_price,
+        MIN(s.min_unit_price) AS min_unit_price,
+        MAX(s.max_unit_price) AS max_unit_price,
+        ROUND(AVG(s.total_quantity))::bigint AS total_quantity,
+        ROUND(AVG(s.p25_unit_price)) AS p25_unit_price,
+        ROUND(AVG(s.median_unit_price)) AS median_unit_price,
+        ROUND(AVG(s.p75_unit_price)) AS p75_unit_price
+    FROM series s
+    CROSS JOIN bucket b
+    GROUP BY 1, 2
+    ORDER BY 1
+"""
+
+TREND_COLUMNS = ("hour", "auction_count", "min_price", "max_price", "min_unit_price", "max_unit_price",
+                 "total_quantity", "p25_unit_price", "median_unit_price", "p75_unit_price")
+
+def downsample_trend_rows(rows, max_points):
+    """Keeps the LTTB-selected rows of a trend series, by min_unit_price over time."""
+    # Buckets where every listing was an outlier have no price to plot
+    rows = [row for row in rows if row[5] is not None]
+    if len(rows) <= max_points:
+        return rows
+    x = np.array([row[0].timestamp() for row in rows])
+    y = np.array([row[5] for row in rows], dtype=np.float64)
+    return [rows[i] for i in lttb(x, y, max_points)]
+
 @app.get("/api/auctions/trends")
 def get_price_trends(
     item_id: int = Query(..., description="Item ID to get price trends for"),
+    hours: int = Query(24, description="Number of hours to analyze"),
+    max_points: int = Query(None, ge=3, le=TRENDS_MAX_POINTS, description="Downsample the series to at most this many points with LTTB")
+):
+    """
+    Get price trends for a specific item over time, oldest bucket first.
+    History and the current snapshot are merged and bucketed in one query; the
+    bucket width (reported in the X-Bucket-Seconds header) grows with the window
+    so a response never exceeds TRENDS_MAX_POINTS points.
+    With max_points, finer buckets are fetched and reduced with
+    Largest-Triangle-Three-Buckets on min_unit_price, which keeps the visual
+    extremes that wider averaging buckets would smooth away.
+    """
+    conn = connect()
+    cur = conn.cursor()
+    
+    try:
+        # "All Time" (8760 hours = 1 year or more) reads all available history
+        with query_timer("trends"):
+            cur.execute(TRENDS_SQL, {
+                "item_id": item_id,
+                "hours": hours if hours < 8760 else None,
+                "widths": TREND_BUCKET_SECONDS,
+                "max_width": TREND_BUCKET_SECONDS[-1],
+                "max_points": TRENDS_LTTB_SOURCE_POINTS if max_points else TRENDS_MAX_POINTS,
+            })
+            rows = cur.fetchall()
+        
+        bucket_seconds = rows[0][1] if rows else TREND_BUCKET_SECONDS[0]
+        if max_points:
+            rows = downsample_trend_rows(rows, max_points)
+        trends = [dict(zip(TREND_COLUMNS, row[:1] + row[2:])) for row in rows]
+        return ORJSONResponse(trends, headers={"X-Bucket-Seconds": str(bucket_seconds)})
+    except Exception as e:
+        return {"error": str(e)}
+    finally:
+        cur.close()
+        conn.close()
+
+@app.get("/api/auctions/sales")
+def get_sales_estimates(
+    item_id: int = Query(..., description="Item ID to get sales estimates for"),
     hours: int = Query(24, description="Number of hours to analyze")
 ):
-    """Get price trends for a specific item over time."""
-    conn = psycopg2.connect(DB_URI)
+    """
+    Get estimated hourly sales (likely-sold vs expired listings) for a specific item.
+    Snapshots in which nothing of the item sold or expired have no entry.
+    """
+    conn = connect()
     cur = conn.cursor()
     
     try:
-        # Handle "All Time" case (8760 hours = 1 year, but we'll get all available data)
-        if hours >= 8760:
-            # Get all available historical data
-            cur.execute("""
-                SELECT 
-                    DATE_TRUNC('hour', ah.snapshot_time) as hour,
-                    COUNT(*) as auction_count,
-                    MIN(ah.buyout) as min_price,
-                    MAX(ah.buyout) as max_price,
-                    SUM(ah.quantity) as total_quantity
-                FROM auction_history ah
-                WHERE ah.item_id = %s
-                GROUP BY DATE_TRUNC('hour', ah.snapshot_time)
-                ORDER BY hour DESC
-            """, (item_id,))
-        else:
-            # Get price trends grouped by hour from historical data
+        with query_timer("sales"):
             cur.execute("""
-                SELECT 
-                    DATE_TRUNC('hour', ah.snapshot_time) as hour,
-                    COUNT(*) as auction_count,
-                    MIN(ah.buyout) as min_price,
-                    MAX(ah.buyout) as max_price,
-                    SUM(ah.quantity) as total_quantity
-                FROM auction_history ah
-                WHERE ah.item_id = %s AND ah.snapshot_time > NOW() - INTERVAL '%s hours'
-                GROUP BY DATE_TRUNC('hour', ah.snapshot_time)
-                ORDER BY hour DESC
+                SELECT snapshot_time, elapsed_hours, sold_auctions, sold_quantity,
+                       expired_auctions, expired_quantity, sales_per_hour
+                FROM item_sales_estimates
+                WHERE item_id = %s AND snapshot_time > NOW() - INTERVAL '%s hours'
+                ORDER BY snapshot_time DESC
             """, (item_id, hours))
+            rows = cur.fetchall()
         
-        trends = []
-        for row in cur.fetchall():
-            hour, auction_count, min_price, max_price, total_quantity = row
-            trends.append({
-                "hour": hour.isoformat() if hour else None,
-                "auction_count": auction_count,
-                "min_price": min_price,
-                "max_price": max_price,
-                "total_quantity": total_quantity
+        estimates = []
+        for row in rows:
+            snapshot_time, elapsed_hours, sold_auctions, sold_quantity, expired_auctions, expired_quantity, sales_per_hour = row
+            estimates.append({
+                "snapshot_time": snapshot_time.isoformat() if snapshot_time else None,
+                "elapsed_hours": elapsed_hours,
+                "sold_auctions": sold_auctions,
+                "sold_quantity": sold_quantity,
+                "expired_auctions": expired_auctions,
+                "expired_quantity": expired_quantity,
+                "sales_per_hour": sales_per_hour
             })
         
-        # Get current data as the most recent data point
-        cur.execute("""
-            SELECT 
-                NOW() as hour,
-                COUNT(*) as auction_count,
-                MIN(a.buyout) as min_price,
-                MAX(a.buyout) as max_price,
-                SUM(a.quantity) as total_quantity
-            FROM auctions a
-            WHERE a.item_id = %s
-        """, (item_id,))
-        
-        current_row = cur.fetchone()
-        if current_row:
-            hour, auction_count, min_price, max_price, total_quantity = current_row
-            if auction_count > 0:  # Only add if there are current auctions
-                current_trend = {
-                    "hour": hour.isoformat() if hour else None,
-                    "auction_count": auction_count,
-                    "min_price": min_price,
-                    "max_price": max_price,
-                    "total_quantity": total_quantity
-                }
-                # Add current data as the first (most recent) item
-                trends.insert(0, current_trend)
-        
-        return trends
+        return estimates
     except Exception as e:
         return {"error": str(e)}
     finally:
         cur.close()
         conn.close()
 
+ALERTS_MAX_PAGE_SIZE = 10000
+
+class AlertRule(BaseModel):
+    item_id: int
+    max_unit_price: int = Field(..., gt=0, description="Fire at or below this unit price, in copper")
+    label: Optional[str] = Field(None, description="Your reference, returned with every event")
+
+@app.post("/api/alerts")
+def create_price_alerts(
+    rules: List[AlertRule] = Body(..., embed=True, alias="alerts", max_length=ALERTS_MAX_PAGE_SIZE)
+):
+    """Creates price alert rules in bulk; they are checked against every new snapshot. Returns their IDs."""
+    ids = alerts.create_alerts([(r.item_id, r.max_unit_price, r.label) for r in rules])
+    return {"ids": ids}
+
+@app.get("/api/alerts")
+def get_price_alerts(
+    item_id: int = Query(None, description="Only rules for this item"),
+    after_id: int = Query(0, description="Resume after this rule ID"),
+    limit: int = Query(1000, ge=1, le=ALERTS_MAX_PAGE_SIZE),
+    format: str = Query("json", pattern=f"^({'|'.join(ROW_FORMATS)})$")
+):
+    """Price alert rules in ID order, with their current triggered state."""
+    with query_timer("alerts"):
+        rows = alerts.list_alerts(item_id, after_id, limit)
+    return rows_response(rows, alerts.ALERT_COLUMNS, format)
+
+@app.delete("/api/alerts/{alert_id}")
+def delete_price_alert(alert_id: int):
+    if not alerts.delete_alert(alert_id):
+        raise HTTPException(status_code=404, detail="Alert not found")
+    return {"deleted": alert_id}
+
+@app.get("/api/alerts/events")
+def get_alert_events(
+    after_id: int = Query(0, description="Resume after this event ID (the last one you received)"),
+    limit: int = Query(1000, ge=1, le=ALERTS_MAX_PAGE_SIZE),
+    format: str = Query("json", pattern=f"^({'|'.join(ROW_FORMATS)})$")
+):
+    """Fired price alerts in ID order. Poll with the last seen ID to receive only new ones."""
+    with query_timer("alert_events"):
+        rows = alerts.list_alert_events(after_id, limit)
+    return rows_response(rows, alerts.ALERT_EVENT_COLUMNS, format)
+
 @app.get("/api/items/search")
 def search_items(query: str = Query(..., description="Search query for item names")):
     """Quick search endpoint for dropdown suggestions - returns only names and icons."""
     if len(query) < 3:
         return []
     
-    conn = psycopg2.connect(DB_URI)
+    conn = connect()
     cur = conn.cursor()
     
     try:
         # First get items that start with the query (prefix matches)
-        cur.execute("""
-            SELECT item_id, name, icon_url, 1 as priority
-            FROM items
-            WHERE name ILIKE %s
-            UNION ALL
-            SELECT item_id, name, icon_url, 2 as priority
-            FROM items
-            WHERE name ILIKE %s AND name NOT ILIKE %s
-            ORDER BY priority, name
-            LIMIT 5
-        """, (f"{query}%", f"%{query}%", f"{query}%"))
+        with query_timer("items_search"):
+            cur.execute("""
+                SELECT item_id, name, icon_url, 1 as priority
+                FROM items
+                WHERE name ILIKE %s
+                UNION ALL
+                SELECT item_id, name, icon_url, 2 as priority
+                FROM items
+                WHERE name ILIKE %s AND name NOT ILIKE %s
+                ORDER BY priority, name
+                LIMIT 5
+            """, (f"{query}%", f"%{query}%", f"{query}%"))
+            rows = cur.fetchall()
         
         results = []
         seen_items = set()
         
-        for row in cur.fetchall():
+        for row in rows:
             item_id, name, icon_url, priority = row
             if item_id not in seen_items:  # Avoid duplicates
                 # Get tier information for this item
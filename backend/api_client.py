@@ -0,0 +1,145 @@
+"""
+Shared HTTP client for every Blizzard API call.
+
+One pooled keep-alive session per process, explicit gzip negotiation, connect
+and read timeouts, retries with jittered exponential backoff on connection
+errors, 429 and 5xx (honouring Retry-After), and a cap on concurrent requests
+per host so parallel fetches stay inside Blizzard's rate limits.
+"""
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# (connect, read) seconds; auction dumps are large, so reads get more time
+DEFAULT_TIMEOUT = (5, 60)
+
+MAX_RETRIES = 4
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+# Never sleep longer than this, whatever Retry-After asks for
+RETRY_AFTER_MAX = 120.0
+
+MAX_CONCURRENT_PER_HOST = 8
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 16
+
+class ApiClient:
+    def __init__(self, session=None, max_retries=MAX_RETRIES, timeout=DEFAULT_TIMEOUT,
+                 max_concurrent_per_host=MAX_CONCURRENT_PER_HOST):
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.max_concurrent_per_host = max_concurrent_per_host
+        self._host_limits = {}
+        self._host_limits_lock = threading.Lock()
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc
+        with self._host_limits_lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.max_concurrent_per_host)
+            return self._host_limits[host]
+
+    def request(self, method, url, retries=None, timeout=None, **kwargs):
+        """
+        Sends a request, retrying transient failures. Returns the final response
+        (which may still be an error status); raises only if the last attempt
+        failed at the connection level. With stream=True a successful response
+        keeps its per-host slot until it is closed, so use it as a context manager.
+        """
+        retries = self.max_retries if retries is None else retries
+        limit = self._host_limit(url)
+        for attempt in range(retries + 1):
+            limit.acquire()
+            try:
+                response = self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                limit.release()
+                if attempt == retries:
+                    raise
+                delay = backoff_delay(attempt)
+                print(f"{method} {url} failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            except BaseException:
+                limit.release()
+                raise
+
+            # Error bodies are small and often left unclosed by callers, so only
+            # successful streams keep the slot
+            if kwargs.get("stream") and response.status_code < 400:
+                hold_until_closed(response, limit)
+            else:
+                limit.release()
+
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return response
+
+            delay = retry_after_delay(response)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            print(f"{method} {url} returned {response.status_code}, retrying in {delay:.1f}s")
+            response.close()
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+def hold_until_closed(response, limit):
+    """Releases a host slot when the streamed response is closed, not when its headers arrive."""
+    close = response.close
+    released = threading.Event()
+
+    def close_and_release():
+        try:
+            close()
+        finally:
+            if not released.is_set():
+                released.set()
+                limit.release()
+
+    response.close = close_and_release
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff, so concurrent clients don't retry in lockstep."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+def retry_after_delay(response):
+    """Seconds requested by a Retry-After header (delta-seconds or HTTP date), if any."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), RETRY_AFTER_MAX)
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Returns the process-wide API client."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ApiClient()
+        return _client
@@ -1,23 +1,41 @@
 # backend/auth.py
 
-import requests
-from backend.config import API_CLIENT_ID, API_SECRET
+import threading
+import time
+
+from backend.api_client import get_client
+from backend import config
 
 DEFAULT_REGION = "eu"
 
+# Tokens are refreshed this many seconds before Blizzard says they expire
+TOKEN_EXPIRY_MARGIN = 300
+
+_token_cache = {}  # region -> (access_token, expires_at)
+_token_lock = threading.Lock()
+
 def get_access_token(region=DEFAULT_REGION):
     """
     Get an OAuth2 access token for the specified Blizzard API region.
-    Default region is 'eu'.
+    Default region is 'eu'. Tokens are cached per region until shortly before
+    they expire, so repeated calls in one process authenticate only once.
     """
-    url = f"https://{region}.battle.net/oauth/token"
-    response = requests.post(
-        url,
-        data={"grant_type": "client_credentials"},
-        auth=(API_CLIENT_ID, API_SECRET)
-    )
-
-    if response.status_code == 200:
-        return response.json()["access_token"]
-    else:
-        raise Exception(f"Failed to get token: {response.status_code} {response.text}")
+    with _token_lock:
+        cached = _token_cache.get(region)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        url = config.OAUTH_TOKEN_URL.format(region=region)
+        response = get_client().post(
+            url,
+            data={"grant_type": "client_credentials"},
+            auth=(config.API_CLIENT_ID, config.API_SECRET)
+        )
+
+        if response.status_code == 200:
+            data = response.json()
+            expires_in = data.get("expires_in", 0)
+            _token_cache[region] = (data["access_token"], time.monotonic() + expires_in - TOKEN_EXPIRY_MARGIN)
+            return data["access_token"]
+        else:
+            raise Exception(f"Failed to get token: {response.status_code} {response.text}")
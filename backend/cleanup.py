@@ -1,18 +1,64 @@
-import psycopg2
 import os
 import shutil
 from datetime import datetime, timedelta
-from backend.config import DB_URI
+from psycopg2 import sql
+from backend.db import connect
+from backend.metrics import push_metrics, span
+
+# History rows whose unit price is an outlier for their item, using the same MAD
+# rule that flags listings at ingest (see backend/price_stats.py)
+HISTORY_OUTLIERS_SQL = """
+    WITH unit AS (
+        SELECT id, item_id, unit_price::float8 AS unit_price
+        FROM auction_history
+    ),
+    med AS (
+        SELECT item_id,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY unit_price) AS median,
+               COUNT(*) AS n
+        FROM unit
+        GROUP BY item_id
+    ),
+    mad AS (
+        SELECT u.item_id,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY ABS(u.unit_price - m.median)) AS mad
+        FROM unit u
+        JOIN med m ON m.item_id = u.item_id
+        GROUP BY u.item_id
+    )
+    SELECT u.id
+    FROM unit u
+    JOIN med m ON m.item_id = u.item_id
+    JOIN mad d ON d.item_id = u.item_id
+    WHERE m.n >= %(min_listings)s
+      AND ABS(u.unit_price - m.median) > %(mads)s * GREATEST(%(scale)s * d.mad, %(spread)s * m.median)
+      AND (u.unit_price >= m.median OR u.unit_price < %(low_fraction)s * m.median)
+"""
+
+def history_outlier_params():
+    # Imported on use: price_stats pulls in numpy, which `stats` and friends don't need
+    from backend.price_stats import (
+        LOW_OUTLIER_FRACTION, MAD_SCALE, MIN_LISTINGS_FOR_OUTLIERS, MIN_RELATIVE_SPREAD, OUTLIER_MADS,
+    )
+    return {
+        "min_listings": MIN_LISTINGS_FOR_OUTLIERS,
+        "mads": OUTLIER_MADS,
+        "scale": MAD_SCALE,
+        "spread": MIN_RELATIVE_SPREAD,
+        "low_fraction": LOW_OUTLIER_FRACTION,
+    }
 
 # ============================================================================
 # BACKUP FUNCTIONS
 # ============================================================================
 
-def create_backup():
+def create_backup(conn=None):
     """
     Create a backup of the auction_history table before running cleanup operations.
     """
-    conn = psycopg2.connect(DB_URI)
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
     cur = conn.cursor()
     
     try:
@@ -23,14 +69,15 @@ def create_backup():
         print(f"Creating backup table: {backup_table_name}")
         
         # Create backup table
-        cur.execute(f"""
-            CREATE TABLE {backup_table_name} AS 
-            SELECT * FROM auction_history
-        """)
+        with span("cleanup:backup") as s:
+            cur.execute(f"""
+                CREATE TABLE {backup_table_name} AS 
+                SELECT * FROM auction_history
+            """)
+            s["rows"] = cur.rowcount
         
-        # Get backup statistics
-        cur.execute(f"SELECT COUNT(*) FROM {backup_table_name}")
-        backup_count = cur.fetchone()[0]
+        # CREATE TABLE AS reports the copied row count, so no recount is needed
+        backup_count = cur.rowcount
         
         conn.commit()
         
@@ -46,69 +93,75 @@ def create_backup():
         return None
     finally:
         cur.close()
-        conn.close()
+        if own_conn:
+            conn.close()
 
-def list_backups():
+def list_backups(conn=None):
     """
-    List all available backup tables.
+    List all available backup tables. Returns their names, or None on error.
     """
-    conn = psycopg2.connect(DB_URI)
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
     cur = conn.cursor()
     
     try:
         cur.execute("""
-            SELECT table_name, 
-                   (SELECT COUNT(*) FROM information_schema.tables t2 WHERE t2.table_name = t1.table_name) as exists
-            FROM information_schema.tables t1
-            WHERE table_name LIKE 'auction_history_backup_%'
+            SELECT table_name
+            FROM information_schema.tables
+            WHERE table_schema = current_schema()
+              AND table_name LIKE 'auction_history_backup_%'
             ORDER BY table_name DESC
         """)
-        
-        backups = cur.fetchall()
-        
+
+        backups = [row[0] for row in cur.fetchall()]
+
         if not backups:
             print("No backup tables found.")
             return []
-        
+
+        # Count every backup in one round trip
+        cur.execute(sql.SQL(" UNION ALL ").join(
+            sql.SQL("SELECT {}, COUNT(*) FROM {}").format(sql.Literal(name), sql.Identifier(name))
+            for name in backups
+        ))
+        counts = dict(cur.fetchall())
+
         print("Available backup tables:")
-        for table_name, exists in backups:
-            if exists:
-                cur.execute(f"SELECT COUNT(*) FROM {table_name}")
-                count = cur.fetchone()[0]
-                print(f"  {table_name}: {count:,} records")
-            else:
-                print(f"  {table_name}: (table not found)")
-        
-        return [row[0] for row in backups if row[1]]
+        for table_name in backups:
+            print(f"  {table_name}: {counts[table_name]:,} records")
+
+        return backups
         
     except Exception as e:
         print(f"Error listing backups: {e}")
-        return []
+        conn.rollback()
+        return None
     finally:
         cur.close()
-        conn.close()
+        if own_conn:
+            conn.close()
 
-def restore_backup(backup_table_name):
+def restore_backup(backup_table_name, conn=None):
     """
     Restore auction_history table from a backup.
     """
-    conn = psycopg2.connect(DB_URI)
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
     cur = conn.cursor()
     
     try:
         # Check if backup table exists
-        cur.execute(f"SELECT COUNT(*) FROM information_schema.tables WHERE table_name = '{backup_table_name}'")
+        cur.execute("SELECT COUNT(*) FROM information_schema.tables WHERE table_name = %s", (backup_table_name,))
         if cur.fetchone()[0] == 0:
             print(f"❌ Backup table '{backup_table_name}' not found!")
             return False
         
-        # Count current records
-        cur.execute("SELECT COUNT(*) FROM auction_history")
-        current_count = cur.fetchone()[0]
-        
-        # Count backup records
-        cur.execute(f"SELECT COUNT(*) FROM {backup_table_name}")
-        backup_count = cur.fetchone()[0]
+        # Count current and backup records in one round trip
+        cur.execute(sql.SQL("SELECT (SELECT COUNT(*) FROM auction_history), (SELECT COUNT(*) FROM {})").format(
+            sql.Identifier(backup_table_name)))
+        current_count, backup_count = cur.fetchone()
         
         print(f"Restoring from backup: {backup_table_name}")
         print(f"  Current records: {current_count:,}")
@@ -131,46 +184,56 @@ def restore_backup(backup_table_name):
         return False
     finally:
         cur.close()
-        conn.close()
+        if own_conn:
+            conn.close()
 
-def delete_backup(backup_table_name):
+def delete_backup(backup_table_name, conn=None):
     """
-    Delete a backup table.
+    Delete a backup table. Returns True on success.
     """
-    conn = psycopg2.connect(DB_URI)
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
     cur = conn.cursor()
     
     try:
         cur.execute(f"DROP TABLE IF EXISTS {backup_table_name}")
         conn.commit()
         print(f"✅ Backup table '{backup_table_name}' deleted successfully!")
+        return True
         
     except Exception as e:
         print(f"❌ Error deleting backup: {e}")
         conn.rollback()
+        return False
     finally:
         cur.close()
-        conn.close()
+        if own_conn:
+            conn.close()
 
 # ============================================================================
 # CLEANUP FUNCTIONS
 # ============================================================================
 
-def remove_outliers(create_backup_first=True):
+def remove_outliers(create_backup_first=True, conn=None):
     """
     Remove obvious outlier data points with backup protection.
-    Uses conservative thresholds to avoid losing legitimate data.
+    Drops impossible prices and rows whose unit price is a MAD outlier for their item.
     """
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
     backup_table = None
     
     if create_backup_first:
         print("Creating backup before outlier removal...")
-        backup_table = create_backup()
+        backup_table = create_backup(conn=conn)
         if not backup_table:
             print("❌ Failed to create backup. Aborting cleanup.")
+            if own_conn:
+                conn.close()
             return False
     
-    conn = psycopg2.connect(DB_URI)
     cur = conn.cursor()
     
     try:
@@ -180,14 +243,15 @@ def remove_outliers(create_backup_first=True):
         
         print(f"Starting outlier removal (records before: {before_count:,})")
         
-        # Conservative outlier removal - only remove truly extreme outliers
-        cur.execute("""
-            DELETE FROM auction_history 
-            WHERE buyout > 10000000000  -- More than 1,000,000 gold (extremely high)
-            OR (item_id = 2589 AND buyout > 1000000)  -- Linen Cloth more than 100 gold (very high)
-            OR (item_id = 2589 AND buyout < 50)  -- Linen Cloth less than 0.005 gold (extremely low)
-            OR buyout < 1  -- Any item less than 0.0001 gold (impossible)
-        """)
+        # Per-item robust outlier removal plus absolute sanity bounds
+        with span("cleanup:outliers") as s:
+            cur.execute(f"""
+                DELETE FROM auction_history 
+                WHERE buyout > 10000000000  -- More than 1,000,000 gold (extremely high)
+                OR buyout < 1  -- Any item less than 0.0001 gold (impossible)
+                OR id IN ({HISTORY_OUTLIERS_SQL})
+            """, history_outlier_params())
+            s["rows"] = cur.rowcount
         
         deleted_count = cur.rowcount
         conn.commit()
@@ -200,7 +264,7 @@ def remove_outliers(create_backup_first=True):
         print(f"  Records before: {before_count:,}")
         print(f"  Records deleted: {deleted_count:,}")
         print(f"  Records after: {after_count:,}")
-        print(f"  Reduction: {((deleted_count) / before_count * 100):.2f}%")
+        print(f"  Reduction: {(deleted_count / max(before_count, 1) * 100):.2f}%")
         
         if backup_table:
             print(f"  Backup available: {backup_table}")
@@ -213,23 +277,28 @@ def remove_outliers(create_backup_first=True):
         return False
     finally:
         cur.close()
-        conn.close()
+        if own_conn:
+            conn.close()
 
-def cleanup_daily_data(create_backup_first=True):
+def cleanup_daily_data(create_backup_first=True, conn=None):
     """
     Keep only one data point per day per item with backup protection.
     Keeps the data point with the lowest price for each day.
     """
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
     backup_table = None
     
     if create_backup_first:
         print("Creating backup before daily cleanup...")
-        backup_table = create_backup()
+        backup_table = create_backup(conn=conn)
         if not backup_table:
             print("❌ Failed to create backup. Aborting cleanup.")
+            if own_conn:
+                conn.close()
             return False
     
-    conn = psycopg2.connect(DB_URI)
     cur = conn.cursor()
     
     try:
@@ -240,14 +309,16 @@ def cleanup_daily_data(create_backup_first=True):
         print(f"Starting daily cleanup (records before: {before_count:,})")
         
         # Keep the data point with the lowest price for each day per item
-        cur.execute("""
-            DELETE FROM auction_history 
-            WHERE id NOT IN (
-                SELECT DISTINCT ON (item_id, DATE(snapshot_time)) id
-                FROM auction_history 
-                ORDER BY item_id, DATE(snapshot_time), buyout ASC
-            )
-        """)
+        with span("cleanup:daily") as s:
+            cur.execute("""
+                DELETE FROM auction_history 
+                WHERE id NOT IN (
+                    SELECT DISTINCT ON (item_id, DATE(snapshot_time)) id
+                    FROM auction_history 
+                    ORDER BY item_id, DATE(snapshot_time), unit_price ASC
+                )
+            """)
+            s["rows"] = cur.rowcount
         
         deleted_count = cur.rowcount
         conn.commit()
@@ -260,7 +331,7 @@ def cleanup_daily_data(create_backup_first=True):
         print(f"  Records before: {before_count:,}")
         print(f"  Records deleted: {deleted_count:,}")
         print(f"  Records after: {after_count:,}")
-        print(f"  Reduction: {((deleted_count) / before_count * 100):.1f}%")
+        print(f"  Reduction: {(deleted_count / max(before_count, 1) * 100):.1f}%")
         
         if backup_table:
             print(f"  Backup available: {backup_table}")
@@ -273,22 +344,27 @@ def cleanup_daily_data(create_backup_first=True):
         return False
     finally:
         cur.close()
-        conn.close()
+        if own_conn:
+            conn.close()
 
-def cleanup_old_data(days_to_keep=30, create_backup_first=True):
+def cleanup_old_data(days_to_keep=30, create_backup_first=True, conn=None):
     """
     Remove historical data older than specified days with backup protection.
     """
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
     backup_table = None
     
     if create_backup_first:
         print("Creating backup before old data cleanup...")
-        backup_table = create_backup()
+        backup_table = create_backup(conn=conn)
         if not backup_table:
             print("❌ Failed to create backup. Aborting cleanup.")
+            if own_conn:
+                conn.close()
             return False
     
-    conn = psycopg2.connect(DB_URI)
     cur = conn.cursor()
     
     try:
@@ -301,12 +377,40 @@ def cleanup_old_data(days_to_keep=30, create_backup_first=True):
         print(f"  Removing data older than: {cutoff_date.strftime('%Y-%m-%d')}")
         
         # Delete old records
-        cur.execute("""
-            DELETE FROM auction_history 
-            WHERE snapshot_time < %s
-        """, (cutoff_date,))
+        with span("cleanup:old_history") as s:
+            cur.execute("""
+                DELETE FROM auction_history 
+                WHERE snapshot_time < %s
+            """, (cutoff_date,))
+            s["rows"] = cur.rowcount
         
         deleted_count = cur.rowcount
+        
+        # Drop event chains of listings that disappeared before the cutoff;
+        # listings still live at the cutoff keep their events so snapshots stay reconstructable
+        with span("cleanup:old_events") as s:
+            cur.execute("""
+                DELETE FROM auction_events e
+                USING auction_events gone
+                WHERE gone.event_type = 'disappear'
+                  AND gone.snapshot_time < %s
+                  AND e.auction_id = gone.auction_id
+            """, (cutoff_date,))
+            s["rows"] = cur.rowcount
+        deleted_events = cur.rowcount
+        
+        with span("cleanup:old_alert_events") as s:
+            cur.execute("DELETE FROM alert_events WHERE snapshot_time < %s", (cutoff_date,))
+            s["rows"] = cur.rowcount
+        deleted_alerts = cur.rowcount
+        
+        # Per-snapshot item statistics follow the history they describe
+        with span("cleanup:old_item_stats") as s:
+            cur.execute("DELETE FROM item_sales_estimates WHERE snapshot_time < %s", (cutoff_date,))
+            deleted_stats = cur.rowcount
+            cur.execute("DELETE FROM item_price_stats WHERE snapshot_time < %s", (cutoff_date,))
+            deleted_stats += cur.rowcount
+            s["rows"] = deleted_stats
         conn.commit()
         
         # Count records after cleanup
@@ -317,6 +421,9 @@ def cleanup_old_data(days_to_keep=30, create_backup_first=True):
         print(f"  Records before: {before_count:,}")
         print(f"  Records deleted: {deleted_count:,}")
         print(f"  Records after: {after_count:,}")
+        print(f"  Listing events deleted: {deleted_events:,}")
+        print(f"  Alert events deleted: {deleted_alerts:,}")
+        print(f"  Sales estimate and price stat rows deleted: {deleted_stats:,}")
         print(f"  Kept data from: {cutoff_date.strftime('%Y-%m-%d')} onwards")
         
         if backup_table:
@@ -330,113 +437,175 @@ def cleanup_old_data(days_to_keep=30, create_backup_first=True):
         return False
     finally:
         cur.close()
-        conn.close()
+        if own_conn:
+            conn.close()
 
-def get_stats():
+# ============================================================================
+# STATISTICS
+# By default these read catalog statistics and auction_history_daily_counts,
+# which triggers keep current, so hourly monitoring never scans the table.
+# exact=True counts by scanning (and resyncs the counters on the way).
+# ============================================================================
+
+# Leaf tables of auction_history: the table itself, or its partitions
+HISTORY_RELATIONS_SQL = """
+    SELECT c.oid, c.reltuples
+    FROM pg_class c
+    WHERE c.oid = 'auction_history'::regclass
+       OR c.oid IN (SELECT relid FROM pg_partition_tree('auction_history') WHERE isleaf)
+"""
+
+def rebuild_history_counts(cur):
+    """
+    Recounts auction_history per day in one scan and replaces the trigger-maintained
+    counters. Blocks writers to auction_history until the caller commits.
+    """
+    cur.execute("LOCK TABLE auction_history IN SHARE MODE")
+    cur.execute("DELETE FROM auction_history_daily_counts")
+    cur.execute("""
+        INSERT INTO auction_history_daily_counts (day, row_count, item_count)
+        SELECT snapshot_time::date, COUNT(*), COUNT(DISTINCT item_id)
+        FROM auction_history
+        GROUP BY 1
+    """)
+
+def estimate_history_rows(cur, condition):
+    """Planner estimate of auction_history rows matching condition (SQL), without running it."""
+    cur.execute(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM auction_history WHERE {condition}")
+    return int(cur.fetchone()[0][0]["Plan"]["Plan Rows"])
+
+def get_stats(exact=False, conn=None):
     """
     Get statistics about the auction_history table.
+    Row counts come from the daily counters unless exact=True.
     """
-    conn = psycopg2.connect(DB_URI)
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
     cur = conn.cursor()
     
     try:
-        # Total records
-        cur.execute("SELECT COUNT(*) FROM auction_history")
-        total_records = cur.fetchone()[0]
-        
-        # Table size
-        cur.execute("SELECT pg_size_pretty(pg_total_relation_size('auction_history'))")
-        table_size = cur.fetchone()[0]
-        
-        # Date range
-        cur.execute("SELECT MIN(snapshot_time), MAX(snapshot_time) FROM auction_history")
-        min_date, max_date = cur.fetchone()
-        
-        # Records per day (average)
-        cur.execute("""
-            SELECT COUNT(*) / GREATEST(EXTRACT(EPOCH FROM (MAX(snapshot_time) - MIN(snapshot_time))) / 86400, 1) as avg_per_day
-            FROM auction_history
+        if exact:
+            with span("cleanup:recount"):
+                rebuild_history_counts(cur)
+            conn.commit()
+
+        # Counters, planner estimate, size and date range in one round trip;
+        # MIN/MAX are answered from the snapshot_time index
+        cur.execute(f"""
+            WITH relations AS ({HISTORY_RELATIONS_SQL})
+            SELECT (SELECT SUM(row_count) FROM auction_history_daily_counts),
+                   (SELECT SUM(reltuples) FROM relations WHERE reltuples >= 0),
+                   (SELECT pg_size_pretty(SUM(pg_total_relation_size(oid))) FROM relations),
+                   (SELECT MIN(snapshot_time) FROM auction_history),
+                   (SELECT MAX(snapshot_time) FROM auction_history)
         """)
-        avg_per_day = cur.fetchone()[0]
-        
+        counted, estimated, table_size, min_date, max_date = cur.fetchone()
+
+        # Counters are empty on databases that predate them (see migration 002)
+        total_records = int(counted if counted is not None else estimated or 0)
+        span_days = (max_date - min_date).total_seconds() / 86400 if min_date else 0
+        avg_per_day = total_records / max(span_days, 1)
+
+        if exact:
+            source = "exact count"
+        elif counted is not None:
+            source = "daily counters"
+        else:
+            source = "planner estimate"
+        estimate_note = f", planner estimate {estimated:,.0f}" if estimated is not None and not exact else ""
+
         print(f"History Table Statistics:")
-        print(f"  Total records: {total_records:,}")
+        print(f"  Total records: {total_records:,} ({source}{estimate_note})")
         print(f"  Table size: {table_size}")
         print(f"  Date range: {min_date} to {max_date}")
         print(f"  Average records per day: {avg_per_day:,.0f}")
-        
+
+        return {
+            "total_records": total_records,
+            "estimated_records": None if estimated is None else int(estimated),
+            "exact": exact,
+            "table_size": table_size,
+            "min_date": min_date,
+            "max_date": max_date,
+            "avg_per_day": avg_per_day,
+        }
+
     except Exception as e:
         print(f"Error getting stats: {e}")
+        conn.rollback()
+        return None
     finally:
         cur.close()
-        conn.close()
+        if own_conn:
+            conn.close()
 
-def preview_cleanup_impact():
+def preview_cleanup_impact(exact=False, conn=None):
     """
     Preview what would be deleted without actually deleting anything.
+    Returns True unless the preview failed. Without exact=True, outlier counts are planner estimates, the MAD check
+    is skipped and the daily compaction figures come from the daily counters.
     """
-    conn = psycopg2.connect(DB_URI)
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
     cur = conn.cursor()
     
     try:
-        print("=== PREVIEW: Outlier Analysis ===")
-        
-        # Check for extreme outliers
-        cur.execute("""
-            SELECT COUNT(*) FROM auction_history 
-            WHERE buyout > 10000000000
-        """)
-        extreme_high = cur.fetchone()[0]
-        
-        cur.execute("""
-            SELECT COUNT(*) FROM auction_history 
-            WHERE buyout < 1
-        """)
-        extreme_low = cur.fetchone()[0]
-        
-        cur.execute("""
-            SELECT COUNT(*) FROM auction_history 
-            WHERE item_id = 2589 AND buyout > 1000000
-        """)
-        linen_high = cur.fetchone()[0]
-        
-        cur.execute("""
-            SELECT COUNT(*) FROM auction_history 
-            WHERE item_id = 2589 AND buyout < 50
-        """)
-        linen_low = cur.fetchone()[0]
+        print(f"=== PREVIEW: Outlier Analysis ({'exact' if exact else 'estimated'}) ===")
+
+        if exact:
+            # Extreme outliers and the daily compaction counts share one scan
+            cur.execute("""
+                SELECT COUNT(*) FILTER (WHERE buyout > 10000000000),
+                       COUNT(*) FILTER (WHERE buyout < 1),
+                       COUNT(*),
+                       COUNT(DISTINCT (item_id, DATE(snapshot_time)))
+                FROM auction_history
+            """)
+            extreme_high, extreme_low, total_records, unique_combinations = cur.fetchone()
+
+            outlier_params = history_outlier_params()
+            cur.execute(f"SELECT COUNT(*) FROM ({HISTORY_OUTLIERS_SQL}) outliers", outlier_params)
+            mad_outliers = cur.fetchone()[0]
+        else:
+            extreme_high = estimate_history_rows(cur, "buyout > 10000000000")
+            extreme_low = estimate_history_rows(cur, "buyout < 1")
+            mad_outliers = None
+            # item_count is exact for compacted days and a lower bound for the rest
+            cur.execute("""
+                SELECT COALESCE(SUM(row_count), 0), COALESCE(SUM(item_count), 0)
+                FROM auction_history_daily_counts
+            """)
+            total_records, unique_combinations = (int(value) for value in cur.fetchone())
         
         print(f"  Extreme high prices (>1M gold): {extreme_high:,}")
         print(f"  Extreme low prices (<0.0001g): {extreme_low:,}")
-        print(f"  Linen Cloth high prices (>100g): {linen_high:,}")
-        print(f"  Linen Cloth low prices (<0.005g): {linen_low:,}")
+        if mad_outliers is None:
+            print(f"  Unit price outliers (MAD rule): not estimated, run with --exact")
+        else:
+            print(f"  Unit price outliers (>{outlier_params['mads']:g} MADs from item median, "
+                  f"below it only under {outlier_params['low_fraction']:.0%} of it): {mad_outliers:,}")
         
-        total_outliers = extreme_high + extreme_low + linen_high + linen_low
+        total_outliers = extreme_high + extreme_low + (mad_outliers or 0)
         print(f"  Total outliers to remove: {total_outliers:,}")
         
         print("\n=== PREVIEW: Daily Data Analysis ===")
-        
-        # Count total records
-        cur.execute("SELECT COUNT(*) FROM auction_history")
-        total_records = cur.fetchone()[0]
-        
-        # Count unique item-date combinations
-        cur.execute("""
-            SELECT COUNT(DISTINCT (item_id, DATE(snapshot_time))) 
-            FROM auction_history
-        """)
-        unique_combinations = cur.fetchone()[0]
-        
+
         print(f"  Total records: {total_records:,}")
         print(f"  Unique item-date combinations: {unique_combinations:,}")
         print(f"  Records to keep (lowest price per day per item): {unique_combinations:,}")
         print(f"  Records to remove: {total_records - unique_combinations:,}")
+        return True
         
     except Exception as e:
         print(f"Error during preview: {e}")
+        conn.rollback()
+        return False
     finally:
         cur.close()
-        conn.close()
+        if own_conn:
+            conn.close()
 
 # ============================================================================
 # COMMAND LINE INTERFACE
@@ -445,36 +614,38 @@ def preview_cleanup_impact():
 if __name__ == "__main__":
     import sys
     
+    # One connection for the whole command, including its backup
+    conn = connect()
     if len(sys.argv) > 1:
         command = sys.argv[1]
         
         # Backup commands
         if command == "backup":
-            create_backup()
+            create_backup(conn=conn)
         elif command == "backups":
-            list_backups()
+            list_backups(conn=conn)
         elif command == "restore" and len(sys.argv) > 2:
-            restore_backup(sys.argv[2])
+            restore_backup(sys.argv[2], conn=conn)
         elif command == "delete-backup" and len(sys.argv) > 2:
-            delete_backup(sys.argv[2])
+            delete_backup(sys.argv[2], conn=conn)
         
         # Cleanup commands
         elif command == "outliers":
-            remove_outliers()
+            remove_outliers(conn=conn)
         elif command == "daily":
-            cleanup_daily_data()
+            cleanup_daily_data(conn=conn)
         elif command == "old" and len(sys.argv) > 2:
             days = int(sys.argv[2])
-            cleanup_old_data(days)
+            cleanup_old_data(days, conn=conn)
         elif command == "preview":
-            preview_cleanup_impact()
+            preview_cleanup_impact(exact="--exact" in sys.argv, conn=conn)
         elif command == "stats":
-            get_stats()
+            get_stats(exact="--exact" in sys.argv, conn=conn)
         elif command == "all":
             print("Running all cleanup operations with backups...")
-            if remove_outliers():
-                if cleanup_daily_data(create_backup_first=False):
-                    cleanup_old_data(30, create_backup_first=False)
+            if remove_outliers(conn=conn):
+                if cleanup_daily_data(create_backup_first=False, conn=conn):
+                    cleanup_old_data(30, create_backup_first=False, conn=conn)
         else:
             print("Usage: python cleanup.py [command]")
             print("\nBackup commands:")
@@ -486,8 +657,11 @@ if __name__ == "__main__":
             print("  outliers                  - Remove extreme outliers (with backup)")
             print("  daily                     - Keep lowest price per day per item (with backup)")
             print("  old <days>                - Remove data older than X days (with backup)")
-            print("  preview                   - Show what would be deleted without doing it")
-            print("  stats                     - Show table statistics")
+            print("  preview [--exact]         - Show what would be deleted without doing it")
+            print("  stats [--exact]           - Show table statistics (--exact scans and resyncs counters)")
             print("  all                       - Run all cleanup operations")
     else:
-        get_stats()
+        get_stats(conn=conn)
+    conn.close()
+
+    push_metrics("cleanup")
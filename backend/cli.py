@@ -0,0 +1,209 @@
+"""
+One command line for the operational tasks (cleanup, backups, item cache,
+realm lookups, price alerts). Commands can be chained with "+" and run in one process, in
+order, sharing one database connection, one HTTP session and one cached
+OAuth token. The chain stops at the first command that fails.
+
+    python -m backend stats
+    python -m backend stats + backups + preview
+    python -m backend outliers + daily --no-backup + old 30 --no-backup + stats
+    python -m backend realm "Twisting Nether" tarren-mill + items --missing-only
+
+Modules are imported by the commands that use them, so `stats` never loads
+the HTTP stack, and realm lookups are answered from the stored realm directory.
+"""
+import argparse
+import sys
+
+from backend.db import connect
+from backend.metrics import push_metrics
+
+CHAIN_SEPARATOR = "+"
+
+class Session:
+    """State shared by every command in a chain."""
+
+    def __init__(self):
+        self._conn = None
+
+    @property
+    def conn(self):
+        # Opened on first use so API-only chains never touch the database
+        if self._conn is None or self._conn.closed:
+            self._conn = connect()
+        return self._conn
+
+    def close(self):
+        if self._conn is not None and not self._conn.closed:
+            self._conn.close()
+        self._conn = None
+
+# ============================================================================
+# COMMANDS
+# Each takes (args, session) and returns True on success.
+# ============================================================================
+
+def cmd_stats(args, session):
+    from backend.cleanup import get_stats
+    return get_stats(exact=args.exact, conn=session.conn) is not None
+
+def cmd_preview(args, session):
+    from backend.cleanup import preview_cleanup_impact
+    return preview_cleanup_impact(exact=args.exact, conn=session.conn)
+
+def cmd_backup(args, session):
+    from backend.cleanup import create_backup
+    return create_backup(conn=session.conn) is not None
+
+def cmd_backups(args, session):
+    from backend.cleanup import list_backups
+    return list_backups(conn=session.conn) is not None
+
+def cmd_restore(args, session):
+    from backend.cleanup import restore_backup
+    return restore_backup(args.table, conn=session.conn)
+
+def cmd_delete_backup(args, session):
+    from backend.cleanup import delete_backup
+    return delete_backup(args.table, conn=session.conn)
+
+def cmd_outliers(args, session):
+    from backend.cleanup import remove_outliers
+    return remove_outliers(create_backup_first=not args.no_backup, conn=session.conn)
+
+def cmd_daily(args, session):
+    from backend.cleanup import cleanup_daily_data
+    return cleanup_daily_data(create_backup_first=not args.no_backup, conn=session.conn)
+
+def cmd_old(args, session):
+    from backend.cleanup import cleanup_old_data
+    return cleanup_old_data(args.days, create_backup_first=not args.no_backup, conn=session.conn)
+
+def cmd_items(args, session):
+    from backend.update_item_cache import update_all_items, update_missing_items
+    if args.missing_only:
+        update_missing_items(conn=session.conn)
+    else:
+        update_all_items(conn=session.conn)
+    return True
+
+def cmd_realm(args, session):
+    from backend.realms import get_directory
+    directory = get_directory(args.region, conn=session.conn)
+    resolved = directory.resolve_many(args.names)
+    for name, realm_id in resolved.items():
+        print(f"{name}: {realm_id if realm_id is not None else 'no match'}")
+    return None not in resolved.values()
+
+def cmd_realm_search(args, session):
+    from backend.find_realm import get_connected_realm_id, search_realm_by_name
+    if args.slug:
+        realm_id = get_connected_realm_id(args.text, region=args.region, conn=session.conn)
+    else:
+        realm_id = search_realm_by_name(args.text, region=args.region, conn=session.conn)
+    print("Connected realm ID:", realm_id)
+    return realm_id is not None
+
+def cmd_realms(args, session):
+    from backend.find_realm import list_all_realms
+    from backend.realms import get_directory
+    if args.refresh:
+        get_directory(args.region, refresh=True, conn=session.conn)
+    list_all_realms(region=args.region, limit=args.limit, conn=session.conn)
+    return True
+
+def cmd_alerts(args, session):
+    from backend.alerts import deliver_alert_events, list_alert_events
+    if args.deliver:
+        deliver_alert_events(conn=session.conn)
+    pending = list_alert_events(limit=args.limit, pending_only=True, conn=session.conn)
+    print(f"{len(pending)}{'+' if len(pending) == args.limit else ''} undelivered price alerts")
+    for event_id, alert_id, label, item_id, name, unit_price, max_unit_price, snapshot_time, _ in pending:
+        print(f"  #{event_id} alert {alert_id} ({label or '-'}): {name or item_id} at {unit_price / 10000:.2f}g "
+              f"<= {max_unit_price / 10000:.2f}g, {snapshot_time:%Y-%m-%d %H:%M}")
+    return True
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m backend",
+        description=f"Operational commands. Chain several with '{CHAIN_SEPARATOR}' to run them on one connection.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True, metavar="command")
+
+    def add(name, handler, help):
+        command = commands.add_parser(name, help=help, description=help)
+        command.set_defaults(handler=handler)
+        return command
+
+    add("stats", cmd_stats, "Show auction_history statistics").add_argument(
+        "--exact", action="store_true", help="Count by scanning the table (also resyncs the daily counters)")
+    add("preview", cmd_preview, "Show what the cleanup commands would delete").add_argument(
+        "--exact", action="store_true", help="Count by scanning instead of estimating; includes the MAD check")
+    add("backup", cmd_backup, "Back up auction_history")
+    add("backups", cmd_backups, "List backup tables")
+    add("restore", cmd_restore, "Restore auction_history from a backup").add_argument("table")
+    add("delete-backup", cmd_delete_backup, "Drop a backup table").add_argument("table")
+
+    for name, handler, help in (
+        ("outliers", cmd_outliers, "Remove price outliers from history"),
+        ("daily", cmd_daily, "Keep the lowest price per item and day"),
+        ("old", cmd_old, "Remove history older than DAYS"),
+    ):
+        command = add(name, handler, help)
+        if name == "old":
+            command.add_argument("days", type=int)
+        command.add_argument("--no-backup", action="store_true", help="Skip the backup taken first")
+
+    add("items", cmd_items, "Fill the item name and icon cache").add_argument(
+        "--missing-only", action="store_true", help="Only items missing from the cache")
+
+    alerts = add("alerts", cmd_alerts, "Show undelivered price alerts")
+    alerts.add_argument("--deliver", action="store_true", help="Retry sending them to ALERT_WEBHOOK_URL first")
+    alerts.add_argument("--limit", type=int, default=20)
+
+    realm = add("realm", cmd_realm, "Resolve realm names or slugs to connected realm IDs")
+    realm.add_argument("names", nargs="+", metavar="name")
+    realm_search = add("realm-search", cmd_realm_search, "Search connected realms by name or slug")
+    realm_search.add_argument("text")
+    realm_search.add_argument("--slug", action="store_true", help="Treat TEXT as a realm slug")
+    realms = add("realms", cmd_realms, "List connected realms")
+    realms.add_argument("--limit", type=int, default=20)
+    realms.add_argument("--refresh", action="store_true", help="Refetch the realm directory from the API first")
+    for command in (realm, realm_search, realms):
+        command.add_argument("--region", default="eu")
+
+    return parser
+
+def split_chain(argv):
+    """Splits argv on the chain separator into one argument list per command."""
+    chain = [[]]
+    for arg in argv:
+        if arg == CHAIN_SEPARATOR:
+            chain.append([])
+        else:
+            chain[-1].append(arg)
+    return [segment for segment in chain if segment]
+
+def main(argv=None):
+    parser = build_parser()
+    argv = sys.argv[1:] if argv is None else argv
+    # Parse the whole chain up front so a typo in the last command fails before the first one runs
+    chain = [parser.parse_args(segment) for segment in split_chain(argv) or [["stats"]]]
+
+    session = Session()
+    ok = True
+    try:
+        for args in chain:
+            if len(chain) > 1:
+                print(f"\n=== {args.command} ===")
+            if not args.handler(args, session):
+                print(f"❌ '{args.command}' failed, stopping")
+                ok = False
+                break
+    finally:
+        session.close()
+        push_metrics("cli")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,49 @@
 # backend/config.py
+#
+# Settings are resolved on first access (PEP 562 module __getattr__), so
+# importing this module is free: .env is read only when a setting is first
+# used, and a missing variable fails only the commands that need it
+# (`cleanup stats` runs without Blizzard credentials, realm lookups without a DB).
 
-from dotenv import load_dotenv
 import os
 
-# Load environment variables from .env
-load_dotenv()
+# Required settings: attribute -> environment variable
+REQUIRED = {
+    "API_CLIENT_ID": "BLIZZARD_CLIENT_ID",   # Blizzard API credentials
+    "API_SECRET": "BLIZZARD_SECRET",
+    "DB_URI": "DB_URI",                      # PostgreSQL database URI
+}
 
-# Blizzard API credentials
-API_CLIENT_ID = os.getenv("BLIZZARD_CLIENT_ID")
-API_SECRET = os.getenv("BLIZZARD_SECRET")
+# Blizzard endpoints; {region} is filled in per request. Point these at a local
+# stand-in (python -m backend.mock_blizzard) to run without live credentials.
+OPTIONAL = {
+    "API_BASE_URL": ("BLIZZARD_API_BASE_URL", "https://{region}.api.blizzard.com"),
+    "OAUTH_TOKEN_URL": ("BLIZZARD_OAUTH_URL", "https://{region}.battle.net/oauth/token"),
+}
 
-# PostgreSQL database URI
-DB_URI = os.getenv("DB_URI")
+_env_loaded = False
 
-# Optional: fail fast if any are missing
-if not API_CLIENT_ID or not API_SECRET or not DB_URI:
-    raise ValueError("Missing one or more required environment variables.")
+def load_env():
+    """Loads .env into the environment once. Variables already set win."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+def __getattr__(name):
+    if name in REQUIRED:
+        load_env()
+        value = os.getenv(REQUIRED[name])
+        # Fail fast on first use if it is missing
+        if not value:
+            raise ValueError(f"Missing required environment variable {REQUIRED[name]}.")
+    elif name in OPTIONAL:
+        load_env()
+        env_name, default = OPTIONAL[name]
+        value = os.getenv(env_name, default)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # Cache on the module so later lookups skip __getattr__
+    globals()[name] = value
+    return value
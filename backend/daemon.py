@@ -0,0 +1,416 @@
+"""
+Resident ingestion service, replacing cron + update_data.sh.
+
+One process keeps the OAuth token, HTTP session and database pool warm and
+runs the job graph
+
+    fetch_auctions ─┐
+                    ├─> ingest ─> rollup        (whenever a feed has new data)
+    fetch_commodities┘
+    compaction                                  (daily)
+
+Each feed is polled on its own cadence. A poll only checks the feed's
+Last-Modified (a conditional request, 304 when unchanged); the ingest itself
+streams every feed through backend/pipeline.py, so no snapshot is kept in memory.
+Once a feed changes, the ingest waits up to INGEST_SETTLE_SECONDS for the other
+feeds to change too, polling them more often meanwhile, so feeds refreshing a few
+minutes apart produce one ingest rather than one each. A job never overlaps with itself, and
+ingest, rollup and compaction are serialized in-process and, via a Postgres
+advisory lock, against any other process ingesting into the same database.
+Job timings and health are served as JSON on http://<host>:<port>/health and
+Prometheus metrics on /metrics; --once pushes its metrics like the batch jobs.
+
+Usage:
+    python -m backend.daemon            # run until SIGINT/SIGTERM
+    python -m backend.daemon --once     # fetch, ingest and roll up once, then exit
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Allow running as standalone script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.alerts import deliver_alert_events
+from backend.auth import get_access_token
+from backend.cleanup import cleanup_daily_data, cleanup_old_data, get_stats
+from backend.db import close_pool, get_pool, pooled_connection
+from backend.metrics import CONTENT_TYPE, push_metrics, render_metrics, span
+from backend.pipeline import FEEDS, run_ingest_pipeline
+
+# Poll cadence per feed in seconds. Blizzard refreshes both roughly hourly;
+# polling an unchanged snapshot is cheap because it is never re-ingested.
+FEED_INTERVALS = {
+    "auctions": 3600,
+    "commodities": 3600,
+}
+
+# After the first feed changes, wait this long for the others before ingesting,
+# polling the ones that haven't changed every SETTLE_POLL_SECONDS
+INGEST_SETTLE_SECONDS = 600
+SETTLE_POLL_SECONDS = 30
+
+COMPACTION_INTERVAL = 24 * 3600
+HISTORY_RETENTION_DAYS = 30
+
+HEALTH_HOST = os.getenv("DAEMON_HEALTH_HOST", "127.0.0.1")
+HEALTH_PORT = int(os.getenv("DAEMON_HEALTH_PORT", "8081"))
+
+# Key of the session-level advisory lock held while writing a snapshot
+INGEST_LOCK_ID = 4_711_001
+
+# Scheduler resolution
+TICK_SECONDS = 1.0
+
+def _utc_now():
+    return datetime.now(timezone.utc)
+
+class Job:
+    """A named unit of work with run statistics; concurrent runs are skipped, never queued."""
+
+    def __init__(self, name, func, interval=None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.next_run = 0.0
+        self.lock = threading.Lock()
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_started = None
+        self.last_success = None
+        self.last_duration = None
+        self.last_error = None
+        self.stage_timings = {}
+
+    def due(self, now):
+        return self.interval is not None and now >= self.next_run
+
+    def run(self):
+        """Runs the job unless it is already running. Returns its result, or None on failure/skip."""
+        if not self.lock.acquire(blocking=False):
+            self.skipped += 1
+            print(f"[{self.name}] previous run still in progress, skipping")
+            return None
+        started = time.monotonic()
+        self.last_started = _utc_now()
+        try:
+            with span(f"job:{self.name}"):
+                result = self.func()
+            self.last_success = _utc_now()
+            self.last_error = None
+            return result
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            print(f"[{self.name}] failed: {e}")
+            return None
+        finally:
+            self.runs += 1
+            self.last_duration = time.monotonic() - started
+            self.lock.release()
+            print(f"[{self.name}] finished in {self.last_duration:.2f}s")
+
+    def status(self):
+        return {
+            "interval_seconds": self.interval,
+            "running": self.lock.locked(),
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "last_started": self.last_started.isoformat() if self.last_started else None,
+            "last_success": self.last_success.isoformat() if self.last_success else None,
+            "last_duration_seconds": self.last_duration,
+            "last_error": self.last_error,
+            "stage_timings_seconds": self.stage_timings,
+        }
+
+class IngestionDaemon:
+    def __init__(self, feed_intervals=FEED_INTERVALS, retention_days=HISTORY_RETENTION_DAYS, parallel_workers=None,
+                 settle_seconds=INGEST_SETTLE_SECONDS):
+        self.retention_days = retention_days
+        self.parallel_workers = parallel_workers
+        self.settle_seconds = settle_seconds
+        self.started = _utc_now()
+        self.last_ingest = None
+
+        # Last-Modified per feed: latest seen by a poll, and as of the last ingest
+        self.versions = {}
+        self.ingested_versions = {}
+        self.settle_deadline = None  # Set while changed feeds wait for the others
+
+        self.fetch_jobs = {
+            feed: Job(f"fetch_{feed}", lambda feed=feed: self.fetch_feed(feed), interval)
+            for feed, interval in feed_intervals.items()
+        }
+        self.ingest_job = Job("ingest", self.ingest_snapshot)
+        self.rollup_job = Job("rollup", self.rollup_history)
+        self.compaction_job = Job("compaction", self.compact_history, COMPACTION_INTERVAL)
+
+        # ingest -> rollup runs on one worker at a time; further triggers while it
+        # runs collapse into a single follow-up pass
+        self.state_lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.pipeline_pending = False
+        self.pipeline_running = False
+
+        self.executor = ThreadPoolExecutor(max_workers=len(self.fetch_jobs) + 2, thread_name_prefix="ingest")
+        self.stop_event = threading.Event()
+        self.health_server = None
+
+    @property
+    def jobs(self):
+        return [*self.fetch_jobs.values(), self.ingest_job, self.rollup_job, self.compaction_job]
+
+    # --- Stages ---
+
+    def fetch_feed(self, feed):
+        """Checks one feed for a new snapshot without downloading it. Returns True if it changed."""
+        request, _ = FEEDS[feed]
+        job = self.fetch_jobs[feed]
+        with self.state_lock:
+            known = self.versions.get(feed)
+
+        started = time.monotonic()
+        # Closing the streamed response right away skips the body of a changed snapshot
+        with request(stream=True, if_modified_since=known) as response:
+            unchanged = response.status_code == 304
+            version = known if unchanged else response.headers.get("Last-Modified")
+        job.stage_timings = {"poll": time.monotonic() - started}
+
+        # Without Last-Modified there is no telling, so every poll counts as a change
+        changed = version is None or version != known
+        with self.state_lock:
+            self.versions[feed] = version
+            if changed and self.settle_deadline is None:
+                self.settle_deadline = time.monotonic() + self.settle_seconds
+
+        if changed:
+            print(f"[{job.name}] new snapshot ({version or 'no Last-Modified'})")
+        else:
+            print(f"[{job.name}] snapshot unchanged, nothing to ingest")
+        return changed
+
+    def ingest_snapshot(self):
+        """Streams every feed into a new snapshot. Returns True if something was written."""
+        with self.state_lock:
+            if None not in self.versions.values() and self.versions == self.ingested_versions:
+                return False
+
+        with self.write_lock, pooled_connection() as conn, advisory_lock(conn, INGEST_LOCK_ID):
+            metrics = run_ingest_pipeline(tuple(self.fetch_jobs), conn=conn, parallel_workers=self.parallel_workers)
+            self.ingest_job.stage_timings = {name: stage["busy_seconds"] for name, stage in metrics["stages"].items()}
+
+        # Webhooks can be slow; send them once the write lock is released
+        with pooled_connection() as conn:
+            deliver_alert_events(conn)
+
+        with self.state_lock:
+            # What was actually downloaded, which may be newer than the last poll saw
+            self.versions.update(metrics["versions"])
+            self.ingested_versions = dict(self.versions)
+            self.last_ingest = _utc_now()
+        return True
+
+    def rollup_history(self):
+        with self.write_lock, pooled_connection() as conn, advisory_lock(conn, INGEST_LOCK_ID):
+            if not cleanup_daily_data(create_backup_first=False, conn=conn):
+                raise RuntimeError("daily rollup failed, see log above")
+        return True
+
+    def compact_history(self):
+        with self.write_lock, pooled_connection() as conn, advisory_lock(conn, INGEST_LOCK_ID):
+            if not cleanup_old_data(self.retention_days, create_backup_first=True, conn=conn):
+                raise RuntimeError("compaction failed, see log above")
+        return True
+
+    # --- Scheduling ---
+
+    def _moved(self, feed):
+        version = self.versions.get(feed)
+        return version is None or version != self.ingested_versions.get(feed)
+
+    def schedule_ingest(self, now):
+        """
+        Starts the ingest once every feed has changed since the last one or the
+        settle window has passed. Until then, feeds that haven't changed are
+        polled every SETTLE_POLL_SECONDS.
+        """
+        with self.state_lock:
+            if self.settle_deadline is None:
+                return
+            waiting = [feed for feed in self.fetch_jobs if not self._moved(feed)]
+            if len(waiting) == len(self.fetch_jobs):
+                # An ingest already picked the changes up
+                self.settle_deadline = None
+                return
+            if waiting and now < self.settle_deadline:
+                for feed in waiting:
+                    job = self.fetch_jobs[feed]
+                    job.next_run = min(job.next_run, now + SETTLE_POLL_SECONDS)
+                return
+            self.settle_deadline = None
+        self.trigger_pipeline()
+
+    def trigger_pipeline(self):
+        with self.state_lock:
+            self.pipeline_pending = True
+            if self.pipeline_running:
+                return
+            self.pipeline_running = True
+        self.executor.submit(self.run_pipeline)
+
+    def run_pipeline(self):
+        while True:
+            with self.state_lock:
+                if not self.pipeline_pending:
+                    self.pipeline_running = False
+                    return
+                self.pipeline_pending = False
+            if self.ingest_job.run():
+                self.rollup_job.run()
+
+    def warm_up(self):
+        """Authenticates and opens the pool up front so the first job doesn't pay for it."""
+        get_access_token()
+        get_pool()
+
+    def run_forever(self):
+        self.warm_up()
+        self.start_health_server()
+        print(f"Ingestion daemon started, health on http://{HEALTH_HOST}:{HEALTH_PORT}/health")
+
+        # First compaction a full interval after startup, not immediately
+        self.compaction_job.next_run = time.monotonic() + COMPACTION_INTERVAL
+
+        while not self.stop_event.is_set():
+            now = time.monotonic()
+            self.schedule_ingest(now)
+            for job in self.jobs:
+                if job.due(now):
+                    job.next_run = now + job.interval
+                    self.executor.submit(job.run)
+            self.stop_event.wait(TICK_SECONDS)
+
+        print("Stopping ingestion daemon...")
+        self.executor.shutdown(wait=True)
+        if self.health_server:
+            self.health_server.shutdown()
+        close_pool()
+
+    def run_once(self):
+        """Fetches every feed concurrently, then ingests and rolls up once."""
+        self.warm_up()
+        futures = [self.executor.submit(job.run) for job in self.fetch_jobs.values()]
+        wait(futures)
+        # Every feed has been polled, so there is nothing to wait for
+        if any(future.result() for future in futures):
+            with self.state_lock:
+                self.settle_deadline = None
+            self.trigger_pipeline()
+        self.executor.shutdown(wait=True)
+
+        failed = [job.name for job in self.jobs if job.last_error]
+        close_pool()
+        return not failed and self.last_ingest is not None
+
+    def stop(self, *_):
+        self.stop_event.set()
+
+    # --- Health ---
+
+    def health(self):
+        """'ok' while a snapshot was ingested within two poll intervals (or startup is that recent)."""
+        max_age = 2 * max((job.interval for job in self.fetch_jobs.values()), default=3600)
+        age = (_utc_now() - (self.last_ingest or self.started)).total_seconds()
+        return {
+            "status": "ok" if age <= max_age else "stale",
+            "started": self.started.isoformat(),
+            "last_ingest": self.last_ingest.isoformat() if self.last_ingest else None,
+            "jobs": {job.name: job.status() for job in self.jobs},
+        }
+
+    def start_health_server(self):
+        daemon = self
+
+        class HealthHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.rstrip("/")
+                if path == "/metrics":
+                    self.send_body(200, render_metrics().encode("utf-8"), CONTENT_TYPE)
+                    return
+                if path not in ("/health", ""):
+                    self.send_error(404)
+                    return
+                health = daemon.health()
+                self.send_body(200 if health["status"] == "ok" else 503, json.dumps(health).encode("utf-8"),
+                               "application/json")
+
+            def send_body(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep health probes out of the ingest log
+
+        self.health_server = ThreadingHTTPServer((HEALTH_HOST, HEALTH_PORT), HealthHandler)
+        threading.Thread(target=self.health_server.serve_forever, name="health", daemon=True).start()
+
+@contextmanager
+def advisory_lock(conn, key):
+    """Holds a Postgres session-level advisory lock; raises if another session has it."""
+    cur = conn.cursor()
+    cur.execute("SELECT pg_try_advisory_lock(%s)", (key,))
+    if not cur.fetchone()[0]:
+        cur.close()
+        raise RuntimeError("another process is writing to the database, skipping this run")
+    conn.commit()
+    try:
+        yield
+    finally:
+        conn.rollback()
+        cur.execute("SELECT pg_advisory_unlock(%s)", (key,))
+        conn.commit()
+        cur.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="WoW auction house ingestion daemon")
+    parser.add_argument("--once", action="store_true", help="Fetch, ingest and roll up once, then exit")
+    parser.add_argument("--retention-days", type=int, default=HISTORY_RETENTION_DAYS,
+                        help="Days of history kept by the daily compaction")
+    parser.add_argument("--parallel", type=int, nargs="?", const=os.cpu_count(), default=None, metavar="WORKERS",
+                        help="Parse large feeds across a process pool (default: one worker per CPU)")
+    parser.add_argument("--settle-seconds", type=int, default=INGEST_SETTLE_SECONDS,
+                        help="After one feed changes, wait this long for the others before ingesting")
+    for feed, interval in FEED_INTERVALS.items():
+        parser.add_argument(f"--{feed}-interval", type=int, default=interval, metavar="SECONDS",
+                            help=f"Poll cadence of the {feed} feed")
+    args = parser.parse_args()
+
+    intervals = {feed: getattr(args, f"{feed}_interval") for feed in FEED_INTERVALS}
+    daemon = IngestionDaemon(feed_intervals=intervals, retention_days=args.retention_days,
+                             parallel_workers=args.parallel, settle_seconds=args.settle_seconds)
+
+    if args.once:
+        ok = daemon.run_once()
+        get_stats()
+        push_metrics("daemon")
+        sys.exit(0 if ok else 1)
+
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    daemon.run_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+
+from backend import config
+from backend.profiling import connect_kwargs
+
+# Long-running processes (the ingestion daemon) keep this many connections warm
+POOL_MIN_CONNECTIONS = 1
+POOL_MAX_CONNECTIONS = 4
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def connect():
+    """Opens a connection to DB_URI, with query profiling if QUERY_PROFILING is on."""
+    return psycopg2.connect(config.DB_URI, **connect_kwargs())
+
+def get_pool():
+    """Returns the process-wide connection pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadedConnectionPool(POOL_MIN_CONNECTIONS, POOL_MAX_CONNECTIONS, config.DB_URI, **connect_kwargs())
+        return _pool
+
+@contextmanager
+def pooled_connection():
+    """
+    Borrows a connection from the pool and returns it afterwards.
+    Uncommitted work is rolled back so the next borrower starts clean;
+    broken connections are discarded instead of being returned.
+    """
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        broken = bool(conn.closed)
+        if not broken:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+        pool.putconn(conn, close=broken)
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
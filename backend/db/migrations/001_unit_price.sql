@@ -0,0 +1,38 @@
+-- Backfill unit_price for databases created before the column existed.
+-- Run once after applying models.sql:
+--   psql wowauction < backend/db/migrations/001_unit_price.sql
+--
+-- Regular auctions store the stack total in buyout, so unit price is buyout / quantity.
+-- Commodity rows were stored as unit_price * quantity, so the division is exact for them.
+-- History is updated in batches of 50,000 rows to keep each transaction and its WAL small.
+
+UPDATE auctions
+SET unit_price = buyout / GREATEST(quantity, 1)
+WHERE unit_price IS NULL;
+
+DO $$
+DECLARE
+    batch_size CONSTANT INTEGER := 50000;
+    updated INTEGER;
+BEGIN
+    LOOP
+        UPDATE auction_history
+        SET unit_price = buyout / GREATEST(quantity, 1)
+        WHERE id IN (
+            SELECT id FROM auction_history
+            WHERE unit_price IS NULL
+            LIMIT batch_size
+        );
+        GET DIAGNOSTICS updated = ROW_COUNT;
+        EXIT WHEN updated = 0;
+        COMMIT;
+        RAISE NOTICE 'Backfilled % auction_history rows', updated;
+    END LOOP;
+END $$;
+
+ALTER TABLE auctions ALTER COLUMN unit_price SET NOT NULL;
+ALTER TABLE auction_history ALTER COLUMN unit_price SET NOT NULL;
+
+-- Refresh visibility map and planner statistics so the covering indexes can serve index-only scans
+VACUUM ANALYZE auctions;
+VACUUM ANALYZE auction_history;
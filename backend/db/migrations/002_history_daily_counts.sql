@@ -0,0 +1,18 @@
+-- Seed auction_history_daily_counts for databases that already have history.
+-- Run once after applying models.sql (which creates the table and its triggers):
+--   psql wowauction < backend/db/migrations/002_history_daily_counts.sql
+--
+-- The table is locked against writes while it is rebuilt, so rows archived by a
+-- concurrent ingest can't be counted twice or missed. `python -m backend stats --exact`
+-- rebuilds it the same way whenever the counters need resyncing.
+
+BEGIN;
+LOCK TABLE auction_history IN SHARE MODE;
+DELETE FROM auction_history_daily_counts;
+INSERT INTO auction_history_daily_counts (day, row_count, item_count)
+SELECT snapshot_time::date, COUNT(*), COUNT(DISTINCT item_id)
+FROM auction_history
+GROUP BY 1;
+COMMIT;
+
+ANALYZE auction_history;
@@ -0,0 +1,13 @@
+-- Replace the (item_id, snapshot_time) history index with one that also covers the
+-- per-snapshot aggregate columns, so trend queries stay index-only scans.
+-- Run once, before applying models.sql again (which would build it while blocking writes):
+--   psql wowauction < backend/db/migrations/003_history_trend_index.sql
+--
+-- CONCURRENTLY builds and drops without blocking ingest, so this must not run in a transaction.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_auction_history_item_trend ON auction_history(item_id, snapshot_time)
+    INCLUDE (unit_price, quantity, buyout, listing_count, total_quantity, min_buyout, max_buyout, max_unit_price);
+DROP INDEX CONCURRENTLY IF EXISTS idx_auction_history_item_time;
+
+-- Refresh the visibility map so the new index can serve index-only scans
+VACUUM ANALYZE auction_history;
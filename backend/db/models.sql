@@ -3,11 +3,14 @@
 -- Current auctions table (last hour only)
 CREATE TABLE IF NOT EXISTS auctions (
     id SERIAL PRIMARY KEY,
+    auction_id BIGINT,       -- Blizzard auction id, stable across snapshots
     item_id INTEGER NOT NULL,
     quantity INTEGER NOT NULL DEFAULT 1,
     buyout BIGINT NOT NULL,  -- Price in copper
+    unit_price BIGINT NOT NULL, -- Price per unit in copper
     time_left TEXT NOT NULL, -- 'SHORT', 'MEDIUM', 'LONG', 'VERY_LONG'
-    last_seen TIMESTAMP NOT NULL DEFAULT NOW()
+    last_seen TIMESTAMP NOT NULL DEFAULT NOW(),
+    is_outlier BOOLEAN NOT NULL DEFAULT FALSE -- Unit price far from the item's median (MAD rule)
 );
 
 -- Historical auctions table (for analytics and trends)
@@ -16,11 +19,60 @@ CREATE TABLE IF NOT EXISTS auction_history (
     item_id INTEGER NOT NULL,
     quantity INTEGER NOT NULL DEFAULT 1,
     buyout BIGINT NOT NULL,  -- Price in copper
+    unit_price BIGINT NOT NULL, -- Price per unit in copper
     time_left TEXT NOT NULL, -- 'SHORT', 'MEDIUM', 'LONG', 'VERY_LONG'
     snapshot_time TIMESTAMP NOT NULL, -- When this snapshot was taken
+    -- The item's whole snapshot; quantity to time_left above are its cheapest listing
+    listing_count INTEGER NOT NULL DEFAULT 1,
+    total_quantity BIGINT,
+    min_buyout BIGINT,
+    max_buyout BIGINT,
+    max_unit_price BIGINT,
     created_at TIMESTAMP NOT NULL DEFAULT NOW()
 );
 
+-- Listing change events (delta-encoded history keyed on Blizzard auction id)
+CREATE TABLE IF NOT EXISTS auction_events (
+    id BIGSERIAL PRIMARY KEY,
+    auction_id BIGINT NOT NULL,
+    item_id INTEGER NOT NULL,
+    event_type TEXT NOT NULL, -- 'appear', 'disappear', 'price_change'
+    quantity INTEGER NOT NULL DEFAULT 1,
+    buyout BIGINT NOT NULL,  -- Price in copper
+    time_left TEXT NOT NULL,
+    snapshot_time TIMESTAMP NOT NULL -- Snapshot in which the change was observed
+);
+
+-- Per-item sales estimates inferred from consecutive snapshots
+CREATE TABLE IF NOT EXISTS item_sales_estimates (
+    id BIGSERIAL PRIMARY KEY,
+    item_id INTEGER NOT NULL,
+    snapshot_time TIMESTAMP NOT NULL, -- Newer snapshot of the compared pair
+    elapsed_hours DOUBLE PRECISION NOT NULL,
+    sold_auctions INTEGER NOT NULL,
+    sold_quantity BIGINT NOT NULL,
+    expired_auctions INTEGER NOT NULL,
+    expired_quantity BIGINT NOT NULL,
+    sales_per_hour DOUBLE PRECISION NOT NULL
+);
+
+-- Robust per-item unit price statistics for each snapshot
+CREATE TABLE IF NOT EXISTS item_price_stats (
+    id BIGSERIAL PRIMARY KEY,
+    item_id INTEGER NOT NULL,
+    snapshot_time TIMESTAMP NOT NULL,
+    listing_count INTEGER NOT NULL,
+    total_quantity BIGINT NOT NULL,
+    min_unit_price DOUBLE PRECISION NOT NULL, -- Cheapest non-outlier unit price
+    p10_unit_price DOUBLE PRECISION NOT NULL, -- Percentiles are weighted by quantity
+    p25_unit_price DOUBLE PRECISION NOT NULL,
+    median_unit_price DOUBLE PRECISION NOT NULL,
+    p75_unit_price DOUBLE PRECISION NOT NULL,
+    p90_unit_price DOUBLE PRECISION NOT NULL,
+    mad_unit_price DOUBLE PRECISION NOT NULL, -- Median absolute deviation
+    outlier_count INTEGER NOT NULL
+);
+
 -- Items table to cache item information
 CREATE TABLE IF NOT EXISTS items (
     item_id INTEGER PRIMARY KEY,
@@ -28,19 +80,163 @@ CREATE TABLE IF NOT EXISTS items (
     icon_url TEXT
 );
 
+-- Realm directory cached by backend/realms.py (refetched after REALM_CACHE_TTL_HOURS)
+CREATE TABLE IF NOT EXISTS realms (
+    region TEXT NOT NULL,
+    realm_id INTEGER NOT NULL,
+    connected_realm_id INTEGER NOT NULL, -- The ID auction endpoints take
+    slug TEXT NOT NULL,
+    name TEXT NOT NULL,
+    fetched_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (region, realm_id)
+);
+
+-- Price alert rules, evaluated against every ingested snapshot (backend/alerts.py)
+CREATE TABLE IF NOT EXISTS price_alerts (
+    id BIGSERIAL PRIMARY KEY,
+    item_id INTEGER NOT NULL,
+    max_unit_price BIGINT NOT NULL, -- Fires at or below this unit price in copper
+    label TEXT, -- Caller's reference, returned with every event
+    active BOOLEAN NOT NULL DEFAULT TRUE,
+    triggered BOOLEAN NOT NULL DEFAULT FALSE, -- At or below the threshold in the latest snapshot
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    last_triggered_at TIMESTAMP
+);
+
+-- One row per alert firing
+CREATE TABLE IF NOT EXISTS alert_events (
+    id BIGSERIAL PRIMARY KEY,
+    alert_id BIGINT NOT NULL REFERENCES price_alerts(id) ON DELETE CASCADE,
+    item_id INTEGER NOT NULL,
+    snapshot_time TIMESTAMP NOT NULL,
+    unit_price BIGINT NOT NULL, -- Cheapest non-outlier unit price in that snapshot
+    max_unit_price BIGINT NOT NULL, -- Threshold at the time it fired
+    delivered_at TIMESTAMP -- Accepted by ALERT_WEBHOOK_URL; NULL while pending
+);
+
+-- auction_history row counts per day, kept current by the triggers below so
+-- `cleanup stats` and `preview` need no full scans (exact counts: --exact)
+CREATE TABLE IF NOT EXISTS auction_history_daily_counts (
+    day DATE PRIMARY KEY,
+    row_count BIGINT NOT NULL,
+    item_count BIGINT NOT NULL -- Distinct items that day; a lower bound until the day is compacted
+);
+
+-- Slow queries captured by backend/profiling.py when QUERY_PROFILE_TABLE=1
+CREATE TABLE IF NOT EXISTS query_profiles (
+    id BIGSERIAL PRIMARY KEY,
+    captured_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    duration_ms DOUBLE PRECISION NOT NULL,
+    query TEXT NOT NULL,
+    params TEXT,
+    source TEXT, -- Calling file:line and function
+    plan JSONB -- EXPLAIN (ANALYZE, BUFFERS) output when sampled
+);
+
+-- Migrations for databases created before the column existed
+ALTER TABLE auctions ADD COLUMN IF NOT EXISTS auction_id BIGINT;
+ALTER TABLE auctions ADD COLUMN IF NOT EXISTS is_outlier BOOLEAN NOT NULL DEFAULT FALSE;
+-- unit_price is backfilled and made NOT NULL by migrations/001_unit_price.sql
+ALTER TABLE auctions ADD COLUMN IF NOT EXISTS unit_price BIGINT;
+ALTER TABLE auction_history ADD COLUMN IF NOT EXISTS unit_price BIGINT;
+-- Rows archived before these existed read as a single listing (NULLs fall back to the listing's values)
+ALTER TABLE auction_history ADD COLUMN IF NOT EXISTS listing_count INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE auction_history ADD COLUMN IF NOT EXISTS total_quantity BIGINT;
+ALTER TABLE auction_history ADD COLUMN IF NOT EXISTS min_buyout BIGINT;
+ALTER TABLE auction_history ADD COLUMN IF NOT EXISTS max_buyout BIGINT;
+ALTER TABLE auction_history ADD COLUMN IF NOT EXISTS max_unit_price BIGINT;
+
 -- Indexes for better performance
-CREATE INDEX IF NOT EXISTS idx_auctions_item_id ON auctions(item_id);
 CREATE INDEX IF NOT EXISTS idx_auctions_last_seen ON auctions(last_seen);
-CREATE INDEX IF NOT EXISTS idx_auctions_buyout ON auctions(buyout);
+-- Covering indexes for lowest-price and trend queries (index-only scans)
+CREATE INDEX IF NOT EXISTS idx_auctions_item_unit_price ON auctions(item_id, unit_price) INCLUDE (quantity, buyout, is_outlier);
+CREATE INDEX IF NOT EXISTS idx_auctions_auction_id ON auctions(auction_id);
+
+CREATE INDEX IF NOT EXISTS idx_auction_history_snapshot_time_id ON auction_history(snapshot_time, id); -- Keyset pagination
+-- Covers every column the trends query reads; migrations/003_history_trend_index.sql builds it without blocking ingest
+CREATE INDEX IF NOT EXISTS idx_auction_history_item_trend ON auction_history(item_id, snapshot_time)
+    INCLUDE (unit_price, quantity, buyout, listing_count, total_quantity, min_buyout, max_buyout, max_unit_price);
+CREATE INDEX IF NOT EXISTS idx_auction_history_item_unit_price ON auction_history(item_id, unit_price);
+
+-- Superseded by the composite indexes above
+DROP INDEX IF EXISTS idx_auctions_item_id;
+DROP INDEX IF EXISTS idx_auctions_buyout;
+DROP INDEX IF EXISTS idx_auction_history_item_id;
+DROP INDEX IF EXISTS idx_auction_history_buyout;
+DROP INDEX IF EXISTS idx_auction_history_snapshot_time;
+DROP INDEX IF EXISTS idx_auction_history_item_time;
+
+CREATE INDEX IF NOT EXISTS idx_auction_events_auction_time ON auction_events(auction_id, snapshot_time);
+CREATE INDEX IF NOT EXISTS idx_auction_events_snapshot_time ON auction_events(snapshot_time);
+CREATE INDEX IF NOT EXISTS idx_auction_events_item_id ON auction_events(item_id);
+
+CREATE INDEX IF NOT EXISTS idx_item_sales_estimates_item_time ON item_sales_estimates(item_id, snapshot_time);
+CREATE INDEX IF NOT EXISTS idx_item_sales_estimates_snapshot_time ON item_sales_estimates(snapshot_time); -- Retention
+CREATE INDEX IF NOT EXISTS idx_item_price_stats_item_time ON item_price_stats(item_id, snapshot_time);
+CREATE INDEX IF NOT EXISTS idx_item_price_stats_snapshot_time ON item_price_stats(snapshot_time);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_realms_region_slug ON realms(region, slug);
+CREATE INDEX IF NOT EXISTS idx_price_alerts_item_id ON price_alerts(item_id) WHERE active;
+CREATE INDEX IF NOT EXISTS idx_alert_events_alert_id ON alert_events(alert_id);
+CREATE INDEX IF NOT EXISTS idx_alert_events_pending ON alert_events(id) WHERE delivered_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_query_profiles_captured_at ON query_profiles(captured_at);
+
+-- Statement-level triggers with transition tables: one grouped update per
+-- INSERT/DELETE/COPY statement, not per row
+CREATE OR REPLACE FUNCTION auction_history_counts_insert() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO auction_history_daily_counts AS c (day, row_count, item_count)
+    SELECT snapshot_time::date, COUNT(*), COUNT(DISTINCT item_id)
+    FROM new_rows
+    GROUP BY 1
+    ON CONFLICT (day) DO UPDATE
+    SET row_count = c.row_count + EXCLUDED.row_count,
+        item_count = GREATEST(c.item_count, EXCLUDED.item_count);
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION auction_history_counts_delete() RETURNS trigger AS $$
+BEGIN
+    UPDATE auction_history_daily_counts c
+    SET row_count = c.row_count - d.removed,
+        item_count = LEAST(c.item_count, c.row_count - d.removed)
+    FROM (SELECT snapshot_time::date AS day, COUNT(*) AS removed FROM old_rows GROUP BY 1) d
+    WHERE c.day = d.day;
+    DELETE FROM auction_history_daily_counts WHERE row_count <= 0;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION auction_history_counts_truncate() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM auction_history_daily_counts;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
 
-CREATE INDEX IF NOT EXISTS idx_auction_history_item_id ON auction_history(item_id);
-CREATE INDEX IF NOT EXISTS idx_auction_history_snapshot_time ON auction_history(snapshot_time);
-CREATE INDEX IF NOT EXISTS idx_auction_history_buyout ON auction_history(buyout);
+DROP TRIGGER IF EXISTS auction_history_counts_insert ON auction_history;
+CREATE TRIGGER auction_history_counts_insert AFTER INSERT ON auction_history
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION auction_history_counts_insert();
+DROP TRIGGER IF EXISTS auction_history_counts_delete ON auction_history;
+CREATE TRIGGER auction_history_counts_delete AFTER DELETE ON auction_history
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION auction_history_counts_delete();
+DROP TRIGGER IF EXISTS auction_history_counts_truncate ON auction_history;
+CREATE TRIGGER auction_history_counts_truncate AFTER TRUNCATE ON auction_history
+    FOR EACH STATEMENT EXECUTE FUNCTION auction_history_counts_truncate();
 
 -- Comments for documentation
 COMMENT ON TABLE auctions IS 'Stores current auction house data (last hour only)';
-COMMENT ON TABLE auction_history IS 'Stores historical auction data for analytics and trends';
+COMMENT ON TABLE auction_history IS 'Stores one row per item per snapshot: its cheapest listing plus listing count, quantity and price range';
+COMMENT ON TABLE auction_events IS 'Stores listing appear/disappear/price-change events; replaying them reconstructs any past snapshot';
+COMMENT ON TABLE item_sales_estimates IS 'Stores likely-sold vs expired listing counts per item between consecutive snapshots';
+COMMENT ON TABLE item_price_stats IS 'Stores quantity-weighted unit price percentiles and MAD outlier counts per item per snapshot';
 COMMENT ON TABLE items IS 'Caches item names and icons to avoid repeated API calls';
+COMMENT ON TABLE realms IS 'Caches the connected realm directory per region for offline slug and name lookups';
+COMMENT ON TABLE price_alerts IS 'Stores price alert rules; triggered tracks the last snapshot so a rule fires once per drop';
+COMMENT ON TABLE alert_events IS 'Stores fired price alerts and their webhook delivery state';
+COMMENT ON TABLE auction_history_daily_counts IS 'Per-day auction_history row counts maintained by triggers, for scan-free statistics';
+COMMENT ON TABLE query_profiles IS 'Slow statements captured by the opt-in query profiler, with sampled plans';
 COMMENT ON COLUMN auctions.buyout IS 'Price in copper (1 gold = 10000 copper)';
+COMMENT ON COLUMN auctions.unit_price IS 'Price per unit in copper; commodities report it directly, regular auctions use buyout / quantity';
 COMMENT ON COLUMN auctions.time_left IS 'Auction duration: SHORT, MEDIUM, LONG, VERY_LONG';
 COMMENT ON COLUMN auction_history.snapshot_time IS 'Timestamp when this auction snapshot was taken';
+COMMENT ON COLUMN auction_history.listing_count IS 'Listings of the item in the snapshot, outliers included; total_quantity likewise';
+COMMENT ON COLUMN auction_history.max_unit_price IS 'Highest non-outlier unit price in the snapshot; min_buyout and max_buyout likewise';
+COMMENT ON COLUMN auction_events.event_type IS 'appear: new listing, disappear: listing gone (values as last seen), price_change: buyout or quantity changed';
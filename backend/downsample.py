@@ -0,0 +1,53 @@
+import numpy as np
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Args:
+        x (np.ndarray): strictly increasing x values (e.g. epoch seconds)
+        y (np.ndarray): y values, same length as x
+        n_out (int): number of points to keep, at least 3
+
+    The first and last points are always kept. The remaining points are split
+    into n_out - 2 equal buckets, and from each bucket the point forming the
+    largest triangle with the previously kept point and the mean of the next
+    bucket is selected, which preserves peaks and dips that averaging would
+    flatten. Triangle areas are computed for a whole bucket at once; only the
+    walk over buckets is sequential, because each choice depends on the last.
+
+    Returns a sorted int64 array of the selected indices.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n, dtype=np.int64)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bucket boundaries over the interior points 1 .. n-2
+    edges = np.floor(np.linspace(1, n - 1, n_out - 1)).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+
+    # Mean of every bucket, precomputed with cumulative sums; the point after
+    # the last bucket is the final point itself
+    cum_x = np.concatenate(([0.0], np.cumsum(x)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+    sizes = ends - starts
+    mean_x = np.append((cum_x[ends] - cum_x[starts]) / sizes, x[-1])
+    mean_y = np.append((cum_y[ends] - cum_y[starts]) / sizes, y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = starts[i], ends[i]
+        ax, ay = x[a], y[a]
+        cx, cy = mean_x[i + 1], mean_y[i + 1]
+        areas = np.abs((ax - cx) * (y[start:end] - ay) - (ax - x[start:end]) * (cy - ay))
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+
+    return selected
@@ -0,0 +1,145 @@
+"""
+Snapshot-completed events, from the ingest job to browsers.
+
+finalize_snapshot() publishes a NOTIFY on SNAPSHOT_CHANNEL in the ingest
+transaction, so it is delivered only once the snapshot is committed. The API
+process keeps one LISTEN connection on a background thread; for each snapshot
+it looks up the items whose listings changed, builds their summaries once and
+hands the event to every connected /api/events stream. Clients then update the
+changed items in place instead of re-fetching full responses.
+"""
+import asyncio
+import select
+import threading
+import time
+
+import orjson
+
+from backend.db import connect
+
+SNAPSHOT_CHANNEL = "auction_snapshots"
+
+# Seconds between LISTEN connection checks, and before reconnecting after an error
+LISTEN_POLL_SECONDS = 5
+RECONNECT_DELAY = 5
+
+# Events buffered per stream; a client this far behind skips to the newest
+SUBSCRIBER_QUEUE_SIZE = 4
+
+def publish_snapshot(cur):
+    """
+    Queues the snapshot-completed notification for the staged snapshot. Postgres
+    delivers it when the caller commits, and drops it on rollback.
+    """
+    cur.execute("""
+        WITH snapshot AS (
+            SELECT MAX(last_seen) AS snapshot_time, COUNT(*) AS listings FROM incoming_auctions
+        )
+        SELECT pg_notify(%s, json_build_object(
+            'snapshot_time', s.snapshot_time,
+            'listings', s.listings,
+            'changed_items', (SELECT COUNT(DISTINCT item_id) FROM auction_events e WHERE e.snapshot_time = s.snapshot_time)
+        )::text)
+        FROM snapshot s
+    """, (SNAPSHOT_CHANNEL,))
+
+class SnapshotEvent:
+    """One snapshot's changes, with each item's summary encoded once for all streams."""
+
+    def __init__(self, meta, items, removed_item_ids):
+        self.id = meta["snapshot_time"]
+        self.meta = orjson.dumps(meta)[:-1]  # Left open for the item lists
+        self.items = items  # item_id -> encoded summary
+        self.removed_item_ids = removed_item_ids
+        self._unfiltered = None
+
+    def render(self, item_ids=None):
+        """The event in SSE framing, limited to item_ids when given."""
+        if item_ids is None:
+            if self._unfiltered is None:
+                self._unfiltered = self._frame(self.items.values(), self.removed_item_ids)
+            return self._unfiltered
+        items = [self.items[i] for i in item_ids if i in self.items]
+        return self._frame(items, [i for i in self.removed_item_ids if i in item_ids])
+
+    def _frame(self, items, removed):
+        data = self.meta + b',"items":[' + b",".join(items) + b'],"removed_item_ids":' + orjson.dumps(removed) + b"}"
+        return b"id: " + self.id.encode() + b"\nevent: snapshot\ndata: " + data + b"\n\n"
+
+class SnapshotBroadcaster:
+    """
+    Listens for snapshot notifications on a dedicated connection and fans the
+    resulting events out to asyncio queues, one per connected client.
+    build_event(conn, payload) turns a notification payload into a SnapshotEvent.
+    """
+
+    def __init__(self, build_event):
+        self.build_event = build_event
+        self.last_event = None
+        self._subscribers = set()
+        self._loop = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, loop):
+        self._loop = loop
+        self._thread = threading.Thread(target=self._listen, name="snapshot-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=LISTEN_POLL_SECONDS + 1)
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    def _publish(self, event):
+        # Runs on the event loop thread
+        self.last_event = event
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def _handle(self, conn, payload):
+        started = time.perf_counter()
+        event = self.build_event(conn, payload)
+        self._loop.call_soon_threadsafe(self._publish, event)
+        print(f"Snapshot {payload['snapshot_time']}: {len(event.items)} changed items "
+              f"to {len(self._subscribers)} streams in {time.perf_counter() - started:.2f}s")
+
+    def _listen(self):
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = connect()
+                conn.autocommit = True
+                cur = conn.cursor()
+                cur.execute(f"LISTEN {SNAPSHOT_CHANNEL}")
+                cur.close()
+                print(f"Listening for snapshots on {SNAPSHOT_CHANNEL}")
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], LISTEN_POLL_SECONDS) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        try:
+                            self._handle(conn, orjson.loads(notify.payload))
+                        except Exception as e:
+                            # One bad snapshot must not stop the stream; a lost connection still reconnects
+                            if conn.closed:
+                                raise
+                            print(f"Error handling snapshot notification, skipped: {e}")
+            except Exception as e:
+                print(f"Snapshot listener error, reconnecting in {RECONNECT_DELAY}s: {e}")
+                self._stop.wait(RECONNECT_DELAY)
+            finally:
+                if conn is not None:
+                    conn.close()
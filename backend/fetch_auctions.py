@@ -1,44 +1,61 @@
 import sys
 import os
-import requests
 
 # Allow running as standalone script
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.api_client import get_client
 from backend.auth import get_access_token
+from backend.config import API_BASE_URL
+from backend.metrics import span
 
-BASE_URL = "https://eu.api.blizzard.com"
+BASE_URL = API_BASE_URL.format(region="eu")
 NAMESPACE = "dynamic-eu"
 LOCALE = "en_US"
 CONNECTED_REALM_ID = 3674  # Twisting Nether (EU)
 
-def fetch_auction_data(realm_id=CONNECTED_REALM_ID):
+def request_auction_data(realm_id=CONNECTED_REALM_ID, stream=False, if_modified_since=None):
+    """
+    Sends the auctions request for a connected realm and returns the response.
+    With stream=True the body is not downloaded yet (see backend/pipeline.py).
+    With if_modified_since (a Last-Modified value) an unchanged snapshot
+    returns 304 Not Modified instead of raising.
+    """
     access_token = get_access_token()
     url = f"{BASE_URL}/data/wow/connected-realm/{realm_id}/auctions"
 
     headers = {
         "Authorization": f"Bearer {access_token}"
     }
+    if if_modified_since:
+        headers["If-Modified-Since"] = if_modified_since
     params = {
         "namespace": NAMESPACE,
         "locale": LOCALE
     }
 
     print("Requesting:", url)
-    response = requests.get(url, headers=headers, params=params)
+    response = get_client().get(url, headers=headers, params=params, stream=stream)
 
     print("Full request URL:", response.url)
     print("Status code:", response.status_code)
 
-    if response.status_code == 200:
-        data = response.json()
-        print("Fetched auctions:", len(data.get("auctions", [])))
-        return data
-    else:
-        print("Error response:", response.text)
+    if response.status_code != 200 and not (if_modified_since and response.status_code == 304):
+        with response:
+            print("Error response:", response.text)
         raise Exception(f"Failed to fetch auction data: {response.status_code}")
+    return response
+
+def fetch_auction_data(realm_id=CONNECTED_REALM_ID):
+    with span("download:auctions") as s:
+        response = request_auction_data(realm_id)
+        s["bytes"] = len(response.content)
+    data = response.json()
+    print("Fetched auctions:", len(data.get("auctions", [])))
+    return data
 
 if __name__ == "__main__":
     from backend.process_data import process_auction_data
+    from backend.alerts import deliver_alert_events
     from backend.to_database import insert_auctions
 
     raw_data = fetch_auction_data()
@@ -47,5 +64,5 @@ if __name__ == "__main__":
     print("Sample cleaned auction:", cleaned[0] if cleaned else "No entries")
     print("Total processed auctions:", len(cleaned))
 
-    if cleaned:
-        insert_auctions(cleaned)
\ No newline at end of file
+    if cleaned and insert_auctions(cleaned):
+        deliver_alert_events()
\ No newline at end of file
@@ -1,24 +1,27 @@
 import sys
 import os
-import requests
 from datetime import datetime, timezone
 
 # Allow importing backend modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+from backend.alerts import deliver_alert_events
+from backend.api_client import get_client
 from backend.auth import get_access_token
+from backend.config import API_BASE_URL
+from backend.metrics import span
 from backend.to_database import insert_auctions
 
-BASE_URL = "https://eu.api.blizzard.com"
+BASE_URL = API_BASE_URL.format(region="eu")
 NAMESPACE = "dynamic-eu"
 LOCALE = "en_US"
 
-def fetch_commodities(return_data=False):
+def request_commodity_data(stream=False, if_modified_since=None):
     """
-    Fetch commodity auctions.
-    
-    Args:
-        return_data (bool): If True, return processed data instead of inserting to database
+    Sends the region-wide commodities request and returns the response.
+    With stream=True the body is not downloaded yet (see backend/pipeline.py).
+    With if_modified_since (a Last-Modified value) an unchanged snapshot
+    returns 304 Not Modified instead of raising.
     """
     token = get_access_token(region="eu")
     url = f"{BASE_URL}/data/wow/auctions/commodities"
@@ -26,6 +29,8 @@ def fetch_commodities(return_data=False):
     headers = {
         "Authorization": f"Bearer {token}"
     }
+    if if_modified_since:
+        headers["If-Modified-Since"] = if_modified_since
 
     params = {
         "namespace": NAMESPACE,
@@ -33,48 +38,81 @@ def fetch_commodities(return_data=False):
     }
 
     print("Requesting:", url)
-    response = requests.get(url, headers=headers, params=params)
+    response = get_client().get(url, headers=headers, params=params, stream=stream)
 
     print("Status code:", response.status_code)
-    if response.status_code != 200:
-        print("Error response:", response.text)
+    if response.status_code != 200 and not (if_modified_since and response.status_code == 304):
+        with response:
+            print("Error response:", response.text)
         raise Exception(f"Failed to fetch commodity data: {response.status_code}")
+    return response
 
+def fetch_commodity_data():
+    """Downloads the raw region-wide commodities snapshot."""
+    with span("download:commodities") as s:
+        response = request_commodity_data()
+        s["bytes"] = len(response.content)
     data = response.json()
-    auctions = data.get("auctions", [])
+    print("Fetched commodity auctions:", len(data.get("auctions", [])))
+    return data
+
+def process_commodity(auction, now):
+    """Converts one commodity listing to an auction entry, or None if it has no unit price."""
+    # Commodities use unit_price instead of buyout
+    unit_price = auction.get("unit_price")
+    if not unit_price:
+        return None  # skip listings without unit price
+
+    # Calculate total buyout price (unit_price * quantity)
+    quantity = auction.get("quantity", 1)
+    total_buyout = unit_price * quantity
+
+    return {
+        "auction_id": auction["id"],
+        "item_id": auction["item"]["id"],
+        "quantity": quantity,
+        "buyout": total_buyout,  # Store total price in buyout field
+        "unit_price": unit_price,
+        "time_left": auction.get("time_left", "UNKNOWN"),
+        "last_seen": now
+    }
 
-    print("Fetched commodity auctions:", len(auctions))
+def process_commodity_data(raw_data):
+    """
+    Extracts auction entries from a commodities API response, in the same
+    shape as process_auction_data.
+    """
+    auctions = raw_data.get("auctions", [])
 
     # Process commodities data - note the different structure
     processed = []
     now = datetime.now(timezone.utc)  # Use timezone-aware datetime
 
-    for auction in auctions:
-        # Commodities use unit_price instead of buyout
-        unit_price = auction.get("unit_price")
-        if not unit_price:
-            continue  # skip listings without unit price
-
-        # Calculate total buyout price (unit_price * quantity)
-        quantity = auction.get("quantity", 1)
-        total_buyout = unit_price * quantity
-
-        entry = {
-            "item_id": auction["item"]["id"],
-            "quantity": quantity,
-            "buyout": total_buyout,  # Store total price in buyout field
-            "time_left": auction.get("time_left", "UNKNOWN"),
-            "last_seen": now
-        }
-        processed.append(entry)
+    with span("parse:commodities") as s:
+        for auction in auctions:
+            entry = process_commodity(auction, now)
+            if entry is not None:
+                processed.append(entry)
+        s["rows"] = len(processed)
 
     print("Processed commodity auctions:", len(processed))
+    return processed
+
+def fetch_commodities(return_data=False):
+    """
+    Fetch commodity auctions.
+    
+    Args:
+        return_data (bool): If True, return processed data instead of inserting to database
+    """
+    processed = process_commodity_data(fetch_commodity_data())
     
     if return_data:
         return processed
     else:
         if processed:
-            insert_auctions(processed)
+            if insert_auctions(processed):
+                deliver_alert_events()
         else:
             print("No valid commodity auctions found to insert")
 
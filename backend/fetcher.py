@@ -4,41 +4,32 @@ import os
 # Allow importing backend modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from backend.to_database import insert_auctions
+from backend.alerts import deliver_alert_events
+from backend.metrics import push_metrics
+from backend.pipeline import run_ingest_pipeline
 
-# Import the existing fetch functions
-from backend.fetch_auctions import fetch_auction_data
-from backend.process_data import process_auction_data
-from backend.fetch_commodities import fetch_commodities
+def fetch_all_auctions(parallel_workers=None):
+    """
+    Fetch both regular auctions and commodities and replace the current snapshot.
+    Downloading, parsing and loading overlap (see backend/pipeline.py).
 
-def fetch_all_auctions():
-    """Fetch both regular auctions and commodities."""
+    Args:
+        parallel_workers (int): parse each feed across this many processes
+    """
     print("=== Starting complete auction data fetch ===")
     
     try:
-        # Fetch regular auctions using existing script
-        print("Fetching regular auctions...")
-        raw_regular_data = fetch_auction_data()
-        regular_auctions = process_auction_data(raw_regular_data)
-        print(f"Processed {len(regular_auctions)} regular auctions")
-        
-        # Fetch commodity auctions using existing script
-        print("Fetching commodity auctions...")
-        # We need to modify the commodities script to return data instead of inserting
-        commodity_auctions = fetch_commodities(return_data=True)
-        print(f"Processed {len(commodity_auctions)} commodity auctions")
-        
-        # Combine all auctions
-        all_auctions = regular_auctions + commodity_auctions
+        metrics = run_ingest_pipeline(parallel_workers=parallel_workers)
+        deliver_alert_events()
         
         print(f"\n=== Summary ===")
-        print(f"Regular auctions: {len(regular_auctions)}")
-        print(f"Commodity auctions: {len(commodity_auctions)}")
-        print(f"Total auctions: {len(all_auctions)}")
+        for feed in ("auctions", "commodities"):
+            stage = metrics["stages"].get(f"parse:{feed}")
+            if stage:
+                print(f"{feed.capitalize()} processed: {stage['count']}")
+        print(f"Total auctions: {metrics['rows']}")
         
-        if all_auctions:
-            # Insert all auctions into database (this will archive old data first)
-            insert_auctions(all_auctions)
+        if metrics["rows"]:
             print("✅ All auction data successfully updated!")
         else:
             print("❌ No auction data found to insert")
@@ -48,4 +39,13 @@ def fetch_all_auctions():
         raise
 
 if __name__ == "__main__":
-    fetch_all_auctions() 
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fetch and ingest the current auction house snapshot")
+    parser.add_argument("--parallel", type=int, nargs="?", const=os.cpu_count(), default=None, metavar="WORKERS",
+                        help="Parse large feeds across a process pool (default: one worker per CPU)")
+    args = parser.parse_args()
+    try:
+        fetch_all_auctions(parallel_workers=args.parallel)
+    finally:
+        push_metrics("fetcher") 
\ No newline at end of file
@@ -1,25 +1,29 @@
-import requests
-import psycopg2
+from backend.api_client import get_client
 from backend.auth import get_access_token
-from backend.config import DB_URI
+from backend.config import API_BASE_URL
+from backend.db import connect
 
-BASE_URL = "https://eu.api.blizzard.com"
+BASE_URL = API_BASE_URL.format(region="eu")
 NAMESPACE = "static-eu"
 LOCALE = "en_US"
 
-def get_or_fetch_item_name(item_id, region="eu"):
+def get_or_fetch_item_name(item_id, region="eu", conn=None):
     """
     Returns (name, icon_url) for item_id.
     Uses local DB cache or Blizzard API if missing.
+    Pass conn to reuse an open connection across many lookups.
     """
-    conn = psycopg2.connect(DB_URI)
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
     cur = conn.cursor()
     cur.execute("SELECT name, icon_url FROM items WHERE item_id = %s", (item_id,))
     result = cur.fetchone()
 
     if result:
         cur.close()
-        conn.close()
+        if own_conn:
+            conn.close()
         return result  # (name, icon_url)
 
     token = get_access_token(region)
@@ -29,11 +33,12 @@ def get_or_fetch_item_name(item_id, region="eu"):
     headers = {"Authorization": f"Bearer {token}"}
     params = {"namespace": NAMESPACE, "locale": LOCALE}
 
-    item_resp = requests.get(item_url, headers=headers, params=params)
+    item_resp = get_client().get(item_url, headers=headers, params=params)
     if item_resp.status_code != 200:
         print(f"Failed to fetch item {item_id}")
         cur.close()
-        conn.close()
+        if own_conn:
+            conn.close()
         return ("Unknown Item", None)
 
     item_data = item_resp.json()
@@ -43,7 +48,7 @@ def get_or_fetch_item_name(item_id, region="eu"):
     media_url = item_data.get("media", {}).get("key", {}).get("href")
     icon_url = None
     if media_url:
-        media_resp = requests.get(media_url, headers=headers)
+        media_resp = get_client().get(media_url, headers=headers)
         if media_resp.status_code == 200:
             media_data = media_resp.json()
             icon_url = next(
@@ -62,7 +67,8 @@ def get_or_fetch_item_name(item_id, region="eu"):
         print("DB insert error:", e)
 
     cur.close()
-    conn.close()
+    if own_conn:
+        conn.close()
     
     # Return the fetched data
     return (name, icon_url)
\ No newline at end of file
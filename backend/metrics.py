@@ -0,0 +1,231 @@
+"""
+Timing spans and Prometheus metrics for ingest, cleanup and the API.
+
+A small in-process registry rendered in the Prometheus text format (0.0.4):
+
+    with span("archive") as s:          # duration histogram per stage
+        cur.execute(...)
+        s["rows"] = cur.rowcount        # counted in wowauction_stage_rows_total
+
+    with query_timer("trends"):         # DB query duration histogram
+        cur.execute(TRENDS_SQL, ...)
+
+The API serves the registry on /metrics and the daemon on its health port.
+Batch jobs (fetcher, cleanup, item cache) call push_metrics(job) when they
+finish, which PUTs to a Pushgateway if PUSHGATEWAY_URL is set and/or writes
+<job>.prom into METRICS_TEXTFILE_DIR for node_exporter's textfile collector.
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from backend.config import load_env
+
+PREFIX = "wowauction_"
+
+# Seconds; covers sub-millisecond index lookups up to multi-minute ingests
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+load_env()
+PUSHGATEWAY_URL = os.getenv("PUSHGATEWAY_URL")
+METRICS_TEXTFILE_DIR = os.getenv("METRICS_TEXTFILE_DIR")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in (*zip(names, values), *extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = PREFIX + name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+    def _render_samples(self, items):
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _render_samples(self, items):
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, (("le", _format_value(float(bound))),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key, (("le", "+Inf"),))
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            plain = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{plain} {_format_value(float(total))}")
+            lines.append(f"{self.name}_count{plain} {count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+def counter(name, help, labels=()):
+    return REGISTRY.register(Counter(name, help, labels))
+
+def gauge(name, help, labels=()):
+    return REGISTRY.register(Gauge(name, help, labels))
+
+def histogram(name, help, labels=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, help, labels, buckets))
+
+STAGE_DURATION = histogram("stage_duration_seconds", "Wall time of ingest and cleanup stages", ("stage",))
+STAGE_LAST_DURATION = gauge("stage_last_duration_seconds", "Wall time of the most recent run of a stage", ("stage",))
+STAGE_FAILURES = counter("stage_failures_total", "Stage runs that raised", ("stage",))
+STAGE_ROWS = counter("stage_rows_total", "Rows handled by a stage", ("stage",))
+STAGE_BYTES = counter("stage_bytes_total", "Bytes handled by a stage (downloads)", ("stage",))
+STAGE_LAST_SUCCESS = gauge("stage_last_success_timestamp_seconds", "Unix time a stage last completed", ("stage",))
+QUERY_DURATION = histogram("db_query_duration_seconds", "Duration of database queries, by query name", ("query",))
+HTTP_DURATION = histogram("http_request_duration_seconds", "API request duration", ("method", "route", "status"))
+
+def record_stage(stage, seconds, rows=None, bytes=None):
+    """Records one successful run of a stage timed elsewhere (e.g. by the ingest pipeline)."""
+    STAGE_DURATION.observe(seconds, stage=stage)
+    STAGE_LAST_DURATION.set(seconds, stage=stage)
+    STAGE_LAST_SUCCESS.set(time.time(), stage=stage)
+    if rows is not None:
+        STAGE_ROWS.inc(max(rows, 0), stage=stage)
+    if bytes is not None:
+        STAGE_BYTES.inc(bytes, stage=stage)
+
+@contextmanager
+def span(stage):
+    """
+    Times a stage. The yielded dict can carry "rows" and "bytes", which are
+    added to the stage's counters when the span closes successfully.
+    """
+    result = {}
+    started = time.perf_counter()
+    try:
+        yield result
+    except BaseException:
+        elapsed = time.perf_counter() - started
+        STAGE_DURATION.observe(elapsed, stage=stage)
+        STAGE_LAST_DURATION.set(elapsed, stage=stage)
+        STAGE_FAILURES.inc(stage=stage)
+        raise
+    record_stage(stage, time.perf_counter() - started, result.get("rows"), result.get("bytes"))
+
+@contextmanager
+def query_timer(query):
+    """Records how long the enclosed database query (execute + fetch) took."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        QUERY_DURATION.observe(time.perf_counter() - started, query=query)
+
+def render_metrics():
+    return REGISTRY.render()
+
+def push_metrics(job):
+    """
+    Exports the registry at the end of a batch job: to the Pushgateway at
+    PUSHGATEWAY_URL and/or as METRICS_TEXTFILE_DIR/wowauction_<job>.prom.
+    Failures are reported but never fail the job.
+    """
+    body = render_metrics()
+    if PUSHGATEWAY_URL:
+        # Imported here so batch jobs without a Pushgateway don't pay for requests
+        import requests
+
+        try:
+            response = requests.put(f"{PUSHGATEWAY_URL.rstrip('/')}/metrics/job/{job}", data=body.encode("utf-8"),
+                                    headers={"Content-Type": CONTENT_TYPE}, timeout=10)
+            if response.status_code >= 300:
+                print(f"Pushgateway rejected metrics: {response.status_code} {response.text[:200]}")
+        except requests.RequestException as e:
+            print(f"Could not push metrics: {e}")
+    if METRICS_TEXTFILE_DIR:
+        path = os.path.join(METRICS_TEXTFILE_DIR, f"wowauction_{job}.prom")
+        try:
+            # Write then rename so the collector never reads a partial file
+            with open(path + ".tmp", "w") as f:
+                f.write(body)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"Could not write metrics file: {e}")
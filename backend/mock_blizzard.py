@@ -0,0 +1,275 @@
+"""
+Local stand-in for the Blizzard endpoints this project calls, serving data from
+backend/synthetic.py, so fetch and ingest can be exercised and benchmarked
+offline and reproducibly.
+
+    python -m backend.mock_blizzard --port 8090 --items 50000 \\
+        --listings 1000000 --commodity-listings 300000 --latency-ms 50 --error-rate 0.02
+
+    export BLIZZARD_API_BASE_URL=http://127.0.0.1:8090
+    export BLIZZARD_OAUTH_URL=http://127.0.0.1:8090/oauth/token
+    export BLIZZARD_CLIENT_ID=mock BLIZZARD_SECRET=mock
+    python -m backend.fetcher
+
+Served endpoints:
+    POST /oauth/token
+    GET  /data/wow/connected-realm/{id}/auctions
+    GET  /data/wow/auctions/commodities
+    GET  /data/wow/item/{id}
+    GET  /data/wow/media/item/{id}
+    GET  /data/wow/search/connected-realm
+    GET  /data/wow/connected-realm/index
+    GET  /data/wow/connected-realm/{id}
+    POST /mock/advance              (move to the next snapshot)
+    POST /mock/webhook              (stand-in for ALERT_WEBHOOK_URL; GET lists what it received)
+
+The snapshot index advances every --snapshot-seconds. The auction feeds send
+Last-Modified and answer a matching If-Modified-Since with 304. Injected errors
+are 429 (with Retry-After) or 503 responses, chosen at random.
+"""
+import argparse
+import gzip
+import json
+import random
+import re
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from backend.synthetic import SyntheticCatalog
+
+REALMS = [
+    {"id": 3674, "name": "Twisting Nether", "slug": "twisting-nether"},
+    {"id": 1084, "name": "Tarren Mill", "slug": "tarren-mill"},
+    {"id": 1403, "name": "Draenor", "slug": "draenor"},
+    {"id": 1305, "name": "Kazzak", "slug": "kazzak"},
+    {"id": 3391, "name": "Silvermoon", "slug": "silvermoon"},
+    {"id": 1092, "name": "Ravencrest", "slug": "ravencrest"},
+]
+
+MOCK_TOKEN = "mock-access-token"
+
+# Streaming writes so large payloads go out in pieces like a real response
+WRITE_CHUNK_BYTES = 256 * 1024
+
+class MockBlizzard:
+    """Configuration and payload cache shared by all request handlers."""
+
+    def __init__(self, items=20000, listings=100000, commodity_listings=50000, seed=0,
+                 latency_ms=0, error_rate=0.0, snapshot_seconds=3600):
+        self.catalog = SyntheticCatalog(items=items, seed=seed)
+        self.listings = {"auctions": listings, "commodities": commodity_listings}
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.snapshot_seconds = snapshot_seconds
+        self.started = time.time()
+        self.offset = 0
+        self.requests = 0
+        self.errors_injected = 0
+        self.webhook_deliveries = []
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def snapshot_index(self):
+        return int((time.time() - self.started) // self.snapshot_seconds) + self.offset
+
+    def advance(self):
+        with self._lock:
+            self.offset += 1
+        return self.snapshot_index()
+
+    def payload(self, feed, base_url):
+        """(raw, gzipped, last_modified) for the current snapshot, built once per snapshot."""
+        index = self.snapshot_index()
+        key = (feed, index, base_url)
+        with self._lock:
+            if key not in self._cache:
+                raw = self.catalog.payload(index, self.listings[feed], feed, base_url=base_url)
+                last_modified = formatdate(self.started + index * self.snapshot_seconds, usegmt=True)
+                # Keep only the current snapshot of each feed
+                for stale in [k for k in self._cache if k[0] == feed]:
+                    del self._cache[stale]
+                self._cache[key] = (raw, gzip.compress(raw, compresslevel=1), last_modified)
+            return self._cache[key]
+
+def make_handler(mock):
+    class MockBlizzardHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        @property
+        def base_url(self):
+            return f"http://{self.headers.get('Host', '127.0.0.1')}"
+
+        def send_json(self, status, data, extra_headers=None):
+            self.send_body(status, json.dumps(data).encode("utf-8"), extra_headers=extra_headers)
+
+        def send_body(self, status, body, gzipped=None, extra_headers=None):
+            headers = dict(extra_headers or {})
+            if "gzip" in self.headers.get("Accept-Encoding", ""):
+                body = gzipped if gzipped is not None else gzip.compress(body, compresslevel=1)
+                headers["Content-Encoding"] = "gzip"
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json;charset=UTF-8")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            for start in range(0, len(body), WRITE_CHUNK_BYTES):
+                self.wfile.write(body[start:start + WRITE_CHUNK_BYTES])
+
+        def send_snapshot(self, feed):
+            raw, gzipped, last_modified = mock.payload(feed, self.base_url)
+            if self.headers.get("If-Modified-Since") == last_modified:
+                self.send_response(304)
+                self.send_header("Last-Modified", last_modified)
+                self.end_headers()
+                return
+            self.send_body(200, raw, gzipped, {"Last-Modified": last_modified})
+
+        def inject(self):
+            """Applies latency and error injection. Returns True if an error was sent."""
+            mock.requests += 1
+            if mock.latency_ms:
+                time.sleep(mock.latency_ms * random.uniform(0.5, 1.5) / 1000)
+            if mock.error_rate and random.random() < mock.error_rate:
+                mock.errors_injected += 1
+                if random.random() < 0.5:
+                    self.send_json(429, {"code": 429, "type": "BLZWEBAPI00000429", "detail": "Too Many Requests"},
+                                   extra_headers={"Retry-After": "1"})
+                else:
+                    self.send_json(503, {"code": 503, "detail": "Service Unavailable"})
+                return True
+            return False
+
+        def authorized(self, query):
+            return (self.headers.get("Authorization") == f"Bearer {MOCK_TOKEN}"
+                    or query.get("access_token", [None])[0] == MOCK_TOKEN)
+
+        def do_POST(self):
+            path = urlsplit(self.path).path
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if path == "/mock/advance":
+                self.send_json(200, {"snapshot": mock.advance()})
+                return
+            if path == "/mock/webhook":
+                mock.webhook_deliveries.append(json.loads(body or b"null"))
+                self.send_json(200, {"received": len(mock.webhook_deliveries)})
+                return
+            if self.inject():
+                return
+            if path.endswith("/oauth/token"):
+                self.send_json(200, {"access_token": MOCK_TOKEN, "token_type": "bearer", "expires_in": 86399})
+            else:
+                self.send_json(404, {"code": 404, "detail": "Not Found"})
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            path = url.path
+            query = parse_qs(url.query)
+            if path == "/mock/status":
+                self.send_json(200, {"snapshot": mock.snapshot_index(), "requests": mock.requests,
+                                     "errors_injected": mock.errors_injected})
+                return
+            if path == "/mock/webhook":
+                self.send_json(200, {"deliveries": mock.webhook_deliveries})
+                return
+            if self.inject():
+                return
+            if not self.authorized(query):
+                self.send_json(401, {"code": 401, "detail": "Unauthorized"})
+                return
+
+            if re.fullmatch(r"/data/wow/connected-realm/\d+/auctions", path):
+                self.send_snapshot("auctions")
+            elif path == "/data/wow/auctions/commodities":
+                self.send_snapshot("commodities")
+            elif match := re.fullmatch(r"/data/wow/item/(\d+)", path):
+                item = mock.catalog.item_payload(int(match.group(1)), base_url=self.base_url)
+                if item:
+                    self.send_json(200, item)
+                else:
+                    self.send_json(404, {"code": 404, "detail": "Not Found"})
+            elif match := re.fullmatch(r"/data/wow/media/item/(\d+)", path):
+                item_id = int(match.group(1))
+                self.send_json(200, {"assets": [{"key": "icon", "value": f"{self.base_url}/icons/{item_id}.jpg",
+                                                 "file_data_id": item_id}], "id": item_id})
+            elif path == "/data/wow/search/connected-realm":
+                slug = query.get("realms.slug", [None])[0]
+                name = query.get("realms.name.en_US", [None])[0]
+                matches = [
+                    realm for realm in REALMS
+                    if (slug and realm["slug"] == slug) or (name and name.lower() in realm["name"].lower())
+                ]
+                self.send_json(200, {"page": 1, "pageSize": len(matches), "results": [
+                    {"data": self.realm_data(realm)} for realm in matches
+                ]})
+            elif path == "/data/wow/connected-realm/index":
+                self.send_json(200, {"connected_realms": [
+                    {"href": f"{self.base_url}/data/wow/connected-realm/{realm['id']}?namespace=dynamic-eu"}
+                    for realm in REALMS
+                ]})
+            elif match := re.fullmatch(r"/data/wow/connected-realm/(\d+)", path):
+                realm = next((r for r in REALMS if r["id"] == int(match.group(1))), None)
+                if realm:
+                    self.send_json(200, self.realm_data(realm))
+                else:
+                    self.send_json(404, {"code": 404, "detail": "Not Found"})
+            else:
+                self.send_json(404, {"code": 404, "detail": "Not Found"})
+
+        def realm_data(self, realm):
+            return {
+                "id": realm["id"],
+                "realms": [{"id": realm["id"], "name": {"en_US": realm["name"]}, "slug": realm["slug"]}],
+                "auctions": {"href": f"{self.base_url}/data/wow/connected-realm/{realm['id']}/auctions"},
+            }
+
+    return MockBlizzardHandler
+
+def start_mock_server(host="127.0.0.1", port=0, **options):
+    """
+    Starts the mock server on a background thread. port=0 picks a free port.
+    Returns (server, mock); the base URL is http://{host}:{server.server_address[1]}.
+    """
+    mock = MockBlizzard(**options)
+    server = ThreadingHTTPServer((host, port), make_handler(mock))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-blizzard", daemon=True).start()
+    return server, mock
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Blizzard API stand-in serving synthetic data")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--items", type=int, default=20000, help="Catalog size")
+    parser.add_argument("--listings", type=int, default=100000, help="Listings in the realm auctions feed")
+    parser.add_argument("--commodity-listings", type=int, default=50000, help="Listings in the commodities feed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Mean added latency per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 429/503")
+    parser.add_argument("--snapshot-seconds", type=float, default=3600, help="How often the feeds change")
+    args = parser.parse_args()
+
+    server, mock = start_mock_server(
+        host=args.host, port=args.port, items=args.items, listings=args.listings,
+        commodity_listings=args.commodity_listings, seed=args.seed, latency_ms=args.latency_ms,
+        error_rate=args.error_rate, snapshot_seconds=args.snapshot_seconds,
+    )
+    base_url = f"http://{args.host}:{server.server_address[1]}"
+    print(f"Mock Blizzard API on {base_url} ({args.items:,} items, "
+          f"{args.listings:,} + {args.commodity_listings:,} listings)")
+    print(f"  export BLIZZARD_API_BASE_URL={base_url}")
+    print(f"  export BLIZZARD_OAUTH_URL={base_url}/oauth/token")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Parallel parsing of large auction payloads.
+
+The raw response body is copied once into shared memory and split into
+segments on listing boundaries. Worker processes decode their segment and
+write the parsed columns straight into a shared output buffer, so neither the
+payload nor the parsed rows are ever pickled between processes; a worker only
+returns the number of rows it wrote.
+"""
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Codes used in the time_left column; same order as _TIME_LEFT_SQL in backend/sales.py
+TIME_LEFT_NAMES = np.array(["SHORT", "MEDIUM", "LONG", "VERY_LONG", "UNKNOWN"])
+_TIME_LEFT_CODES = {name: code for code, name in enumerate(TIME_LEFT_NAMES.tolist())}
+
+INT_COLUMNS = ("auction_id", "item_id", "quantity", "buyout", "unit_price")
+
+# Payloads below this size are parsed in-process; pool start-up would dominate
+PARALLEL_MIN_BYTES = 8 << 20
+
+# Blizzard serializes listings compactly with "id" first, so this only occurs
+# between two top-level listings of the auctions array
+_BOUNDARY = b'},{"id":'
+_ARRAY_KEY = b'"auctions":'
+
+_pool = None
+_pool_workers = None
+
+def get_process_pool(workers=None):
+    """Returns a process pool shared by all parses in this process."""
+    global _pool, _pool_workers
+    workers = workers or os.cpu_count() or 1
+    if _pool is None or _pool_workers != workers:
+        if _pool is not None:
+            _pool.shutdown()
+        # Parses are started from pipeline threads; forking a threaded process is unsafe
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        _pool_workers = workers
+    return _pool
+
+def shutdown_process_pool():
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+        _pool_workers = None
+
+def find_segments(raw, parts):
+    """
+    Splits the auctions array of a raw payload into about `parts` byte ranges
+    that each start at a listing. Returns None if the layout isn't recognised.
+    """
+    key = raw.find(_ARRAY_KEY)
+    if key < 0:
+        return None
+    start = raw.find(b"[", key + len(_ARRAY_KEY))
+    if start < 0 or raw[key + len(_ARRAY_KEY):start].strip():
+        return None
+    start += 1
+
+    bounds = [start]
+    step = max((len(raw) - start) // max(parts, 1), 1)
+    for i in range(1, parts):
+        boundary = raw.find(_BOUNDARY, max(start + i * step, bounds[-1]))
+        if boundary < 0:
+            break
+        boundary += 2  # Point at the opening brace of the next listing
+        if boundary > bounds[-1]:
+            bounds.append(boundary)
+    bounds.append(len(raw))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def _column_views(buf, capacity):
+    """Column arrays laid out back to back in one buffer of capacity rows."""
+    views = {}
+    offset = 0
+    for name in INT_COLUMNS:
+        views[name] = np.ndarray((capacity,), dtype=np.int64, buffer=buf, offset=offset)
+        offset += capacity * 8
+    views["time_left"] = np.ndarray((capacity,), dtype=np.int8, buffer=buf, offset=offset)
+    return views
+
+def _buffer_size(capacity):
+    return max(capacity * (8 * len(INT_COLUMNS) + 1), 1)
+
+def _empty_columns(capacity):
+    columns = {name: np.empty(capacity, dtype=np.int64) for name in INT_COLUMNS}
+    columns["time_left"] = np.empty(capacity, dtype=np.int8)
+    return columns
+
+def _store(auction, commodities, out, row):
+    """
+    Writes one listing to row `row` of the column arrays, applying the same
+    rules as process_auction / process_commodity. Returns 1 if kept, else 0.
+    """
+    quantity = auction.get("quantity", 1)
+    if commodities:
+        unit_price = auction.get("unit_price")
+        if not unit_price:
+            return 0
+        buyout = unit_price * quantity
+    else:
+        buyout = auction.get("buyout")
+        if buyout is None:
+            return 0
+        unit_price = buyout // max(quantity, 1)
+
+    out["auction_id"][row] = auction["id"]
+    out["item_id"][row] = auction["item"]["id"]
+    out["quantity"][row] = quantity
+    out["buyout"][row] = buyout
+    out["unit_price"][row] = unit_price
+    out["time_left"][row] = _TIME_LEFT_CODES.get(auction.get("time_left", "UNKNOWN"), _TIME_LEFT_CODES["UNKNOWN"])
+    return 1
+
+def parse_segment(text, kind, out, offset):
+    """
+    Decodes the listings in `text` (a slice of the auctions array starting at a
+    listing) into the column arrays `out` from row `offset` on. Returns the
+    number of rows written.
+    """
+    decoder = json.JSONDecoder()
+    commodities = kind == "commodities"
+    row = offset
+    pos = 0
+    end = len(text)
+    while pos < end:
+        char = text[pos]
+        if char in " \t\r\n,":
+            pos += 1
+            continue
+        if char == "]":
+            break
+        auction, pos = decoder.raw_decode(text, pos)
+        row += _store(auction, commodities, out, row)
+    return row - offset
+
+def _parse_shared_segment(input_name, start, end, kind, output_name, capacity, offset):
+    """Worker entry point: parses raw[start:end] into the shared output buffer."""
+    source = shared_memory.SharedMemory(name=input_name)
+    target = shared_memory.SharedMemory(name=output_name)
+    try:
+        text = bytes(source.buf[start:end]).decode("utf-8")
+        out = _column_views(target.buf, capacity)
+        written = parse_segment(text, kind, out, offset)
+        del out
+        return written
+    finally:
+        source.close()
+        target.close()
+
+def parse_serial(raw, kind):
+    """Parses a whole payload in-process into columns."""
+    auctions = json.loads(raw).get("auctions", [])
+    out = _empty_columns(len(auctions))
+    commodities = kind == "commodities"
+    row = 0
+    for auction in auctions:
+        row += _store(auction, commodities, out, row)
+    return {name: column[:row] for name, column in out.items()}
+
+def parse_auctions_parallel(raw, kind, workers=None):
+    """
+    Parses a raw auctions or commodities payload into a dict of column arrays
+    (auction_id, item_id, quantity, buyout, unit_price, time_left codes).
+
+    Segments are parsed across the shared process pool. Small payloads, payloads
+    whose layout isn't recognised and any worker failure fall back to a serial
+    in-process parse, so the result never depends on the mode.
+    """
+    workers = workers or os.cpu_count() or 1
+    segments = find_segments(raw, workers * 4) if workers > 1 and len(raw) >= PARALLEL_MIN_BYTES else None
+    if not segments or len(segments) < 2:
+        return parse_serial(raw, kind)
+
+    # Every listing has at least one "id": key, so this bounds the rows per segment
+    capacities = [raw.count(b'"id":', start, end) for start, end in segments]
+    offsets = np.concatenate(([0], np.cumsum(capacities)[:-1])).astype(np.int64)
+    capacity = int(sum(capacities))
+
+    source = shared_memory.SharedMemory(create=True, size=max(len(raw), 1))
+    target = shared_memory.SharedMemory(create=True, size=_buffer_size(capacity))
+    try:
+        source.buf[:len(raw)] = raw
+        try:
+            pool = get_process_pool(workers)
+            futures = [
+                pool.submit(_parse_shared_segment, source.name, start, end, kind, target.name, capacity, int(offset))
+                for (start, end), offset in zip(segments, offsets)
+            ]
+            written = [future.result() for future in futures]
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                # A dead worker breaks the pool for good; the next parse starts a fresh one
+                shutdown_process_pool()
+            print(f"Parallel parse failed ({e}), falling back to serial parse")
+            return parse_serial(raw, kind)
+
+        out = _column_views(target.buf, capacity)
+        columns = {
+            name: np.concatenate([column[offset:offset + n] for offset, n in zip(offsets, written)])
+            for name, column in out.items()
+        }
+        del out
+        return columns
+    finally:
+        source.close()
+        source.unlink()
+        target.close()
+        target.unlink()
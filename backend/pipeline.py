@@ -0,0 +1,386 @@
+"""
+Streaming ingest: download, parse and load run concurrently.
+
+    download(auctions)    --bytes-->  parse(auctions)    --row batches--+
+                                                                        +--> load (COPY) --> finalize
+    download(commodities) --bytes-->  parse(commodities) --row batches--+
+
+Every stage is a thread and stages are connected by bounded queues, so a slow
+stage makes the one feeding it wait instead of letting data pile up in memory.
+Socket reads and libpq COPY release the GIL, so an ingest takes roughly as long
+as its slowest stage rather than the sum of all of them.
+
+With parallel_workers set, a parse stage collects its feed's body while it
+downloads and then parses it across a process pool (backend/parallel_parse.py),
+handing column arrays instead of row dicts to the load stage.
+"""
+import codecs
+import json
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from backend.db import connect
+from backend.fetch_auctions import request_auction_data
+from backend.fetch_commodities import process_commodity, request_commodity_data
+from backend.metrics import record_stage
+from backend.parallel_parse import TIME_LEFT_NAMES, parse_auctions_parallel
+from backend.process_data import process_auction
+from backend.to_database import copy_staged_columns, copy_staged_rows, create_staging_table, finalize_snapshot
+
+# feed -> (request function accepting stream=True, per-auction transform)
+FEEDS = {
+    "auctions": (request_auction_data, process_auction),
+    "commodities": (request_commodity_data, process_commodity),
+}
+
+DOWNLOAD_CHUNK_BYTES = 1 << 20
+BATCH_ROWS = 10000
+
+# Bounded queues give backpressure: at most this many chunks/batches in flight per edge
+QUEUE_DEPTH = 8
+
+# How often blocked stages check whether the pipeline was aborted
+POLL_SECONDS = 0.5
+
+_DONE = object()
+_WHITESPACE = " \t\r\n"
+
+class StageMetrics:
+    """Work done by one stage; busy time excludes time spent waiting on its queues."""
+
+    def __init__(self, name, unit):
+        self.name = name
+        self.unit = unit
+        self.count = 0
+        self.blocked = 0.0
+        self.started = None
+        self.finished = None
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def busy(self):
+        return max(self.elapsed - self.blocked, 0.0)
+
+    def as_dict(self):
+        return {
+            "unit": self.unit,
+            "count": self.count,
+            "elapsed_seconds": self.elapsed,
+            "busy_seconds": self.busy,
+            "blocked_seconds": self.blocked,
+            "per_second": self.count / self.busy if self.busy else None,
+        }
+
+class IngestPipeline:
+    def __init__(self, feeds=tuple(FEEDS), batch_rows=BATCH_ROWS, queue_depth=QUEUE_DEPTH, parallel_workers=None):
+        self.feeds = list(feeds)
+        self.parallel_workers = parallel_workers
+        self.batch_rows = batch_rows
+        self.queue_depth = queue_depth
+        self.snapshot_time = datetime.now(timezone.utc)  # One timestamp for the whole snapshot
+        self.stop = threading.Event()
+        self.errors = []
+        self.metrics = {}
+        self.versions = {}  # feed -> Last-Modified of the downloaded snapshot
+
+    def _stage_metrics(self, name, unit):
+        metrics = StageMetrics(name, unit)
+        self.metrics[name] = metrics
+        return metrics
+
+    def _fail(self, stage, error):
+        self.errors.append(f"{stage}: {error}")
+        print(f"❌ Pipeline stage {stage} failed: {error}")
+        self.stop.set()
+
+    def _put(self, q, item, metrics):
+        """Blocks while the queue is full; gives up if the pipeline was aborted."""
+        started = time.perf_counter()
+        try:
+            while not self.stop.is_set():
+                try:
+                    q.put(item, timeout=POLL_SECONDS)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            metrics.blocked += time.perf_counter() - started
+
+    def _get(self, q, metrics):
+        """Blocks while the queue is empty; returns _DONE if the pipeline was aborted."""
+        started = time.perf_counter()
+        try:
+            while not self.stop.is_set():
+                try:
+                    return q.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    continue
+            return _DONE
+        finally:
+            metrics.blocked += time.perf_counter() - started
+
+    # --- Stages ---
+
+    def download(self, feed, out):
+        metrics = self._stage_metrics(f"download:{feed}", "bytes")
+        metrics.started = time.perf_counter()
+        request, _ = FEEDS[feed]
+        try:
+            with request(stream=True) as response:
+                self.versions[feed] = response.headers.get("Last-Modified")
+                for chunk in response.iter_content(DOWNLOAD_CHUNK_BYTES):
+                    metrics.count += len(chunk)
+                    if not self._put(out, chunk, metrics):
+                        return
+        except Exception as e:
+            self._fail(metrics.name, e)
+        finally:
+            self._put(out, _DONE, metrics)
+            metrics.finished = time.perf_counter()
+
+    def parse(self, feed, inp, out):
+        metrics = self._stage_metrics(f"parse:{feed}", "rows")
+        metrics.started = time.perf_counter()
+        _, process = FEEDS[feed]
+
+        def chunks():
+            while True:
+                chunk = self._get(inp, metrics)
+                if chunk is _DONE:
+                    return
+                yield chunk
+
+        source = chunks()
+        try:
+            if self.parallel_workers:
+                raw = b"".join(source)
+                if self.stop.is_set():
+                    return
+                columns = parse_auctions_parallel(raw, feed, self.parallel_workers)
+                metrics.count += len(columns["item_id"])
+                self._put(out, columns, metrics)
+                return
+
+            batch = []
+            for auction in iter_json_array(source, "auctions"):
+                entry = process(auction, self.snapshot_time)
+                if entry is None:
+                    continue
+                batch.append(entry)
+                if len(batch) >= self.batch_rows:
+                    metrics.count += len(batch)
+                    if not self._put(out, batch, metrics):
+                        return
+                    batch = []
+            if batch:
+                metrics.count += len(batch)
+                self._put(out, batch, metrics)
+            # Let the download stage finish whatever follows the array
+            for _ in source:
+                pass
+        except Exception as e:
+            # A truncated stream after an upstream failure is not a new error
+            if not self.stop.is_set():
+                self._fail(metrics.name, e)
+        finally:
+            self._put(out, _DONE, metrics)
+            metrics.finished = time.perf_counter()
+
+    def load(self, cur, inp, producers):
+        """Runs on the calling thread: COPYs row batches until every parser is done."""
+        metrics = self._stage_metrics("load", "rows")
+        metrics.started = time.perf_counter()
+        create_staging_table(cur, self.snapshot_time)
+        remaining = producers
+        while remaining:
+            batch = self._get(inp, metrics)
+            if batch is _DONE:
+                if self.stop.is_set():
+                    break
+                remaining -= 1
+                continue
+            if isinstance(batch, dict):
+                copy_staged_columns(cur, batch, TIME_LEFT_NAMES)
+                metrics.count += len(batch["item_id"])
+            else:
+                copy_staged_rows(cur, batch)
+                metrics.count += len(batch)
+        metrics.finished = time.perf_counter()
+
+    # --- Driver ---
+
+    def run(self, conn):
+        """
+        Streams every feed into 'incoming_auctions' and replaces the current
+        snapshot. Nothing is committed unless every feed loaded completely.
+        """
+        started = time.perf_counter()
+        rows = queue.Queue(maxsize=self.queue_depth)
+        threads = []
+        for feed in self.feeds:
+            chunks = queue.Queue(maxsize=self.queue_depth)
+            threads.append(threading.Thread(target=self.download, args=(feed, chunks), name=f"download-{feed}"))
+            threads.append(threading.Thread(target=self.parse, args=(feed, chunks, rows), name=f"parse-{feed}"))
+        for thread in threads:
+            thread.start()
+
+        cur = conn.cursor()
+        try:
+            try:
+                self.load(cur, rows, producers=len(self.feeds))
+            except Exception as e:
+                self._fail("load", e)
+
+            if self.errors:
+                raise RuntimeError("; ".join(self.errors))
+
+            finalize = self._stage_metrics("finalize", "rows")
+            finalize.started = time.perf_counter()
+            finalize_snapshot(cur)
+            conn.commit()
+            finalize.count = self.metrics["load"].count
+            finalize.finished = time.perf_counter()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.stop.set()
+            for thread in threads:
+                thread.join()
+            cur.close()
+
+        return {
+            "wall_seconds": time.perf_counter() - started,
+            "rows": self.metrics["load"].count,
+            "stages": {name: m.as_dict() for name, m in self.metrics.items()},
+            "versions": dict(self.versions),
+        }
+
+def run_ingest_pipeline(feeds=tuple(FEEDS), conn=None, parallel_workers=None):
+    """
+    Fetches and ingests the given feeds with overlapped download, parse and load.
+    parallel_workers > 1 parses each feed across that many processes.
+    Returns the run metrics, including each feed's Last-Modified under "versions";
+    raises if any stage failed (nothing is committed then). Alert webhooks are
+    left to the caller, which may still hold its ingest locks.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
+    try:
+        metrics = IngestPipeline(feeds, parallel_workers=parallel_workers).run(conn)
+    finally:
+        if own_conn:
+            conn.close()
+    print_pipeline_metrics(metrics)
+    # Busy time, so stages that spend most of a run waiting on their neighbours don't look slow
+    for name, stage in metrics["stages"].items():
+        counts = {"bytes" if stage["unit"] == "bytes" else "rows": stage["count"]}
+        record_stage(name, stage["busy_seconds"], **counts)
+    record_stage("pipeline", metrics["wall_seconds"], rows=metrics["rows"])
+    return metrics
+
+def print_pipeline_metrics(metrics):
+    print(f"Pipeline ingested {metrics['rows']:,} rows in {metrics['wall_seconds']:.2f}s")
+    print(f"  {'stage':<24}{'busy s':>9}{'blocked s':>11}{'throughput':>22}")
+    for name, stage in metrics["stages"].items():
+        rate = stage["per_second"]
+        if rate is None:
+            throughput = "-"
+        elif stage["unit"] == "bytes":
+            throughput = f"{rate / (1 << 20):,.1f} MiB/s"
+        else:
+            throughput = f"{rate:,.0f} {stage['unit']}/s"
+        print(f"  {name:<24}{stage['busy_seconds']:>9.2f}{stage['blocked_seconds']:>11.2f}{throughput:>22}")
+
+def iter_json_array(chunks, key):
+    """
+    Yields the elements of the array stored under `key` in a top-level JSON
+    object, while the document is still arriving as byte chunks. Besides the
+    element being decoded, only the undecoded tail of the stream is buffered.
+    Everything after the array is ignored.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buf = ""
+    pos = 0
+    exhausted = False
+
+    def fill():
+        nonlocal buf, pos, exhausted
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            text = utf8.decode(b"", final=True)
+        else:
+            text = utf8.decode(chunk)
+        buf = buf[pos:] + text
+        pos = 0
+
+    def peek():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if exhausted:
+                raise ValueError("unexpected end of JSON document")
+            fill()
+
+    def value():
+        nonlocal pos
+        peek()
+        while True:
+            try:
+                result, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if exhausted:
+                    raise
+                fill()
+                continue
+            # A number at the very end of the buffer may continue in the next chunk
+            if end == len(buf) and not exhausted:
+                fill()
+                continue
+            pos = end
+            return result
+
+    def expect(char):
+        nonlocal pos
+        if peek() != char:
+            raise ValueError(f"expected {char!r} at offset {pos} of the current buffer")
+        pos += 1
+
+    expect("{")
+    while True:
+        char = peek()
+        if char == "}":
+            return
+        if char == ",":
+            pos += 1
+            continue
+        name = value()
+        expect(":")
+        if name != key:
+            value()
+            continue
+
+        expect("[")
+        while True:
+            char = peek()
+            if char == "]":
+                return
+            if char == ",":
+                pos += 1
+                continue
+            yield value()
@@ -0,0 +1,154 @@
+import numpy as np
+from psycopg2.extras import execute_values
+
+# Quantity-weighted percentiles stored per item and snapshot
+PERCENTILES = (0.10, 0.25, 0.50, 0.75, 0.90)
+
+# A listing is an outlier when its unit price is more than OUTLIER_MADS robust
+# standard deviations (1.4826 * MAD) away from the item's weighted median.
+# The spread never drops below MIN_RELATIVE_SPREAD of the median, so items where
+# most listings share one price don't flag every small undercut.
+OUTLIER_MADS = 5.0
+MIN_RELATIVE_SPREAD = 0.05
+MAD_SCALE = 1.4826
+
+# Cheap listings are the ones lowest price, history and alerts exist for, so
+# below the median a listing must also be under this fraction of it (bait and
+# typo prices) to be flagged; genuine deals stay visible
+LOW_OUTLIER_FRACTION = 0.1
+
+# Items with fewer listings than this are never flagged
+MIN_LISTINGS_FOR_OUTLIERS = 3
+
+def _weighted_quantiles(group_starts, group_totals, cum_weights, values, fractions):
+    """
+    Per-group weighted quantiles over rows sorted by (group, value).
+    cum_weights is the global inclusive cumulative weight of the sorted rows.
+    """
+    offsets = np.where(group_starts > 0, cum_weights[group_starts - 1], 0)
+    result = []
+    for fraction in fractions:
+        targets = offsets + fraction * group_totals
+        idx = np.searchsorted(cum_weights, targets, side="left")
+        result.append(values[idx])
+    return result
+
+def compute_price_stats(item_ids, quantities, unit_prices):
+    """
+    Computes robust per-item unit price statistics for one snapshot in a single
+    vectorized pass over all listings.
+
+    Args:
+        item_ids, quantities, unit_prices: equally sized int64 arrays, one entry
+            per listing.
+
+    Returns (stats, outlier_mask) where stats is a dict of per-item arrays
+    (item_id, listing_count, total_quantity, min_unit_price, p10, p25, median,
+    p75, p90, mad, outlier_count) and outlier_mask flags listings in input order.
+    """
+    quantities = np.maximum(quantities, 1)
+    unit_prices = unit_prices.astype(np.float64)
+
+    # Sort listings by item, then by unit price
+    order = np.lexsort((unit_prices, item_ids))
+    items_sorted = item_ids[order]
+    prices_sorted = unit_prices[order]
+    qty_sorted = quantities[order].astype(np.float64)
+
+    item_keys, group_starts, listing_counts = np.unique(items_sorted, return_index=True, return_counts=True)
+    group_index = np.repeat(np.arange(len(item_keys)), listing_counts)
+    group_totals = np.add.reduceat(qty_sorted, group_starts) if len(item_keys) else np.zeros(0)
+    cum_qty = np.cumsum(qty_sorted)
+
+    p10, p25, median, p75, p90 = _weighted_quantiles(group_starts, group_totals, cum_qty, prices_sorted, PERCENTILES)
+
+    # Weighted median absolute deviation, second pass sorted by deviation
+    deviations = np.abs(prices_sorted - median[group_index])
+    dev_order = np.lexsort((deviations, group_index))
+    cum_dev_qty = np.cumsum(qty_sorted[dev_order])
+    (mad,) = _weighted_quantiles(group_starts, group_totals, cum_dev_qty, deviations[dev_order], (0.5,))
+
+    spread = np.maximum(MAD_SCALE * mad, MIN_RELATIVE_SPREAD * median)
+    eligible = listing_counts >= MIN_LISTINGS_FOR_OUTLIERS
+    item_median = median[group_index]
+    flaggable = (prices_sorted >= item_median) | (prices_sorted < LOW_OUTLIER_FRACTION * item_median)
+    outlier_sorted = (deviations > OUTLIER_MADS * spread[group_index]) & flaggable & eligible[group_index]
+
+    outlier_mask = np.empty(len(order), dtype=bool)
+    outlier_mask[order] = outlier_sorted
+
+    # Cheapest listing that is not an outlier (the median never is)
+    clean_prices = np.where(outlier_sorted, np.inf, prices_sorted)
+    min_unit_price = np.minimum.reduceat(clean_prices, group_starts) if len(item_keys) else np.zeros(0)
+
+    stats = {
+        "item_id": item_keys,
+        "listing_count": listing_counts,
+        "total_quantity": group_totals.astype(np.int64),
+        "min_unit_price": min_unit_price,
+        "p10": p10,
+        "p25": p25,
+        "median": median,
+        "p75": p75,
+        "p90": p90,
+        "mad": mad,
+        "outlier_count": np.bincount(group_index, weights=outlier_sorted, minlength=len(item_keys)).astype(np.int64),
+    }
+    return stats, outlier_mask
+
+def record_price_stats(cur):
+    """
+    Pipeline stage run at ingest on the staged snapshot in 'incoming_auctions'.
+    Writes per-item statistics to item_price_stats and flags outlier listings
+    via incoming_auctions.is_outlier. Failures are rolled back to a savepoint so
+    they never block the ingest.
+    """
+    cur.execute("SAVEPOINT price_stats")
+    try:
+        cur.execute("SELECT MAX(last_seen) FROM incoming_auctions")
+        snapshot_time = cur.fetchone()[0]
+
+        cur.execute("""
+            SELECT COALESCE(auction_id, -1), item_id, quantity, unit_price
+            FROM incoming_auctions
+        """)
+        rows = cur.fetchall()
+        if not rows:
+            cur.execute("RELEASE SAVEPOINT price_stats")
+            return 0
+
+        data = np.array(rows, dtype=np.int64)
+        stats, outlier_mask = compute_price_stats(data[:, 1], data[:, 2], data[:, 3])
+
+        outlier_ids = [int(a) for a in data[outlier_mask, 0] if a >= 0]
+        if outlier_ids:
+            cur.execute("""
+                UPDATE incoming_auctions SET is_outlier = TRUE
+                WHERE auction_id = ANY(%s)
+            """, (outlier_ids,))
+
+        columns = ("item_id", "listing_count", "total_quantity", "min_unit_price",
+                   "p10", "p25", "median", "p75", "p90", "mad", "outlier_count")
+        stat_rows = [
+            (snapshot_time, int(item_id), int(listing_count), int(total_quantity),
+             float(min_unit_price), float(p10), float(p25), float(median), float(p75),
+             float(p90), float(mad), int(outlier_count))
+            for item_id, listing_count, total_quantity, min_unit_price, p10, p25, median, p75, p90, mad, outlier_count
+            in zip(*(stats[c] for c in columns))
+        ]
+
+        execute_values(cur, """
+            INSERT INTO item_price_stats
+                (snapshot_time, item_id, listing_count, total_quantity, min_unit_price,
+                 p10_unit_price, p25_unit_price, median_unit_price, p75_unit_price,
+                 p90_unit_price, mad_unit_price, outlier_count)
+            VALUES %s
+        """, stat_rows, page_size=5000)
+
+        cur.execute("RELEASE SAVEPOINT price_stats")
+        print(f"Recorded price statistics for {len(stat_rows)} items ({len(outlier_ids)} outlier listings).")
+        return len(stat_rows)
+    except Exception as e:
+        cur.execute("ROLLBACK TO SAVEPOINT price_stats")
+        print(f"Error computing price statistics: {e}")
+        return 0
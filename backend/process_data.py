@@ -1,30 +1,43 @@
-from datetime import datetime
+from datetime import datetime, timezone
+
+from backend.metrics import span
+
+def process_auction(auction, now):
+    """Converts one raw auction to an auction entry, or None for bid-only auctions."""
+    item_id = auction["item"]["id"]
+    quantity = auction.get("quantity", 1)
+    buyout = auction.get("buyout")  # May be None (bidding-only auctions)
+
+    if buyout is None:
+        return None  # Skip if no buyout price
+
+    time_left = auction.get("time_left", "UNKNOWN")
+
+    return {
+        "auction_id": auction["id"],
+        "item_id": item_id,
+        "quantity": quantity,
+        "buyout": buyout,
+        "unit_price": buyout // max(quantity, 1),
+        "time_left": time_left,
+        "last_seen": now
+    }
 
 def process_auction_data(raw_data):
     """
     Extracts a simplified list of auction entries from the full API response.
-    Each entry includes: item_id, quantity, buyout, time_left, last_seen.
+    Each entry includes: auction_id, item_id, quantity, buyout, unit_price, time_left, last_seen.
     """
 
     auctions = raw_data.get("auctions", [])
     processed = []
+    now = datetime.now(timezone.utc)  # One timestamp for the whole snapshot
 
-    for auction in auctions:
-        item_id = auction["item"]["id"]
-        quantity = auction.get("quantity", 1)
-        buyout = auction.get("buyout")  # May be None (bidding-only auctions)
-
-        if buyout is None:
-            continue  # Skip if no buyout price
-
-        time_left = auction.get("time_left", "UNKNOWN")
-
-        processed.append({
-            "item_id": item_id,
-            "quantity": quantity,
-            "buyout": buyout,
-            "time_left": time_left,
-            "last_seen": datetime.utcnow()
-        })
+    with span("parse:auctions") as s:
+        for auction in auctions:
+            entry = process_auction(auction, now)
+            if entry is not None:
+                processed.append(entry)
+        s["rows"] = len(processed)
 
     return processed
@@ -0,0 +1,244 @@
+"""
+Opt-in query profiling for every connection opened through backend.db.
+
+With QUERY_PROFILING=1, connections use ProfilingCursor, which times each
+execute/COPY, keeps per-statement totals for the process and captures
+statements slower than SLOW_QUERY_MS together with their parameters and the
+calling function. A share (EXPLAIN_SAMPLE_RATE) of captured read-only
+statements (no writes, row locks or side-effecting calls such as pg_notify or
+advisory locks) is re-run under EXPLAIN (ANALYZE, BUFFERS) in a savepoint and the
+plan is stored with the capture. That re-executes the query, so keep the rate low.
+
+Captures are appended as JSON lines to QUERY_PROFILE_LOG and, with
+QUERY_PROFILE_TABLE=1, inserted into the query_profiles table. Review them with
+
+    python -m backend.profiling report [--limit 20] [--source table|log]
+"""
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime, timezone
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2 import sql
+
+from backend import config
+
+config.load_env()
+QUERY_PROFILING = os.getenv("QUERY_PROFILING", "0") == "1"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+EXPLAIN_SAMPLE_RATE = float(os.getenv("EXPLAIN_SAMPLE_RATE", "0"))
+QUERY_PROFILE_LOG = os.getenv("QUERY_PROFILE_LOG", "query_profile.log")
+QUERY_PROFILE_TABLE = os.getenv("QUERY_PROFILE_TABLE", "0") == "1"
+
+# Captured statement text and parameters are cut to this many characters
+# (execute_values batches inline thousands of rows)
+MAX_CAPTURE_CHARS = 10000
+
+_WRITE_KEYWORDS = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|TRUNCATE|CREATE|DROP|ALTER|COPY|VACUUM|ANALYZE)\b", re.I)
+# Functions with side effects a SELECT can call (notifications, locks, sequences,
+# settings); statements using them, or locking rows, are never re-run by EXPLAIN ANALYZE
+_VOLATILE_CALLS = re.compile(
+    r"\b(pg_notify|pg_\w*advisory\w*|nextval|setval|set_config|pg_sleep\w*|pg_cancel_backend|pg_terminate_backend"
+    r"|lo_\w+)\s*\(|\bFOR\s+(NO\s+KEY\s+)?(UPDATE|SHARE)\b|\bFOR\s+KEY\s+SHARE\b",
+    re.I,
+)
+_LEADING_COMMENTS = re.compile(r"^\s*(--[^\n]*\n\s*|/\*.*?\*/\s*)*", re.S)
+_WHITESPACE = re.compile(r"\s+")
+
+# Frames from these files are skipped when looking for the calling function
+_INTERNAL_FILES = (os.path.abspath(__file__), os.path.dirname(psycopg2.__file__))
+
+_stats = {}  # statement -> [count, total seconds, max seconds]
+_stats_lock = threading.Lock()
+_log_lock = threading.Lock()
+_table_conn = None
+_table_lock = threading.Lock()
+
+class ProfilingCursor(psycopg2.extensions.cursor):
+    """A cursor that times every statement and captures slow ones."""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        result = super().execute(query, vars)
+        _record(self, query, vars, time.perf_counter() - started)
+        return result
+
+    def copy_expert(self, sql, file, size=8192):
+        started = time.perf_counter()
+        result = super().copy_expert(sql, file, size)
+        _record(self, sql, None, time.perf_counter() - started, explain=False)
+        return result
+
+def connect_kwargs():
+    """Extra psycopg2.connect arguments for the current profiling settings."""
+    return {"cursor_factory": ProfilingCursor} if QUERY_PROFILING else {}
+
+def _query_text(cursor, query):
+    if isinstance(query, sql.Composable):
+        query = query.as_string(cursor.connection)
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    return query
+
+def statement_key(text):
+    """Whitespace-normalized statement, used to aggregate timings."""
+    return _WHITESPACE.sub(" ", text).strip()[:200]
+
+def is_read_only(text):
+    body = _LEADING_COMMENTS.sub("", text).lstrip().upper()
+    return (body.startswith(("SELECT", "WITH"))
+            and not _WRITE_KEYWORDS.search(text) and not _VOLATILE_CALLS.search(text))
+
+def _caller():
+    for frame in reversed(traceback.extract_stack()[:-3]):
+        if not os.path.abspath(frame.filename).startswith(_INTERNAL_FILES):
+            return f"{os.path.relpath(frame.filename)}:{frame.lineno} {frame.name}"
+    return None
+
+def _record(cursor, query, vars, seconds, explain=True):
+    text = _query_text(cursor, query)
+    key = statement_key(text)
+    with _stats_lock:
+        entry = _stats.setdefault(key, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+
+    if seconds * 1000 < SLOW_QUERY_MS:
+        return
+    plan = None
+    if explain and cursor.name is None and random.random() < EXPLAIN_SAMPLE_RATE and is_read_only(text):
+        plan = explain_analyze(cursor.connection, text, vars)
+    capture({
+        "captured_at": datetime.now(timezone.utc).isoformat(),
+        "duration_ms": round(seconds * 1000, 3),
+        "query": text[:MAX_CAPTURE_CHARS],
+        "params": None if vars is None else repr(vars)[:MAX_CAPTURE_CHARS],
+        "source": _caller(),
+        "plan": plan,
+    })
+
+def explain_analyze(conn, text, vars):
+    """
+    Runs EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) for a statement on the caller's
+    connection, inside a savepoint so a failure can't abort the caller's transaction.
+    """
+    cur = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+    in_transaction = not conn.autocommit
+    try:
+        if in_transaction:
+            cur.execute("SAVEPOINT query_profiling")
+        cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + text, vars)
+        plan = cur.fetchone()[0]
+        if in_transaction:
+            cur.execute("RELEASE SAVEPOINT query_profiling")
+        return plan
+    except psycopg2.Error as e:
+        if in_transaction:
+            cur.execute("ROLLBACK TO SAVEPOINT query_profiling")
+        return {"error": str(e).strip()}
+    finally:
+        cur.close()
+
+def capture(record):
+    """Appends a slow-query record to the log file and, if enabled, the query_profiles table."""
+    if QUERY_PROFILE_LOG:
+        try:
+            with _log_lock, open(QUERY_PROFILE_LOG, "a") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+        except OSError as e:
+            print(f"Could not write query profile: {e}")
+    if QUERY_PROFILE_TABLE:
+        _insert_capture(record)
+
+def _insert_capture(record):
+    # A dedicated autocommit connection, so captures survive the caller rolling back
+    global _table_conn
+    with _table_lock:
+        try:
+            if _table_conn is None or _table_conn.closed:
+                _table_conn = psycopg2.connect(config.DB_URI)
+                _table_conn.autocommit = True
+            cur = _table_conn.cursor()
+            cur.execute("""
+                INSERT INTO query_profiles (captured_at, duration_ms, query, params, source, plan)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, (record["captured_at"], record["duration_ms"], record["query"], record["params"],
+                  record["source"], json.dumps(record["plan"]) if record["plan"] is not None else None))
+            cur.close()
+        except psycopg2.Error as e:
+            print(f"Could not store query profile: {e}")
+            _table_conn = None
+
+def query_stats(limit=20):
+    """This process's statements by total time: (statement, count, total s, max s)."""
+    with _stats_lock:
+        rows = [(key, count, total, peak) for key, (count, total, peak) in _stats.items()]
+    return sorted(rows, key=lambda row: row[2], reverse=True)[:limit]
+
+def load_captures(source):
+    if source == "table":
+        conn = psycopg2.connect(config.DB_URI)
+        cur = conn.cursor()
+        try:
+            cur.execute("""
+                SELECT captured_at, duration_ms, query, params, source, plan
+                FROM query_profiles
+                ORDER BY captured_at
+            """)
+            return [
+                {"captured_at": row[0], "duration_ms": row[1], "query": row[2], "params": row[3],
+                 "source": row[4], "plan": row[5]}
+                for row in cur.fetchall()
+            ]
+        finally:
+            cur.close()
+            conn.close()
+    with open(QUERY_PROFILE_LOG) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def print_report(captures, limit):
+    groups = {}
+    for record in captures:
+        groups.setdefault(statement_key(record["query"]), []).append(record)
+    ranked = sorted(groups.items(), key=lambda item: sum(r["duration_ms"] for r in item[1]), reverse=True)
+
+    print(f"{len(captures)} slow queries, {len(groups)} distinct statements\n")
+    for key, records in ranked[:limit]:
+        durations = [r["duration_ms"] for r in records]
+        slowest = max(records, key=lambda r: r["duration_ms"])
+        print(f"{len(records):>5}x  mean {sum(durations) / len(durations):>9.1f} ms  max {max(durations):>9.1f} ms")
+        print(f"       {key[:150]}")
+        print(f"       from {slowest['source']}, params {str(slowest['params'])[:120]}")
+        plans = [r["plan"] for r in records if isinstance(r.get("plan"), list)]
+        if plans:
+            top = plans[-1][0]
+            print(f"       plan: {top['Plan']['Node Type']}, execution {top.get('Execution Time', 0):.1f} ms, "
+                  f"shared hit/read {top['Plan'].get('Shared Hit Blocks', 0)}/{top['Plan'].get('Shared Read Blocks', 0)}")
+        print()
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Review captured slow queries")
+    parser.add_argument("command", choices=["report"])
+    parser.add_argument("--limit", type=int, default=20, help="Statements to show")
+    parser.add_argument("--source", choices=["log", "table"], default="table" if QUERY_PROFILE_TABLE else "log")
+    args = parser.parse_args()
+
+    try:
+        captures = load_captures(args.source)
+    except (OSError, psycopg2.Error) as e:
+        print(f"No captures available from {args.source}: {e}")
+        sys.exit(1)
+    print_report(captures, args.limit)
+
+if __name__ == "__main__":
+    main()
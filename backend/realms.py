@@ -0,0 +1,227 @@
+"""
+Local realm directory: every realm of a region with its slug, name and
+connected realm ID.
+
+The directory is fetched once from the connected-realm index (one request for
+the index plus one per connected realm, run in parallel), stored in the
+`realms` table and refreshed when it is older than REALM_CACHE_TTL_HOURS.
+Lookups then run against an in-memory copy: exact slug, exact name, the slug
+derived from a name ("Al'Akir" -> "alakir"), then the closest slug by difflib
+similarity. Resolving hundreds of realms costs no API calls.
+
+    from backend.realms import resolve_realm, resolve_realms
+    resolve_realm("Twisting Nether")                 # 3674
+    resolve_realms(["tarren-mill", "Kazak", "draenor"])
+"""
+import difflib
+import os
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+from psycopg2.extras import execute_values
+
+from backend import config
+from backend.db import connect
+
+config.load_env()
+# The stored directory is refetched once it is older than this
+REALM_CACHE_TTL_HOURS = float(os.getenv("REALM_CACHE_TTL_HOURS", "24"))
+
+# After a failed refresh the stored directory is served and the fetch retried after this long
+REFRESH_RETRY_SECONDS = 300
+
+# Fuzzy matches scoring below this similarity (0-1) are not accepted
+FUZZY_CUTOFF = 0.8
+
+# Parallel detail requests when fetching the directory; api_client still caps
+# concurrency per host
+FETCH_WORKERS = 8
+
+LOCALE = "en_US"
+
+_directories = {}  # region -> RealmDirectory
+_directories_lock = threading.Lock()
+
+def slugify(name):
+    """Blizzard-style realm slug: "Aggra (Português)" -> "aggra-portugues"."""
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    text = re.sub(r"['’]", "", text.lower())
+    return re.sub(r"[^a-z0-9]+", "-", text).strip("-")
+
+def _expired(fetched_at):
+    return fetched_at is None or time.time() - fetched_at.timestamp() > REALM_CACHE_TTL_HOURS * 3600
+
+class RealmDirectory:
+    """In-memory realm lookup for one region."""
+
+    def __init__(self, region, realms, fetched_at):
+        # realms: [(realm_id, connected_realm_id, slug, name)]
+        self.region = region
+        self.realms = realms
+        self.fetched_at = fetched_at  # Aware datetime of the oldest stored row
+        self.checked_at = time.monotonic()
+        self.by_slug = {realm[2]: realm for realm in realms}
+        self.by_name = {realm[3].casefold(): realm for realm in realms}
+
+    def is_stale(self):
+        """True once the stored rows are past the TTL, checked at most every REFRESH_RETRY_SECONDS."""
+        if time.monotonic() - self.checked_at < REFRESH_RETRY_SECONDS:
+            return False
+        return _expired(self.fetched_at)
+
+    def find(self, text):
+        """
+        The realm for a name or slug, or None. Tries exact slug, exact name and
+        the slugified name before the closest slug by similarity.
+        """
+        text = text.strip()
+        realm = self.by_slug.get(text) or self.by_name.get(text.casefold()) or self.by_slug.get(slugify(text))
+        if realm is None:
+            close = difflib.get_close_matches(slugify(text), self.by_slug, n=1, cutoff=FUZZY_CUTOFF)
+            realm = self.by_slug[close[0]] if close else None
+        return realm
+
+    def search(self, text, limit=10):
+        """Realms whose name or slug contains text, or failing that the closest few."""
+        needle, slug = text.strip().casefold(), slugify(text)
+        matches = [realm for realm in self.realms if needle in realm[3].casefold() or (slug and slug in realm[2])]
+        if not matches:
+            close = difflib.get_close_matches(slug, self.by_slug, n=limit, cutoff=FUZZY_CUTOFF - 0.2)
+            matches = [self.by_slug[match] for match in close]
+        return matches[:limit]
+
+    def resolve(self, text):
+        realm = self.find(text)
+        return realm[1] if realm else None
+
+    def resolve_many(self, texts):
+        """Maps each name or slug to its connected realm ID (None when unknown)."""
+        return {text: self.resolve(text) for text in texts}
+
+# ============================================================================
+# FETCH AND STORE
+# ============================================================================
+
+def fetch_realms(region="eu"):
+    """Fetches every realm of a region from the connected-realm index: [(realm_id, connected_id, slug, name)]."""
+    from backend.api_client import get_client
+    from backend.auth import get_access_token
+
+    token = get_access_token(region)
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {"namespace": f"dynamic-{region}", "locale": LOCALE}
+    url = f"{config.API_BASE_URL.format(region=region)}/data/wow/connected-realm/index"
+
+    response = get_client().get(url, headers=headers, params=params)
+    if response.status_code != 200:
+        raise RuntimeError(f"Realm index request failed: {response.status_code} {response.text[:200]}")
+    links = [link["href"] for link in response.json().get("connected_realms", [])]
+
+    def fetch_connected_realm(href):
+        # Index links already carry the namespace; locale keeps names plain strings
+        detail = get_client().get(href, headers=headers, params={"locale": LOCALE})
+        if detail.status_code != 200:
+            raise RuntimeError(f"Connected realm request failed: {detail.status_code} {href}")
+        data = detail.json()
+        rows = []
+        for realm in data.get("realms", []):
+            name = realm.get("name")
+            if isinstance(name, dict):
+                name = name.get(LOCALE)
+            rows.append((realm["id"], data["id"], realm["slug"], name or realm["slug"]))
+        return rows
+
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        return [row for rows in pool.map(fetch_connected_realm, links) for row in rows]
+
+def refresh_realms(region="eu", conn=None):
+    """Refetches a region's realms and replaces its rows in the realms table. Returns the realm count."""
+    started = time.perf_counter()
+    realms = fetch_realms(region)
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
+    cur = conn.cursor()
+    try:
+        cur.execute("DELETE FROM realms WHERE region = %s", (region,))
+        execute_values(cur, """
+            INSERT INTO realms (region, realm_id, connected_realm_id, slug, name)
+            VALUES %s
+        """, [(region, *realm) for realm in realms])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        if own_conn:
+            conn.close()
+    print(f"Stored {len(realms)} {region.upper()} realms in {time.perf_counter() - started:.2f}s")
+    return len(realms)
+
+def load_realms(region="eu", conn=None):
+    """Stored realms of a region and when they were fetched: ([(realm_id, connected_id, slug, name)], fetched_at)."""
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT realm_id, connected_realm_id, slug, name, MIN(fetched_at) OVER ()
+            FROM realms
+            WHERE region = %s
+            ORDER BY name
+        """, (region,))
+        rows = cur.fetchall()
+        conn.commit()
+    finally:
+        cur.close()
+        if own_conn:
+            conn.close()
+    return [row[:4] for row in rows], rows[0][4] if rows else None
+
+# ============================================================================
+# LOOKUP
+# ============================================================================
+
+def get_directory(region="eu", refresh=False, conn=None):
+    """
+    Returns the region's RealmDirectory, loading it from the realms table once
+    per process and refetching from the API when the table is empty, older than
+    REALM_CACHE_TTL_HOURS or refresh is set. If a refetch the TTL called for
+    fails, the stored rows are served and it is retried later.
+    """
+    directory = _directories.get(region)
+    if directory is not None and not refresh and not directory.is_stale():
+        return directory
+    with _directories_lock:
+        directory = _directories.get(region)
+        if directory is not None and not refresh and not directory.is_stale():
+            return directory
+
+        realms, fetched_at = load_realms(region, conn=conn)
+        if refresh or _expired(fetched_at):
+            # Under the lock, so concurrent first callers wait for one fetch
+            try:
+                refresh_realms(region, conn=conn)
+                realms, fetched_at = load_realms(region, conn=conn)
+            except Exception as e:
+                if refresh or not realms:
+                    raise
+                print(f"Realm directory refresh failed, serving {len(realms)} stored realms "
+                      f"from {fetched_at:%Y-%m-%d %H:%M}: {e}")
+
+        directory = RealmDirectory(region, realms, fetched_at)
+        _directories[region] = directory
+        return directory
+
+def resolve_realm(text, region="eu", conn=None):
+    """Connected realm ID for a realm name or slug (fuzzy), or None."""
+    return get_directory(region, conn=conn).resolve(text)
+
+def resolve_realms(texts, region="eu", conn=None):
+    """Maps many realm names or slugs to connected realm IDs against one directory load."""
+    return get_directory(region, conn=conn).resolve_many(texts)
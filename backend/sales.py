@@ -0,0 +1,149 @@
+import numpy as np
+from psycopg2.extras import execute_values
+
+# Lower bound of each Blizzard time_left bucket, in hours.
+# SHORT: < 30 min, MEDIUM: 30 min - 2 h, LONG: 2 h - 12 h, VERY_LONG: 12 h - 48 h
+# Indexed by the codes produced by _TIME_LEFT_SQL; the last slot is UNKNOWN
+TIME_LEFT_MIN_HOURS = np.array([0.0, 0.5, 2.0, 12.0, 0.0])
+
+# Gaps longer than this make the time_left classification meaningless
+MAX_ELAPSED_HOURS = 6
+
+# Gaps shorter than this (back-to-back ingests) would inflate sales_per_hour and,
+# being shorter than the SHORT bucket, count almost every disappearance as sold
+MIN_ELAPSED_HOURS = 0.5
+
+_TIME_LEFT_SQL = """
+    CASE time_left
+        WHEN 'SHORT' THEN 0
+        WHEN 'MEDIUM' THEN 1
+        WHEN 'LONG' THEN 2
+        WHEN 'VERY_LONG' THEN 3
+        ELSE 4
+    END
+"""
+
+def infer_sales(prev, curr, elapsed_hours):
+    """
+    Diffs two consecutive snapshots per auction id and estimates sales per item.
+
+    Args:
+        prev (np.ndarray): int64 array of shape (n, 4) with columns
+            auction_id, item_id, quantity, time_left code for the older snapshot
+        curr (np.ndarray): same layout for the newer snapshot
+        elapsed_hours (float): time between the two snapshots
+
+    A listing that disappears although its time_left bucket guaranteed it would
+    outlive the gap was bought out (or cancelled); one that could have run out
+    in the gap is counted as expired. Quantity drops on a persisting listing
+    (partial commodity purchases) count as sold quantity.
+
+    Returns a dict of per-item arrays: item_id, sold_auctions, sold_quantity,
+    expired_auctions, expired_quantity.
+    """
+    prev_ids = prev[:, 0]
+    curr_ids = curr[:, 0]
+
+    # Join prev -> curr on auction id with a binary search over the sorted ids
+    order = np.argsort(curr_ids, kind="stable")
+    sorted_ids = curr_ids[order]
+    pos = np.searchsorted(sorted_ids, prev_ids)
+    pos_clipped = np.minimum(pos, max(len(sorted_ids) - 1, 0))
+    if len(sorted_ids):
+        matched = sorted_ids[pos_clipped] == prev_ids
+    else:
+        matched = np.zeros(len(prev_ids), dtype=bool)
+
+    prev_qty = prev[:, 2]
+    min_remaining = TIME_LEFT_MIN_HOURS[prev[:, 3]]
+
+    disappeared = ~matched
+    expired = disappeared & (min_remaining < elapsed_hours)
+    sold = disappeared & ~expired
+
+    # Partial purchases on listings present in both snapshots
+    curr_qty = np.zeros(len(prev_ids), dtype=np.int64)
+    curr_qty[matched] = curr[order[pos_clipped[matched]], 2]
+    partial_qty = np.where(matched, np.maximum(prev_qty - curr_qty, 0), 0)
+
+    item_ids, inverse = np.unique(prev[:, 1], return_inverse=True)
+    n_items = len(item_ids)
+
+    def per_item(weights):
+        return np.bincount(inverse, weights=weights, minlength=n_items).astype(np.int64)
+
+    return {
+        "item_id": item_ids,
+        "sold_auctions": per_item(sold.astype(np.int64)),
+        "sold_quantity": per_item(np.where(sold, prev_qty, 0) + partial_qty),
+        "expired_auctions": per_item(expired.astype(np.int64)),
+        "expired_quantity": per_item(np.where(expired, prev_qty, 0)),
+    }
+
+def _load_snapshot(cur, table):
+    cur.execute(f"""
+        SELECT auction_id, item_id, quantity, {_TIME_LEFT_SQL}
+        FROM {table}
+        WHERE auction_id IS NOT NULL
+    """)
+    rows = cur.fetchall()
+    return np.array(rows, dtype=np.int64).reshape(len(rows), 4)
+
+def record_sales_estimates(cur):
+    """
+    Pipeline stage run at ingest, between staging the new snapshot in
+    'incoming_auctions' and replacing 'auctions'. Writes per-item sales
+    estimates for the interval between the two snapshots to item_sales_estimates,
+    skipping items with nothing sold or expired (readers treat a missing row as zero).
+    Failures are rolled back to a savepoint so they never block the ingest.
+    """
+    cur.execute("SAVEPOINT sales_estimates")
+    try:
+        cur.execute("""
+            SELECT (SELECT MAX(last_seen) FROM auctions),
+                   (SELECT MAX(last_seen) FROM incoming_auctions)
+        """)
+        prev_time, curr_time = cur.fetchone()
+        if prev_time is None or curr_time is None:
+            cur.execute("RELEASE SAVEPOINT sales_estimates")
+            print("No previous snapshot, skipping sales estimation.")
+            return 0
+
+        elapsed_hours = (curr_time - prev_time).total_seconds() / 3600
+        if elapsed_hours < MIN_ELAPSED_HOURS or elapsed_hours > MAX_ELAPSED_HOURS:
+            cur.execute("RELEASE SAVEPOINT sales_estimates")
+            print(f"Snapshot gap of {elapsed_hours:.2f}h, skipping sales estimation.")
+            return 0
+
+        prev = _load_snapshot(cur, "auctions")
+        curr = _load_snapshot(cur, "incoming_auctions")
+        estimates = infer_sales(prev, curr, elapsed_hours)
+        active = (estimates["sold_quantity"] > 0) | (estimates["expired_auctions"] > 0)
+        estimates = {name: column[active] for name, column in estimates.items()}
+
+        rows = [
+            (int(item_id), curr_time, elapsed_hours, int(sold_auctions), int(sold_quantity),
+             int(expired_auctions), int(expired_quantity), float(sold_quantity) / elapsed_hours)
+            for item_id, sold_auctions, sold_quantity, expired_auctions, expired_quantity in zip(
+                estimates["item_id"],
+                estimates["sold_auctions"],
+                estimates["sold_quantity"],
+                estimates["expired_auctions"],
+                estimates["expired_quantity"],
+            )
+        ]
+
+        execute_values(cur, """
+            INSERT INTO item_sales_estimates
+                (item_id, snapshot_time, elapsed_hours, sold_auctions, sold_quantity,
+                 expired_auctions, expired_quantity, sales_per_hour)
+            VALUES %s
+        """, rows, page_size=5000)
+
+        cur.execute("RELEASE SAVEPOINT sales_estimates")
+        print(f"Recorded sales estimates for {len(rows)} items over {elapsed_hours:.2f}h.")
+        return len(rows)
+    except Exception as e:
+        cur.execute("ROLLBACK TO SAVEPOINT sales_estimates")
+        print(f"Error estimating sales: {e}")
+        return 0
@@ -0,0 +1,31 @@
+import orjson
+from fastapi.responses import ORJSONResponse
+
+# Response formats accepted by list endpoints:
+#   json      - list of row objects (default)
+#   columnar  - one array per column, e.g. {"item_id": [...], "lowest_price": [...]}
+ROW_FORMATS = ("json", "columnar")
+
+def to_columnar(rows, columns):
+    """
+    Transposes row tuples into a dict of column arrays.
+    Columnar JSON repeats no keys, so it is smaller and faster to encode and parse.
+    """
+    if not rows:
+        return {column: [] for column in columns}
+    return {column: list(values) for column, values in zip(columns, zip(*rows))}
+
+def rows_response(rows, columns, fmt="json", headers=None):
+    """
+    Serializes row tuples with orjson, bypassing FastAPI's jsonable_encoder.
+    datetime values are encoded natively as ISO 8601 strings.
+    """
+    if fmt == "columnar":
+        content = to_columnar(rows, columns)
+    else:
+        content = [dict(zip(columns, row)) for row in rows]
+    return ORJSONResponse(content, headers=headers)
+
+def ndjson_lines(dicts):
+    """Encodes an iterable of dicts as newline-delimited JSON bytes."""
+    return b"".join(orjson.dumps(d) + b"\n" for d in dicts)
@@ -0,0 +1,130 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, gzip is always available
+    brotli = None
+
+WEB_DIR = "web"
+
+# Files that get a content-hashed, immutable URL under /assets/
+HASHED_EXTENSIONS = (".js", ".css")
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+# Compressing tiny files costs more than it saves
+MIN_COMPRESS_SIZE = 256
+
+class Asset:
+    """One static file with its precompressed variants."""
+
+    def __init__(self, body, content_type, cache_control):
+        self.body = body
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.variants = {}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            self.variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.variants["br"] = brotli.compress(body, quality=11)
+
+    def negotiate(self, accept_encoding):
+        """Returns (encoding, body) for the smallest variant the client accepts."""
+        accepted = {token.split(";")[0].strip() for token in accept_encoding.lower().split(",")}
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in self.variants:
+                return encoding, self.variants[encoding]
+        return None, self.body
+
+    def etag(self, encoding=None):
+        """Strong ETag of one variant; each encoding gets its own, as their bytes differ."""
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def response(self, request: Request):
+        encoding, body = self.negotiate(request.headers.get("accept-encoding", ""))
+        etag = self.etag(encoding)
+        headers = {
+            "Cache-Control": self.cache_control,
+            "ETag": etag,
+            "Vary": "Accept-Encoding",
+        }
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=self.content_type, headers=headers)
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match uses weak comparison: any listed tag, W/ or not, equal to etag (or *)."""
+    if not if_none_match:
+        return False
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    tags = {tag[2:] if tag.startswith("W/") else tag for tag in tags}
+    return etag in tags or "*" in tags
+
+class AssetBundle:
+    """
+    Static assets built once at startup: every .js/.css file in web/ is
+    fingerprinted with a content hash and served from /assets/<name>.<hash><ext>
+    with immutable caching, and HTML pages are rewritten to reference those URLs.
+    """
+
+    def __init__(self, web_dir=WEB_DIR):
+        self.hashed = {}  # "script.3f2a9c1b0d.js" -> Asset
+        self.by_name = {}  # "script.js" -> Asset (legacy unversioned URLs)
+        self.urls = {}  # "script.js" -> "/assets/script.3f2a9c1b0d.js"
+        self.pages = {}  # "index.html" -> Asset
+
+        for name in sorted(os.listdir(web_dir)):
+            path = os.path.join(web_dir, name)
+            stem, ext = os.path.splitext(name)
+            if not os.path.isfile(path) or ext not in HASHED_EXTENSIONS:
+                continue
+            with open(path, "rb") as f:
+                body = f.read()
+            digest = hashlib.sha256(body).hexdigest()[:10]
+            hashed_name = f"{stem}.{digest}{ext}"
+            asset = Asset(body, content_type_for(name), IMMUTABLE_CACHE)
+            self.hashed[hashed_name] = asset
+            self.by_name[name] = Asset(body, content_type_for(name), REVALIDATE_CACHE)
+            self.urls[name] = f"/assets/{hashed_name}"
+
+        for name in sorted(os.listdir(web_dir)):
+            if name.endswith(".html"):
+                with open(os.path.join(web_dir, name), encoding="utf-8") as f:
+                    html = self.rewrite_references(f.read())
+                self.pages[name] = Asset(html.encode("utf-8"), "text/html; charset=utf-8", REVALIDATE_CACHE)
+
+    def rewrite_references(self, html):
+        """Points src/href attributes at local assets to their hashed URLs."""
+        def replace(match):
+            attr, quote, name = match.group(1), match.group(2), match.group(3)
+            url = self.urls.get(name)
+            return f"{attr}={quote}{url}{quote}" if url else match.group(0)
+
+        return re.sub(r'(src|href)=(["\'])/?(?:static/)?([\w.-]+?)(?:\?[^"\']*)?\2', replace, html)
+
+def content_type_for(name):
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type.endswith("javascript"):
+        content_type += "; charset=utf-8"
+    return content_type
+
+_bundle = None
+
+def get_asset_bundle():
+    """Builds the asset bundle on first use; call at startup to pay the cost up front."""
+    global _bundle
+    if _bundle is None:
+        _bundle = AssetBundle()
+    return _bundle
@@ -0,0 +1,253 @@
+"""
+Synthetic auction house data for offline benchmarks and the mock Blizzard API.
+
+Every value is a pure function of (seed, snapshot index), so any snapshot can be
+regenerated on its own and runs are reproducible. Consecutive snapshots behave
+like the live feed: most listings persist with the same auction id, some sell
+or expire and are replaced, commodity stacks shrink as they are partially
+bought, time_left counts down and prices drift over the day.
+"""
+import numpy as np
+
+TIME_LEFT = np.array(["SHORT", "MEDIUM", "LONG", "VERY_LONG"])
+
+_ADJECTIVES = (
+    "Ancient", "Arcane", "Blazing", "Bright", "Cursed", "Deep", "Elder", "Enchanted", "Fel", "Frozen",
+    "Gilded", "Glowing", "Hardened", "Heavy", "Hollow", "Iron", "Lucid", "Lunar", "Mystic", "Nether",
+    "Obsidian", "Primal", "Radiant", "Runed", "Sacred", "Shadow", "Silver", "Smoldering", "Storm", "Sunlit",
+    "Tempered", "Thorned", "Twisted", "Verdant", "Void", "Wild", "Woven", "Zealous",
+)
+_NOUNS = (
+    "Amulet", "Bark", "Blade", "Bloom", "Cloth", "Crystal", "Draught", "Dust", "Elixir", "Essence",
+    "Feather", "Flask", "Gem", "Hide", "Ingot", "Leaf", "Leather", "Lotus", "Ore", "Pearl",
+    "Petal", "Phial", "Potion", "Powder", "Resin", "Root", "Scale", "Scroll", "Shard", "Silk",
+    "Spore", "Stone", "Talisman", "Thread", "Tincture", "Vial", "Weave", "Wing",
+)
+
+# Snapshots a listing stays up if nobody buys it (hours, like the 12h/24h/48h durations)
+MAX_LIFETIME = 48
+
+_FEED_IDS = {"auctions": 0, "commodities": 1}
+_MASK64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+def _mix(*keys):
+    """splitmix64-style hash of equally shaped integer arrays (or scalars) to uint64."""
+    with np.errstate(over="ignore"):
+        h = np.uint64(0x9E3779B97F4A7C15)
+        for key in keys:
+            h = (h ^ np.asarray(key).astype(np.uint64)) * np.uint64(0xBF58476D1CE4E5B9)
+            h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+            h = h ^ (h >> np.uint64(31))
+        return h & _MASK64
+
+def _uniform(*keys):
+    """Deterministic uniform [0, 1) values keyed by the given integer arrays."""
+    return (_mix(*keys) >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+class SyntheticCatalog:
+    """
+    A reproducible item catalog: sparse item ids, names (with groups of three
+    consecutive ids sharing a name, as tier_detector expects for crafted tiers),
+    a commodity flag, a per-unit base price and a skewed popularity.
+    """
+
+    def __init__(self, items=20000, seed=0, commodity_share=0.4, tier_share=0.15):
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+
+        # Groups of 1 or 3 items; tiered groups get consecutive ids
+        groups = int(items / (1 + 2 * tier_share)) + 3
+        sizes = np.where(rng.random(groups) < tier_share, 3, 1)
+        sizes = sizes[np.cumsum(sizes) <= items]
+        if sizes.sum() < items:
+            sizes = np.append(sizes, np.ones(items - sizes.sum(), dtype=sizes.dtype))
+        gaps = rng.integers(1, 12, len(sizes))
+        starts = 1000 + np.cumsum(gaps + sizes) - sizes
+        member = np.arange(items) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+
+        self.group_index = np.repeat(np.arange(len(sizes)), sizes)
+        self.tier = np.where(np.repeat(sizes, sizes) == 3, member + 1, 0)
+        self.item_ids = (np.repeat(starts, sizes) + member).astype(np.int64)
+
+        group_commodity = rng.random(len(sizes)) < commodity_share
+        self.is_commodity = np.repeat(group_commodity, sizes)
+
+        # Per-unit copper prices: commodities around 50 silver, gear around 500 gold
+        group_price = np.where(
+            group_commodity,
+            rng.lognormal(np.log(5_000), 1.2, len(sizes)),
+            rng.lognormal(np.log(5_000_000), 1.3, len(sizes)),
+        )
+        tier_factor = np.array([1.0, 1.0, 1.6, 2.5])[self.tier]
+        self.base_price = np.maximum(np.repeat(group_price, sizes) * tier_factor, 1).astype(np.int64)
+        self.price_phase = rng.random(items) * 2 * np.pi
+
+        # Zipf-like popularity, shuffled so it doesn't follow item ids
+        popularity = 1.0 / np.arange(1, items + 1) ** 1.1
+        self.popularity = rng.permutation(popularity)
+
+    def __len__(self):
+        return len(self.item_ids)
+
+    def name(self, index):
+        """Display name of the item at catalog position `index`."""
+        return self._name(int(self.group_index[index]), int(_mix(self.seed, int(self.group_index[index]), 7)))
+
+    def names(self):
+        """Display names of the whole catalog, in catalog order."""
+        hashes = _mix(self.seed, self.group_index, 7).tolist()
+        return [self._name(group, h) for group, h in zip(self.group_index.tolist(), hashes)]
+
+    @staticmethod
+    def _name(group, h):
+        adjective = _ADJECTIVES[h % len(_ADJECTIVES)]
+        noun = _NOUNS[(h >> 16) % len(_NOUNS)]
+        second = _NOUNS[(h >> 32) % len(_NOUNS)]
+        return f"{adjective} {noun} of {second} {group}"
+
+    def index_of(self, item_id):
+        """Catalog position of item_id, or None."""
+        pos = int(np.searchsorted(self.item_ids, item_id))
+        if pos < len(self.item_ids) and self.item_ids[pos] == item_id:
+            return pos
+        return None
+
+    def _feed_items(self, commodity):
+        indices = np.flatnonzero(self.is_commodity == commodity)
+        if not len(indices):
+            indices = np.arange(len(self))
+        weights = np.cumsum(self.popularity[indices])
+        return indices, weights / weights[-1]
+
+    def snapshot(self, index, listings, feed="auctions"):
+        """
+        Listings of one feed ("auctions" or "commodities") at snapshot `index`
+        (one snapshot per hour) as a dict of arrays: auction_id, item_id,
+        quantity, buyout (0 = bid only), unit_price, time_left.
+        """
+        feed_id = _FEED_IDS[feed]
+        commodity = feed == "commodities"
+        slot = np.arange(listings, dtype=np.int64)
+
+        # Every slot holds a sequence of listings; each generation lives `lifetime` snapshots
+        lifetime = 1 + (_uniform(self.seed, feed_id, slot, 1) * MAX_LIFETIME).astype(np.int64)
+        phase = (_uniform(self.seed, feed_id, slot, 2) * lifetime).astype(np.int64)
+        generation = (index + phase) // lifetime
+        age = (index + phase) % lifetime
+        remaining = lifetime - age
+
+        auction_id = (feed_id << 52) + (slot << 20) + generation + 1
+
+        indices, cum_weights = self._feed_items(commodity)
+        pick = np.searchsorted(cum_weights, _uniform(self.seed, feed_id, slot, generation, 3), side="right")
+        item = indices[np.minimum(pick, len(indices) - 1)]
+
+        drift = 1 + 0.08 * np.sin(2 * np.pi * index / 24 + self.price_phase[item])
+        spread = 0.9 + 0.3 * _uniform(self.seed, feed_id, slot, generation, 4)
+        outlier = np.where(_uniform(self.seed, feed_id, slot, generation, 5) < 0.002, 25.0, 1.0)
+        unit_price = np.maximum(self.base_price[item] * drift * spread * outlier, 1).astype(np.int64)
+
+        if commodity:
+            # Round to whole copper like the live feed and shrink stacks as they sell
+            initial = 1 + (_uniform(self.seed, feed_id, slot, generation, 6) ** 3 * 200).astype(np.int64)
+            sold_per_hour = (_uniform(self.seed, feed_id, slot, generation, 7) * 3).astype(np.int64)
+            quantity = np.maximum(initial - age * sold_per_hour, 1)
+            buyout = unit_price * quantity
+        else:
+            stackable = _uniform(self.seed, feed_id, slot, generation, 6) < 0.1
+            quantity = np.where(stackable, 1 + (_uniform(self.seed, feed_id, slot, generation, 7) * 20).astype(np.int64), 1)
+            buyout = unit_price * quantity
+            bid_only = _uniform(self.seed, feed_id, slot, generation, 8) < 0.05
+            buyout = np.where(bid_only, 0, buyout)
+
+        time_left = np.select(
+            [remaining >= 13, remaining >= 3, _uniform(self.seed, feed_id, slot, generation, 9) < 0.7],
+            [3, 2, 1],
+            0,
+        )
+
+        return {
+            "auction_id": auction_id,
+            "item_id": self.item_ids[item],
+            "quantity": quantity,
+            "buyout": buyout,
+            "unit_price": unit_price,
+            "time_left": time_left,
+        }
+
+    def daily_lows(self, day, listings):
+        """
+        One day of history as cleanup_daily_data leaves it: for each item listed
+        that day (more popular items are listed more often), its cheapest
+        listing and that day's price spread. `listings` is the size of one
+        hourly snapshot across both feeds. Returns a dict of arrays: item_id,
+        quantity, buyout, unit_price, median_unit_price, listing_count, time_left.
+        """
+        catalog = np.arange(len(self))
+        # Listings of an item seen over a day; 24 snapshots, but most persist between them
+        expected = listings * 3 * self.popularity / self.popularity.sum()
+        listed = np.flatnonzero(_uniform(self.seed, 2, catalog, day, 1) < 1 - np.exp(-expected))
+        count = 1 + (expected[listed] * _uniform(self.seed, 2, listed, day, 2) * 2).astype(np.int64)
+
+        # Slow drift over weeks on top of the daily noise
+        drift = 1 + 0.15 * np.sin(2 * np.pi * day / 45 + self.price_phase[listed])
+        median = self.base_price[listed] * drift * (0.95 + 0.1 * _uniform(self.seed, 2, listed, day, 3))
+        low = np.maximum(median * (0.75 + 0.2 * _uniform(self.seed, 2, listed, day, 4)), 1).astype(np.int64)
+        quantity = np.where(
+            self.is_commodity[listed],
+            1 + (_uniform(self.seed, 2, listed, day, 5) ** 3 * 200).astype(np.int64),
+            1,
+        )
+        return {
+            "item_id": self.item_ids[listed],
+            "quantity": quantity,
+            "buyout": low * quantity,
+            "unit_price": low,
+            "median_unit_price": np.round(median),
+            "listing_count": count,
+            "time_left": (_uniform(self.seed, 2, listed, day, 6) * 4).astype(np.int64),
+        }
+
+    def payload(self, index, listings, feed="auctions", base_url="https://eu.api.blizzard.com", realm_id=3674):
+        """The snapshot serialized exactly like the Blizzard API response body (bytes)."""
+        data = self.snapshot(index, listings, feed)
+        ids = data["auction_id"].tolist()
+        items = data["item_id"].tolist()
+        quantities = data["quantity"].tolist()
+        time_left = TIME_LEFT[data["time_left"]].tolist()
+
+        if feed == "commodities":
+            prices = data["unit_price"].tolist()
+            rows = [
+                f'{{"id":{a},"item":{{"id":{i}}},"quantity":{q},"unit_price":{p},"time_left":"{t}"}}'
+                for a, i, q, p, t in zip(ids, items, quantities, prices, time_left)
+            ]
+            head = f'{{"_links":{{"self":{{"href":"{base_url}/data/wow/auctions/commodities?namespace=dynamic-eu"}}}},"auctions":['
+            tail = "]}"
+        else:
+            buyouts = data["buyout"].tolist()
+            bids = (data["unit_price"] * data["quantity"] * 8 // 10).tolist()
+            rows = [
+                f'{{"id":{a},"item":{{"id":{i}}},"bid":{d},"quantity":{q},"time_left":"{t}"}}' if b == 0 else
+                f'{{"id":{a},"item":{{"id":{i}}},"buyout":{b},"quantity":{q},"time_left":"{t}"}}'
+                for a, i, b, d, q, t in zip(ids, items, buyouts, bids, quantities, time_left)
+            ]
+            head = (
+                f'{{"_links":{{"self":{{"href":"{base_url}/data/wow/connected-realm/{realm_id}/auctions?namespace=dynamic-eu"}}}},'
+                f'"connected_realm":{{"href":"{base_url}/data/wow/connected-realm/{realm_id}?namespace=dynamic-eu"}},"auctions":['
+            )
+            tail = f'],"commodities":{{"href":"{base_url}/data/wow/auctions/commodities?namespace=dynamic-eu"}}}}'
+
+        return (head + ",".join(rows) + tail).encode("utf-8")
+
+    def item_payload(self, item_id, base_url="https://eu.api.blizzard.com"):
+        """Item endpoint response for item_id, or None if it isn't in the catalog."""
+        index = self.index_of(item_id)
+        if index is None:
+            return None
+        return {
+            "id": int(item_id),
+            "name": self.name(index),
+            "is_stackable": bool(self.is_commodity[index]),
+            "media": {"key": {"href": f"{base_url}/data/wow/media/item/{int(item_id)}?namespace=static-eu"}, "id": int(item_id)},
+        }
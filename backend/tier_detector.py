@@ -1,12 +1,15 @@
+import threading
+import time
+
 import psycopg2
-from backend.config import DB_URI
+from backend import config
 
 def get_tiered_items():
     """
     Detect tiered items by finding consecutive item IDs with the same name.
     Returns a dictionary mapping item_id to tier information.
     """
-    conn = psycopg2.connect(DB_URI)
+    conn = psycopg2.connect(config.DB_URI)
     cur = conn.cursor()
     
     try:
@@ -75,16 +78,38 @@ def get_tiered_items_cache():
 
 # Cache the tiered items for better performance
 _tiered_items_cache = None
+_tiered_items_lock = threading.Lock()
 
 def get_cached_tiered_items():
     """
     Get cached tiered items, initializing the cache if needed.
+    Concurrent first callers wait for one scan instead of each running their own.
     """
     global _tiered_items_cache
     if _tiered_items_cache is None:
-        _tiered_items_cache = get_tiered_items()
+        with _tiered_items_lock:
+            if _tiered_items_cache is None:
+                _tiered_items_cache = get_tiered_items()
     return _tiered_items_cache
 
+def warm_tier_cache():
+    """
+    Fills the tier cache on a background thread, so the items scan happens at
+    startup instead of inside the first request that needs tier information.
+    """
+    def warm():
+        started = time.perf_counter()
+        try:
+            tiered = get_cached_tiered_items()
+            print(f"Tier cache ready: {len(tiered)} tiered items in {time.perf_counter() - started:.2f}s")
+        except psycopg2.Error as e:
+            # The first request retries the scan
+            print(f"Tier cache warmup failed: {e}")
+
+    thread = threading.Thread(target=warm, name="tier-warmup", daemon=True)
+    thread.start()
+    return thread
+
 def get_cached_item_tier_info(item_id):
     """
     Get tier information for a specific item using the cache.
@@ -1,61 +1,284 @@
+import io
 import psycopg2
+from psycopg2.extras import execute_values
 from datetime import datetime
-from backend.config import DB_URI
+from backend.db import connect
+from backend.alerts import evaluate_alerts
+from backend.events import publish_snapshot
+from backend.metrics import span
+from backend.sales import record_sales_estimates
+from backend.price_stats import record_price_stats
 
-def insert_auctions(auction_list):
+def insert_auctions(auction_list, conn=None):
     """
-    Inserts a list of auction dictionaries into the PostgreSQL 'auctions' table.
-    Each dict must contain: item_id, quantity, buyout, time_left, last_seen
-    """
-    conn = psycopg2.connect(DB_URI)
-    cur = conn.cursor()
+    Replaces the current snapshot in the PostgreSQL 'auctions' table.
+    Each dict must contain: auction_id, item_id, quantity, buyout, unit_price, time_left, last_seen
 
-    # First, archive current auctions to history table
-    archive_current_auctions(cur)
-    
-    # Clear current auctions table
-    cur.execute("DELETE FROM auctions")
-    
-    # Insert new auctions
-    query = """
-    INSERT INTO auctions (item_id, quantity, buyout, time_left, last_seen)
-    VALUES (%s, %s, %s, %s, %s)
+    The new snapshot is staged first so it can be diffed against the previous one:
+    only listing changes are written to auction_events, and the previous snapshot's
+    cheapest listing per item is archived to auction_history.
+
+    Args:
+        conn: optional open connection (e.g. from backend.db.pooled_connection);
+            it is committed but left open. A new connection is used otherwise.
     """
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
+    cur = conn.cursor()
 
     try:
-        for auction in auction_list:
-            cur.execute(query, (
-                auction["item_id"],
-                auction["quantity"],
-                auction["buyout"],
-                auction["time_left"],
-                auction["last_seen"]
-            ))
-        conn.commit()
+        with span("stage") as s:
+            stage_auctions(cur, auction_list)
+            s["rows"] = len(auction_list)
+        finalize_snapshot(cur)
+
+        with span("commit"):
+            conn.commit()
         print(f"Inserted {len(auction_list)} rows into the database.")
-        print(f"Archived previous auctions to history table.")
+        return True
     except Exception as e:
         conn.rollback()
         print("Error inserting data:", e)
+        return False
     finally:
         cur.close()
-        conn.close()
+        if own_conn:
+            conn.close()
+
+COPY_COLUMNS = ("auction_id", "item_id", "quantity", "buyout", "unit_price", "time_left")
+
+def create_staging_table(cur, snapshot_time=None):
+    """
+    Creates the session-local 'incoming_auctions' table, dropped on commit.
+    With snapshot_time, rows loaded without last_seen are stamped with it.
+    """
+    cur.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS incoming_auctions (
+            auction_id BIGINT,
+            item_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            buyout BIGINT NOT NULL,
+            unit_price BIGINT NOT NULL,
+            time_left TEXT NOT NULL,
+            last_seen TIMESTAMP NOT NULL,
+            is_outlier BOOLEAN NOT NULL DEFAULT FALSE
+        ) ON COMMIT DROP
+    """)
+    if snapshot_time is not None:
+        cur.execute("ALTER TABLE incoming_auctions ALTER COLUMN last_seen SET DEFAULT %s", (snapshot_time,))
+
+def stage_auctions(cur, auction_list):
+    """
+    Loads a new snapshot into the session-local 'incoming_auctions' table.
+    All rows are stamped with the latest last_seen so the snapshot has a single
+    time that history, statistics and events can be joined on.
+    """
+    snapshot_time = max((auction["last_seen"] for auction in auction_list), default=None)
+
+    create_staging_table(cur)
+
+    execute_values(cur, """
+        INSERT INTO incoming_auctions (auction_id, item_id, quantity, buyout, unit_price, time_left, last_seen)
+        VALUES %s
+    """, [
+        (
+            auction.get("auction_id"),
+            auction["item_id"],
+            auction["quantity"],
+            auction["buyout"],
+            auction["unit_price"],
+            auction["time_left"],
+            snapshot_time
+        )
+        for auction in auction_list
+    ], page_size=5000)
+
+def copy_staged_rows(cur, auction_list):
+    """
+    Appends a batch of auction entries to 'incoming_auctions' with COPY.
+    last_seen is left to the column default set by create_staging_table(cur, snapshot_time).
+    Used by the streaming pipeline, which loads a snapshot in many batches while
+    it is still being downloaded.
+    """
+    buffer = io.StringIO()
+    for auction in auction_list:
+        auction_id = auction.get("auction_id")
+        buffer.write("\t".join((
+            r"\N" if auction_id is None else str(auction_id),
+            str(auction["item_id"]),
+            str(auction["quantity"]),
+            str(auction["buyout"]),
+            str(auction["unit_price"]),
+            auction["time_left"],
+        )))
+        buffer.write("\n")
+    buffer.seek(0)
+    cur.copy_expert(f"COPY incoming_auctions ({', '.join(COPY_COLUMNS)}) FROM STDIN", buffer)
+
+def copy_staged_columns(cur, columns, time_left_names):
+    """
+    COPY variant of copy_staged_rows for column arrays produced by
+    backend/parallel_parse.py; time_left holds codes into time_left_names.
+    """
+    lines = zip(
+        columns["auction_id"].tolist(),
+        columns["item_id"].tolist(),
+        columns["quantity"].tolist(),
+        columns["buyout"].tolist(),
+        columns["unit_price"].tolist(),
+        time_left_names[columns["time_left"]].tolist(),
+    )
+    buffer = io.StringIO("".join(f"{a}\t{i}\t{q}\t{b}\t{u}\t{t}\n" for a, i, q, b, u, t in lines))
+    cur.copy_expert(f"COPY incoming_auctions ({', '.join(COPY_COLUMNS)}) FROM STDIN", buffer)
+
+def finalize_snapshot(cur):
+    """
+    Runs the post-staging steps on a fully loaded 'incoming_auctions' table and
+    replaces 'auctions' with it. The caller commits, which also delivers the
+    snapshot notification to /api/events listeners.
+    """
+    with span("index"):
+        cur.execute("CREATE INDEX ON incoming_auctions (auction_id)")
+        cur.execute("ANALYZE incoming_auctions")
+
+    # Per-item robust price statistics and outlier flags for the new snapshot
+    with span("price_stats") as s:
+        s["rows"] = record_price_stats(cur)
+
+    # Record what changed since the previous snapshot
+    with span("events") as s:
+        record_auction_events(cur)
+        s["rows"] = cur.rowcount
+
+    # Check price alert rules against the new snapshot's prices
+    with span("alerts") as s:
+        s["rows"] = evaluate_alerts(cur)
+
+    # Estimate sales from listings that vanished since the previous snapshot
+    with span("sales") as s:
+        s["rows"] = record_sales_estimates(cur)
+
+    # Archive the previous snapshot before it gets replaced
+    with span("archive") as s:
+        archive_current_auctions(cur)
+        s["rows"] = cur.rowcount
+
+    # Replace current auctions with the staged snapshot
+    with span("delete") as s:
+        cur.execute("DELETE FROM auctions")
+        s["rows"] = cur.rowcount
+    with span("insert") as s:
+        cur.execute("""
+            INSERT INTO auctions (auction_id, item_id, quantity, buyout, unit_price, time_left, last_seen, is_outlier)
+            SELECT auction_id, item_id, quantity, buyout, unit_price, time_left, last_seen, is_outlier
+            FROM incoming_auctions
+        """)
+        s["rows"] = cur.rowcount
+
+    # Tell API processes which snapshot landed; delivered on commit
+    with span("notify"):
+        publish_snapshot(cur)
+
+def record_auction_events(cur):
+    """
+    Diffs the staged snapshot against the current auctions table on auction_id
+    and writes appear/disappear/price_change events to auction_events.
+    Listings that are unchanged between snapshots produce no rows.
+    """
+    try:
+        cur.execute("""
+            WITH snapshot AS (
+                SELECT MAX(last_seen) AS snapshot_time FROM incoming_auctions
+            )
+            INSERT INTO auction_events (auction_id, item_id, event_type, quantity, buyout, time_left, snapshot_time)
+            SELECT n.auction_id, n.item_id, 'appear', n.quantity, n.buyout, n.time_left, s.snapshot_time
+            FROM incoming_auctions n
+            CROSS JOIN snapshot s
+            LEFT JOIN auctions a ON a.auction_id = n.auction_id
+            WHERE n.auction_id IS NOT NULL AND a.auction_id IS NULL
+            UNION ALL
+            SELECT a.auction_id, a.item_id, 'disappear', a.quantity, a.buyout, a.time_left, s.snapshot_time
+            FROM auctions a
+            CROSS JOIN snapshot s
+            LEFT JOIN incoming_auctions n ON n.auction_id = a.auction_id
+            WHERE a.auction_id IS NOT NULL AND n.auction_id IS NULL
+            UNION ALL
+            SELECT n.auction_id, n.item_id, 'price_change', n.quantity, n.buyout, n.time_left, s.snapshot_time
+            FROM incoming_auctions n
+            CROSS JOIN snapshot s
+            JOIN auctions a ON a.auction_id = n.auction_id
+            WHERE a.buyout <> n.buyout OR a.quantity <> n.quantity
+        """)
+        print(f"Recorded {cur.rowcount} listing change events.")
+    except Exception as e:
+        print(f"Error recording auction events: {e}")
+        raise
 
 def archive_current_auctions(cur):
     """
-    Archives current auctions to the history table before inserting new ones.
+    Archives one row per item of the current snapshot to the history table: its
+    cheapest non-outlier listing, the item's listing count and total quantity,
+    and its non-outlier price range. Items whose listings are all outliers are
+    not archived. Full listing-level history is kept as events in auction_events.
     """
     try:
-        # Copy current auctions to history table
         cur.execute("""
-            INSERT INTO auction_history (item_id, quantity, buyout, time_left, snapshot_time)
-            SELECT item_id, quantity, buyout, time_left, last_seen
-            FROM auctions
+            INSERT INTO auction_history (item_id, quantity, buyout, unit_price, time_left, snapshot_time,
+                                         listing_count, total_quantity, min_buyout, max_buyout, max_unit_price)
+            SELECT item_id, quantity, buyout, unit_price, time_left, last_seen,
+                   listing_count, total_quantity, min_buyout, max_buyout, max_unit_price
+            FROM (
+                SELECT DISTINCT ON (item_id) item_id, quantity, buyout, unit_price, time_left, last_seen, is_outlier,
+                       COUNT(*) OVER w AS listing_count,
+                       SUM(quantity) OVER w AS total_quantity,
+                       MIN(buyout) FILTER (WHERE NOT is_outlier) OVER w AS min_buyout,
+                       MAX(buyout) FILTER (WHERE NOT is_outlier) OVER w AS max_buyout,
+                       MAX(unit_price) FILTER (WHERE NOT is_outlier) OVER w AS max_unit_price
+                FROM auctions
+                WINDOW w AS (PARTITION BY item_id)
+                ORDER BY item_id, is_outlier, unit_price ASC
+            ) cheapest
+            WHERE NOT is_outlier
         """)
         archived_count = cur.rowcount
-        print(f"Archived {archived_count} auctions to history table.")
+        print(f"Archived {archived_count} items to history table.")
     except Exception as e:
         print(f"Error archiving auctions: {e}")
+        raise
+
+def reconstruct_snapshot(at_time, item_id=None):
+    """
+    Rebuilds the set of live listings as of at_time by replaying auction_events.
+    Returns tuples of (auction_id, item_id, quantity, buyout, time_left, snapshot_time),
+    where snapshot_time is when the listing last appeared or changed.
+    time_left is the value observed at that event, not a per-snapshot countdown.
+    """
+    conn = connect()
+    cur = conn.cursor()
+
+    try:
+        cur.execute("""
+            SELECT auction_id, item_id, quantity, buyout, time_left, snapshot_time
+            FROM (
+                SELECT DISTINCT ON (auction_id)
+                       auction_id, item_id, event_type, quantity, buyout, time_left, snapshot_time
+                FROM auction_events
+                WHERE snapshot_time <= %s
+                  AND (%s IS NULL OR item_id = %s)
+                ORDER BY auction_id, snapshot_time DESC, id DESC
+            ) latest
+            WHERE event_type <> 'disappear'
+            ORDER BY item_id, buyout
+        """, (at_time, item_id, item_id))
+
+        return cur.fetchall()
+    except Exception as e:
+        print(f"Error reconstructing snapshot: {e}")
+        return []
+    finally:
+        cur.close()
+        conn.close()
 
 def get_auction_history(item_id=None, hours=24):
     """
@@ -63,7 +286,7 @@ def get_auction_history(item_id=None, hours=24):
     If item_id is provided, returns data for that specific item.
     Otherwise returns data for all items within the specified hours.
     """
-    conn = psycopg2.connect(DB_URI)
+    conn = connect()
     cur = conn.cursor()
     
     try:
@@ -1,85 +1,78 @@
 import sys
 import os
-import psycopg2
 import time
 import logging
 
 # Allow running as standalone script
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from backend.config import DB_URI
+from backend.db import connect
 from backend.items import get_or_fetch_item_name
+from backend.metrics import push_metrics, span
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def update_missing_items():
+def update_missing_items(conn=None):
     """Update item cache for items that don't have names in the database."""
-    conn = psycopg2.connect(DB_URI)
-    cur = conn.cursor()
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
 
-    # Get all item IDs from auctions that don't have names in the items table
-    cur.execute("""
-        SELECT DISTINCT a.item_id 
-        FROM auctions a 
-        LEFT JOIN items i ON a.item_id = i.item_id 
-        WHERE i.item_id IS NULL
-        ORDER BY a.item_id
-    """)
-    
-    missing_item_ids = [row[0] for row in cur.fetchall()]
-    conn.close()
-
-    if not missing_item_ids:
-        logger.info("No missing items found!")
-        return
+    try:
+        # Get all item IDs from auctions that don't have names in the items table
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT DISTINCT a.item_id 
+            FROM auctions a 
+            LEFT JOIN items i ON a.item_id = i.item_id 
+            WHERE i.item_id IS NULL
+            ORDER BY a.item_id
+        """)
+        missing_item_ids = [row[0] for row in cur.fetchall()]
+        cur.close()
 
-    logger.info(f"Found {len(missing_item_ids)} items missing from cache.")
+        if not missing_item_ids:
+            logger.info("No missing items found!")
+            return
 
-    # Process items with error handling and retries
-    for i, item_id in enumerate(missing_item_ids, 1):
-        try:
-            logger.info(f"Processing {i}/{len(missing_item_ids)}: Item ID {item_id}")
-            name, icon = get_or_fetch_item_name(item_id)
-            
-            # Always show the result (like original script)
-            if name != "Unknown Item":
-                logger.info(f"  ✓ ID: {item_id:<7} Name: {name}")
-            else:
-                logger.warning(f"  ✗ ID: {item_id:<7} Name: {name}")
-            
-            # Add a small delay to avoid overwhelming the API
-            time.sleep(0.1)
-            
-        except Exception as e:
-            logger.error(f"Error processing item {item_id}: {e}")
-            # Continue with next item instead of crashing
-            continue
-        
-        # Log progress every 100 items
-        if i % 100 == 0:
-            logger.info(f"Progress: {i}/{len(missing_item_ids)} items processed")
+        logger.info(f"Found {len(missing_item_ids)} items missing from cache.")
+        lookup_items(missing_item_ids, conn)
+    finally:
+        if own_conn:
+            conn.close()
 
-def update_all_items():
+def update_all_items(conn=None):
     """Update item cache for all items in auctions table."""
-    conn = psycopg2.connect(DB_URI)
-    cur = conn.cursor()
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
 
-    cur.execute("SELECT DISTINCT item_id FROM auctions ORDER BY item_id")
-    item_ids = [row[0] for row in cur.fetchall()]
-    conn.close()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT DISTINCT item_id FROM auctions ORDER BY item_id")
+        item_ids = [row[0] for row in cur.fetchall()]
+        cur.close()
 
-    if not item_ids:
-        logger.info("No items found in auctions table!")
-        return
+        if not item_ids:
+            logger.info("No items found in auctions table!")
+            return
 
-    logger.info(f"Found {len(item_ids)} unique items in auctions.")
+        logger.info(f"Found {len(item_ids)} unique items in auctions.")
+        lookup_items(item_ids, conn)
+    finally:
+        if own_conn:
+            conn.close()
 
+def lookup_items(item_ids, conn):
+    """Looks up (and caches) each item on one shared connection."""
     # Process items with error handling and retries
     for i, item_id in enumerate(item_ids, 1):
         try:
             logger.info(f"Processing {i}/{len(item_ids)}: Item ID {item_id}")
-            name, icon = get_or_fetch_item_name(item_id)
+            with span("item_cache:lookup") as s:
+                name, icon = get_or_fetch_item_name(item_id, conn=conn)
+                s["rows"] = 1
             
             # Always show the result (like original script)
             if name != "Unknown Item":
@@ -113,4 +106,5 @@ if __name__ == "__main__":
     if args.missing_only:
         update_missing_items()
     else:
-        update_all_items() 
\ No newline at end of file
+        update_all_items()
+    push_metrics("item_cache")
@@ -0,0 +1,373 @@
+"""
+API load test.
+
+Seeds a scratch database with a synthetic catalog, its current snapshot and
+rolled-up daily history at one of several scales, starts the app under
+uvicorn and drives each endpoint scenario with concurrent keep-alive clients,
+reporting throughput and p50/p95/p99 latency.
+
+    DB_URI=postgresql://localhost/wow_bench python -m benchmarks.bench_api --scale 100k-30d
+    DB_URI=... python -m benchmarks.bench_api --scale 100k-30d --no-seed --concurrency 16 --duration 20
+
+Seeding replaces ALL data in the database. The two newest snapshots go through
+the real ingest (staging, price statistics, events, sales, archive); older
+history is written directly, one row per item and day plus the matching
+item_price_stats row, which is what cleanup_daily_data leaves behind.
+
+Results are saved as JSON tagged with the git commit (default
+benchmarks/results/); --compare OLD.json prints the change against an earlier run.
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import requests
+
+from backend.synthetic import SyntheticCatalog
+from benchmarks.bench_ingest import RESULTS_DIR, git_commit
+
+# name -> (catalog items, days of history)
+SCALES = {
+    "10k-30d": (10_000, 30),
+    "10k-365d": (10_000, 365),
+    "100k-30d": (100_000, 30),
+    "100k-365d": (100_000, 365),
+    "1m-30d": (1_000_000, 30),
+    "1m-365d": (1_000_000, 365),
+}
+
+# Listings per hourly snapshot, relative to the catalog size
+LISTINGS_PER_ITEM = 2
+
+# Share of listings in the commodities feed
+COMMODITY_SHARE = 0.35
+
+ALL_TABLES = ("auctions", "auction_history", "auction_events", "item_sales_estimates", "item_price_stats", "items")
+
+# scenario -> path template; {item_id}, {prefix} and {word} are filled per request
+SCENARIOS = {
+    "items_search": "/api/items/search?query={prefix}",
+    "auctions_item": "/api/auctions?item_id={item_id}",
+    "auctions_query": "/api/auctions?query={word}",
+    "auctions_all": "/api/auctions",
+    "history_item": "/api/auctions/history?item_id={item_id}&hours=720",
+    "history_page": "/api/auctions/history?hours=24&limit=1000",
+    "trends_week": "/api/auctions/trends?item_id={item_id}&hours=168",
+    "trends_all": "/api/auctions/trends?item_id={item_id}&hours=8760",
+    "trends_all_lttb": "/api/auctions/trends?item_id={item_id}&hours=8760&max_points=300",
+}
+
+SERVER_START_TIMEOUT = 60
+
+def copy_rows(cur, table, columns, rows):
+    buffer = io.StringIO("".join("\t".join(map(str, row)) + "\n" for row in rows))
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+def seed_items(cur, catalog):
+    names = catalog.names()
+    copy_rows(cur, "items", ("item_id", "name", "icon_url"), (
+        (item_id, name, f"https://render.worldofwarcraft.com/eu/icons/56/inv_misc_{item_id % 500}.jpg")
+        for item_id, name in zip(catalog.item_ids.tolist(), names)
+    ))
+
+def seed_daily_history(cur, catalog, days, listings, newest):
+    """Writes `days` days of rolled-up history ending the day before `newest`."""
+    time_left_names = ("SHORT", "MEDIUM", "LONG", "VERY_LONG")
+    for day in range(days):
+        snapshot_time = newest - timedelta(days=days - day)
+        lows = catalog.daily_lows(day, listings)
+        stamp = snapshot_time.strftime("%Y-%m-%d %H:%M:%S")
+        copy_rows(cur, "auction_history", (
+            "item_id", "quantity", "buyout", "unit_price", "time_left", "snapshot_time",
+            "listing_count", "total_quantity", "min_buyout", "max_buyout", "max_unit_price",
+        ), (
+            (i, q, b, u, time_left_names[t], stamp, n, n * q, b, round(m * 1.25) * q, round(m * 1.25))
+            for i, q, b, u, t, n, m in zip(lows["item_id"].tolist(), lows["quantity"].tolist(), lows["buyout"].tolist(),
+                                           lows["unit_price"].tolist(), lows["time_left"].tolist(),
+                                           lows["listing_count"].tolist(), lows["median_unit_price"].tolist())
+        ))
+        low = lows["unit_price"].astype(np.float64)
+        median = lows["median_unit_price"]
+        copy_rows(cur, "item_price_stats", (
+            "item_id", "snapshot_time", "listing_count", "total_quantity", "min_unit_price", "p10_unit_price",
+            "p25_unit_price", "median_unit_price", "p75_unit_price", "p90_unit_price", "mad_unit_price", "outlier_count",
+        ), (
+            (i, stamp, n, n * q, lo, round(lo + (m - lo) * 0.3), round(lo + (m - lo) * 0.7), m,
+             round(m * 1.1), round(m * 1.25), round(m * 0.08), 0)
+            for i, n, q, lo, m in zip(lows["item_id"].tolist(), lows["listing_count"].tolist(),
+                                      lows["quantity"].tolist(), low.tolist(), median.tolist())
+        ))
+
+def ingest_snapshot(cur, catalog, index, listings, snapshot_time):
+    """Runs one synthetic snapshot through the real staging and finalize steps."""
+    from backend.parallel_parse import TIME_LEFT_NAMES
+    from backend.to_database import copy_staged_columns, create_staging_table, finalize_snapshot
+
+    commodities = int(listings * COMMODITY_SHARE)
+    feeds = [catalog.snapshot(index, listings - commodities, "auctions"),
+             catalog.snapshot(index, commodities, "commodities")]
+    # Bid-only listings are dropped at ingest
+    feeds = [{name: column[feed["buyout"] > 0] for name, column in feed.items()} for feed in feeds]
+    columns = {name: np.concatenate([feed[name] for feed in feeds]) for name in feeds[0]}
+
+    create_staging_table(cur, snapshot_time)
+    copy_staged_columns(cur, columns, TIME_LEFT_NAMES)
+    finalize_snapshot(cur)
+
+def seed_database(conn, scale):
+    items, days = SCALES[scale]
+    listings = items * LISTINGS_PER_ITEM
+    catalog = SyntheticCatalog(items=items)
+    newest = datetime.now(timezone.utc).replace(tzinfo=None, minute=0, second=0, microsecond=0)
+
+    started = time.perf_counter()
+    cur = conn.cursor()
+    try:
+        cur.execute(f"TRUNCATE {', '.join(ALL_TABLES)} RESTART IDENTITY")
+        seed_items(cur, catalog)
+        seed_daily_history(cur, catalog, days, listings, newest - timedelta(hours=1))
+        conn.commit()
+        print(f"  items and {days} days of history seeded in {time.perf_counter() - started:.1f}s")
+
+        # Two consecutive snapshots so events, sales and the latest archive row exist
+        for offset in (1, 0):
+            ingest_snapshot(cur, catalog, days * 24 - offset, listings, newest - timedelta(hours=offset))
+            conn.commit()
+        conn.autocommit = True
+        for table in ALL_TABLES:
+            cur.execute(f"VACUUM ANALYZE {table}")
+        conn.autocommit = False
+
+        cur.execute("SELECT COUNT(*) FROM auction_history")
+        history_rows = cur.fetchone()[0]
+        cur.execute("SELECT COUNT(*) FROM auctions")
+        auction_rows = cur.fetchone()[0]
+    finally:
+        cur.close()
+    print(f"  seeded {items:,} items, {auction_rows:,} current listings, {history_rows:,} history rows "
+          f"in {time.perf_counter() - started:.1f}s")
+    return {"items": items, "days": days, "auctions": auction_rows, "history_rows": history_rows}
+
+class RequestMix:
+    """Picks request parameters the way users would: popular items more often."""
+
+    def __init__(self, conn, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.lock = threading.Lock()
+        cur = conn.cursor()
+        try:
+            cur.execute("""
+                SELECT a.item_id, i.name, COUNT(*)
+                FROM auctions a JOIN items i ON i.item_id = a.item_id
+                GROUP BY a.item_id, i.name
+            """)
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+        if not rows:
+            raise RuntimeError("No current auctions; seed the database first")
+        self.item_ids = [row[0] for row in rows]
+        self.names = [row[1] for row in rows]
+        weights = np.array([row[2] for row in rows], dtype=np.float64)
+        self.weights = weights / weights.sum()
+
+    def params(self):
+        with self.lock:
+            index = int(self.rng.choice(len(self.item_ids), p=self.weights))
+            length = int(self.rng.integers(3, 7))
+        name = self.names[index]
+        words = [word for word in name.split() if len(word) > 3] or [name]
+        return {"item_id": self.item_ids[index], "prefix": name[:length], "word": words[index % len(words)]}
+
+def run_scenario(base_url, template, mix, concurrency, duration, warmup):
+    """Drives one scenario for `duration` seconds. Returns latencies (s), statuses and bytes."""
+    latencies, statuses, sizes = [], [], []
+    lock = threading.Lock()
+    deadline = None
+
+    def worker(count):
+        session = requests.Session()
+        local_latencies, local_statuses, local_sizes = [], [], []
+        done = 0
+        while True:
+            if count is not None:
+                if done >= count:
+                    break
+            elif time.perf_counter() >= deadline:
+                break
+            url = base_url + template.format(**mix.params())
+            started = time.perf_counter()
+            try:
+                response = session.get(url, timeout=120)
+                status, size = response.status_code, len(response.content)
+            except requests.RequestException:
+                status, size = 0, 0
+            local_latencies.append(time.perf_counter() - started)
+            local_statuses.append(status)
+            local_sizes.append(size)
+            done += 1
+        session.close()
+        if count is None:
+            with lock:
+                latencies.extend(local_latencies)
+                statuses.extend(local_statuses)
+                sizes.extend(local_sizes)
+
+    # Warm connections, caches and query plans; not measured
+    threads = [threading.Thread(target=worker, args=(warmup,)) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    started = time.perf_counter()
+    deadline = started + duration
+    threads = [threading.Thread(target=worker, args=(None,)) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, sizes, time.perf_counter() - started
+
+def summarize(latencies, statuses, sizes, elapsed):
+    ms = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": sum(1 for status in statuses if status != 200),
+        "requests_per_second": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "p50_ms": round(float(np.percentile(ms, 50)), 2) if len(ms) else None,
+        "p95_ms": round(float(np.percentile(ms, 95)), 2) if len(ms) else None,
+        "p99_ms": round(float(np.percentile(ms, 99)), 2) if len(ms) else None,
+        "max_ms": round(float(ms.max()), 2) if len(ms) else None,
+        "mean_kb": round(sum(sizes) / len(sizes) / 1024, 1) if sizes else None,
+    }
+
+def start_server(port, workers):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.api:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=root,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn exited during start-up")
+        try:
+            if requests.get(f"{base_url}/api/health", timeout=1).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("uvicorn did not become healthy in time")
+
+def print_results(results):
+    print(f"\n{'scenario':<18} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'KiB':>8} {'errors':>7}")
+    for name, r in results.items():
+        if not r["requests"]:
+            print(f"{name:<18} {'no requests completed':>30}")
+            continue
+        print(f"{name:<18} {r['requests_per_second']:>9.1f} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} "
+              f"{r['p99_ms']:>9.1f} {r['mean_kb']:>8.1f} {r['errors']:>7}")
+
+def print_comparison(previous, results):
+    print(f"\nCompared with {previous.get('commit', '?')[:10]} ({previous.get('timestamp', '?')}, "
+          f"scale {previous.get('config', {}).get('scale')}):")
+    print(f"{'scenario':<18} {'req/s before':>13} {'after':>9} {'p95 before':>11} {'after':>9}")
+    for name, r in results.items():
+        old = previous.get("results", {}).get(name)
+        if not old or not old.get("requests") or not r["requests"]:
+            continue
+        print(f"{name:<18} {old['requests_per_second']:>13.1f} {r['requests_per_second']:>9.1f} "
+              f"{old['p95_ms']:>11.1f} {r['p95_ms']:>9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the API against a seeded synthetic database")
+    parser.add_argument("--scale", choices=SCALES, default="10k-30d")
+    parser.add_argument("--no-seed", action="store_true", help="Reuse the data already in the database")
+    parser.add_argument("--seed-only", action="store_true", help="Seed and exit")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=10, help="Measured seconds per scenario")
+    parser.add_argument("--warmup", type=int, default=3, help="Unmeasured requests per client before each scenario")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--url", help="Benchmark an already running server instead of starting uvicorn")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/api-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    import psycopg2
+    from backend.config import DB_URI
+
+    conn = psycopg2.connect(DB_URI)
+    try:
+        seeded = None
+        if not args.no_seed:
+            print(f"Seeding scale {args.scale} (replaces all data in the database)")
+            seeded = seed_database(conn, args.scale)
+            if args.seed_only:
+                return
+        mix = RequestMix(conn)
+    finally:
+        conn.close()
+
+    process = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        process, base_url = start_server(args.port, args.workers)
+
+    commit, dirty = git_commit()
+    print(f"API benchmark at {commit[:10] if commit else 'unknown commit'}{' (dirty)' if dirty else ''}: "
+          f"{args.concurrency} clients, {args.duration:g}s per scenario")
+
+    results = {}
+    try:
+        for name in args.scenarios:
+            results[name] = summarize(*run_scenario(base_url, SCENARIOS[name], mix, args.concurrency,
+                                                    args.duration, args.warmup))
+            print(f"  {name}: {results[name]['requests']} requests")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print_results(results)
+
+    report = {
+        "benchmark": "api",
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "url")},
+        "seeded": seeded,
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    output = args.output
+    if not output:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"api-{(commit or 'unknown')[:10]}-{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Startup-time benchmark for each entry point.
+
+Imports every command-line and server module in a fresh interpreter under
+`python -X importtime`, repeated several times, and reports the median import
+time, the wall time including interpreter startup, and which packages the
+time went to. The required settings (DB_URI, BLIZZARD_CLIENT_ID,
+BLIZZARD_SECRET) are removed from the children's environment, so an entry
+point that reads its config at import time shows up as an error.
+
+    python -m benchmarks.bench_imports --repeat 7
+    python -m benchmarks.bench_imports --check        # exit 1 if over budget
+
+Results are saved as JSON tagged with the git commit (default
+benchmarks/results/); --compare OLD.json prints the change against an earlier run.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.bench_ingest import RESULTS_DIR, git_commit
+
+# entry point -> (module, import budget in ms on a developer machine)
+ENTRY_POINTS = {
+    "config": ("backend.config", 5),
+    "cleanup": ("backend.cleanup", 80),
+    "check_realm_name": ("backend.check_realm_name", 200),
+    "find_realm": ("backend.find_realm", 200),
+    "update_item_cache": ("backend.update_item_cache", 250),
+    "fetcher": ("backend.fetcher", 350),
+    "daemon": ("backend.daemon", 450),
+    "api": ("backend.api", 800),
+    "profiling": ("backend.profiling", 80),
+}
+
+# Removed from the children's environment: importing must not need them
+REQUIRED_ENV = ("DB_URI", "BLIZZARD_CLIENT_ID", "BLIZZARD_SECRET")
+
+def child_env():
+    env = {key: value for key, value in os.environ.items() if key not in REQUIRED_ENV}
+    env["PYTHONPATH"] = REPO_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+def parse_importtime(stderr, module):
+    """
+    Returns (cumulative ms for module, {top-level package: self ms}), counting
+    only imports made by module, not those of interpreter startup.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        # "import time: <self us> | <cumulative us> | <indent><module>"
+        self_part, cumulative_us, name = line.split("|")
+        top_level = not name[1:].startswith(" ")
+        entries.append((name.strip(), int(self_part.split(":")[1]), int(cumulative_us), top_level))
+
+    # Children are listed before their parent, so module's subtree is the run of
+    # nested entries directly above its own top-level line
+    end = next((i for i, entry in enumerate(entries) if entry[0] == module and entry[3]), None)
+    if end is None:
+        return None, {}
+    start = end
+    while start > 0 and not entries[start - 1][3]:
+        start -= 1
+    packages = {}
+    for name, self_us, _, _ in entries[start:end + 1]:
+        root = name.split(".")[0]
+        packages[root] = packages.get(root, 0) + self_us / 1000
+    return entries[end][2] / 1000, packages
+
+def measure(module, env):
+    """One cold import of module in a new interpreter: (import ms, wall ms, packages) or raises."""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    wall = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    total, packages = parse_importtime(result.stderr, module)
+    return total, wall, packages
+
+def run_entry_point(module, repeat, env):
+    # One unmeasured run so .pyc files exist and the OS file cache is warm
+    measure(module, env)
+    runs = [measure(module, env) for _ in range(repeat)]
+    packages = {}
+    for _, _, run_packages in runs:
+        for name, ms in run_packages.items():
+            packages.setdefault(name, []).append(ms)
+    top = sorted(((name, statistics.median(values)) for name, values in packages.items()),
+                 key=lambda item: item[1], reverse=True)
+    return {
+        "import_ms": round(statistics.median(run[0] for run in runs), 1),
+        "wall_ms": round(statistics.median(run[1] for run in runs), 1),
+        "top_packages": {name: round(ms, 1) for name, ms in top[:6]},
+    }
+
+def print_results(results, baseline_ms):
+    print(f"\nInterpreter startup (python -c pass): {baseline_ms:.1f} ms")
+    print(f"{'entry point':<18} {'import ms':>10} {'budget':>8} {'wall ms':>9}  heaviest packages (self ms)")
+    for name, r in results.items():
+        if "error" in r:
+            print(f"{name:<18} {'error':>10}  {r['error']}")
+            continue
+        flag = " over" if r["import_ms"] > r["budget_ms"] else ""
+        packages = ", ".join(f"{package} {ms:g}" for package, ms in list(r["top_packages"].items())[:4])
+        print(f"{name:<18} {r['import_ms']:>10.1f} {r['budget_ms']:>8}{flag:<5} {r['wall_ms']:>9.1f}  {packages}")
+
+def print_comparison(previous, results):
+    print(f"\nCompared with {previous.get('commit', '?')[:10]} ({previous.get('timestamp', '?')}):")
+    print(f"{'entry point':<18} {'import before':>14} {'after':>9}")
+    for name, r in results.items():
+        old = previous.get("results", {}).get(name)
+        if not old or "import_ms" not in old or "import_ms" not in r:
+            continue
+        print(f"{name:<18} {old['import_ms']:>14.1f} {r['import_ms']:>9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import time of each entry point")
+    parser.add_argument("--entry-points", nargs="+", choices=ENTRY_POINTS, default=list(ENTRY_POINTS))
+    parser.add_argument("--repeat", type=int, default=5, help="Measured imports per entry point")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 if any entry point is over budget")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/imports-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    env = child_env()
+    commit, dirty = git_commit()
+    print(f"Import benchmark at {commit[:10] if commit else 'unknown commit'}{' (dirty)' if dirty else ''}: "
+          f"{args.repeat} runs per entry point")
+
+    baseline = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], env=env, check=True)
+        baseline.append((time.perf_counter() - started) * 1000)
+    baseline_ms = statistics.median(baseline)
+
+    results = {}
+    for name in args.entry_points:
+        module, budget_ms = ENTRY_POINTS[name]
+        try:
+            results[name] = {"module": module, "budget_ms": budget_ms, **run_entry_point(module, args.repeat, env)}
+        except RuntimeError as e:
+            results[name] = {"module": module, "budget_ms": budget_ms, "error": str(e)}
+
+    print_results(results, baseline_ms)
+
+    report = {
+        "benchmark": "imports",
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {"repeat": args.repeat, "python": sys.version.split()[0]},
+        "interpreter_startup_ms": round(baseline_ms, 1),
+        "results": results,
+    }
+    output = args.output
+    if not output:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"imports-{(commit or 'unknown')[:10]}-{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), results)
+
+    if args.check:
+        failed = [name for name, r in results.items() if "error" in r or r["import_ms"] > r["budget_ms"]]
+        if failed:
+            print(f"\nOver budget or failing: {', '.join(failed)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
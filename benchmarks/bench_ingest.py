@@ -0,0 +1,343 @@
+"""
+End-to-end ingest benchmark.
+
+Replays synthetic snapshots served by backend/mock_blizzard.py against a local
+Postgres and measures each ingest path stage by stage:
+
+    legacy    fetch_auction_data + fetch_commodity_data -> process_*_data
+              -> insert_auctions -> cleanup_daily_data
+    pipeline  run_ingest_pipeline -> cleanup_daily_data
+    parallel  run_ingest_pipeline(parallel_workers) -> cleanup_daily_data
+
+Every snapshot is ingested in a fresh process (like the cron job), so peak RSS
+belongs to that path alone. Per stage it reports wall time, rows/s, WAL bytes
+written and the process's peak RSS so far; per path, the peak RSS of any
+parse worker and the rows inserted, updated and deleted across all tables.
+
+Point DB_URI at a scratch database. --reset truncates the ingest tables before
+each path so all paths start from the same state.
+
+    DB_URI=postgresql://localhost/wow_bench python -m benchmarks.bench_ingest \\
+        --listings 500000 --commodity-listings 200000 --snapshots 3 --reset
+
+Results are saved as JSON tagged with the git commit (default
+benchmarks/results/); --compare OLD.json prints the change against an earlier run.
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.mock_blizzard import start_mock_server
+
+PATHS = ("legacy", "pipeline", "parallel")
+
+# Tables written by an ingest; truncated by --reset
+INGEST_TABLES = ("auctions", "auction_history", "auction_events", "item_sales_estimates", "item_price_stats")
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# Long enough that the mock never advances on its own during a run
+FROZEN_SNAPSHOT_SECONDS = 10 ** 9
+
+# Backends report table statistics shortly after their transactions end
+STATS_SETTLE_SECONDS = 1.0
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss = resource.getrusage(who).ru_maxrss
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / 1024
+
+def wal_position(cur):
+    cur.execute("SELECT pg_current_wal_lsn()")
+    return cur.fetchone()[0]
+
+def wal_bytes_since(cur, start):
+    cur.execute("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), %s)", (start,))
+    return int(cur.fetchone()[0])
+
+def table_writes(cur):
+    """Cumulative (inserted, updated, deleted) rows over all user tables."""
+    cur.execute("SELECT pg_stat_clear_snapshot()")
+    cur.execute("""
+        SELECT COALESCE(SUM(n_tup_ins), 0), COALESCE(SUM(n_tup_upd), 0), COALESCE(SUM(n_tup_del), 0)
+        FROM pg_stat_user_tables
+    """)
+    return tuple(int(v) for v in cur.fetchone())
+
+class StageTimer:
+    """Records wall time, WAL volume and peak RSS of consecutive stages."""
+
+    def __init__(self, monitor):
+        self.monitor = monitor
+        self.stages = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        wal_start = wal_position(self.monitor)
+        started = time.perf_counter()
+        result = {}
+        yield result
+        seconds = time.perf_counter() - started
+        rows = result.get("rows")
+        self.stages[name] = {
+            "seconds": round(seconds, 4),
+            "rows": rows,
+            "rows_per_second": round(rows / seconds) if rows and seconds else None,
+            "wal_bytes": wal_bytes_since(self.monitor, wal_start),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            **{k: v for k, v in result.items() if k != "rows"},
+        }
+
+def ingest_legacy(timer, workers):
+    from backend.cleanup import cleanup_daily_data
+    from backend.fetch_auctions import fetch_auction_data
+    from backend.fetch_commodities import fetch_commodity_data, process_commodity_data
+    from backend.process_data import process_auction_data
+    from backend.to_database import insert_auctions
+
+    with timer.stage("fetch") as stage:
+        auctions = fetch_auction_data()
+        commodities = fetch_commodity_data()
+        stage["rows"] = len(auctions.get("auctions", [])) + len(commodities.get("auctions", []))
+    with timer.stage("process") as stage:
+        rows = process_auction_data(auctions) + process_commodity_data(commodities)
+        del auctions, commodities
+        stage["rows"] = len(rows)
+    with timer.stage("insert") as stage:
+        if not insert_auctions(rows):
+            raise RuntimeError("insert_auctions failed")
+        stage["rows"] = len(rows)
+    with timer.stage("rollup"):
+        if not cleanup_daily_data(create_backup_first=False):
+            raise RuntimeError("cleanup_daily_data failed")
+
+def ingest_pipeline(timer, workers):
+    from backend.cleanup import cleanup_daily_data
+    from backend.pipeline import run_ingest_pipeline
+
+    with timer.stage("ingest") as stage:
+        metrics = run_ingest_pipeline(parallel_workers=workers)
+        stage["rows"] = metrics["rows"]
+        stage["pipeline_stages"] = metrics["stages"]
+    with timer.stage("rollup"):
+        if not cleanup_daily_data(create_backup_first=False):
+            raise RuntimeError("cleanup_daily_data failed")
+
+def run_snapshot(path, workers, verbose, conn):
+    """Child process entry point: ingests the mock's current snapshot and sends back the stage results."""
+    try:
+        import psycopg2
+        from backend.config import DB_URI
+
+        monitor_conn = psycopg2.connect(DB_URI)
+        monitor_conn.autocommit = True
+        monitor = monitor_conn.cursor()
+        timer = StageTimer(monitor)
+        ingest = ingest_legacy if path == "legacy" else ingest_pipeline
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            ingest(timer, workers if path == "parallel" else None)
+        if path == "parallel":
+            # multiprocessing waits for pool workers before this process can exit
+            from backend.parallel_parse import shutdown_process_pool
+            shutdown_process_pool()
+        monitor_conn.close()
+        conn.send({"stages": timer.stages, "peak_rss_mb": round(peak_rss_mb(), 1),
+                   "worker_peak_rss_mb": round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1)})
+    except Exception as e:
+        conn.send({"error": f"{e.__class__.__name__}: {e}"})
+    finally:
+        conn.close()
+
+def run_in_child(path, workers, verbose):
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=run_snapshot, args=(path, workers, verbose, sender))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = {"error": "benchmark process exited without a result"}
+    process.join()
+    if "error" in result:
+        raise RuntimeError(f"{path}: {result['error']}")
+    return result
+
+def reset_tables(cur):
+    cur.execute(f"TRUNCATE {', '.join(INGEST_TABLES)} RESTART IDENTITY")
+
+def summarize(snapshots):
+    """Stage totals over all snapshots of one path."""
+    totals = {}
+    for snapshot in snapshots:
+        for name, stage in snapshot["stages"].items():
+            total = totals.setdefault(name, {"seconds": 0.0, "rows": 0, "wal_bytes": 0, "peak_rss_mb": 0.0})
+            total["seconds"] += stage["seconds"]
+            total["rows"] += stage["rows"] or 0
+            total["wal_bytes"] += stage["wal_bytes"]
+            total["peak_rss_mb"] = max(total["peak_rss_mb"], stage["peak_rss_mb"])
+    for total in totals.values():
+        total["seconds"] = round(total["seconds"], 4)
+        total["rows_per_second"] = round(total["rows"] / total["seconds"]) if total["rows"] and total["seconds"] else None
+    return totals
+
+def run_path(path, mock, base_url, args, monitor):
+    if args.reset:
+        reset_tables(monitor)
+    writes_before = table_writes(monitor)
+    snapshots = []
+    for index in range(args.snapshots):
+        # Snapshot time is frozen (see main), so the offset alone selects the snapshot
+        mock.offset = args.first_snapshot + index
+        # Build the payloads up front so serializing them isn't timed as download
+        for feed in ("auctions", "commodities"):
+            mock.payload(feed, base_url)
+        result = run_in_child(path, args.workers, args.verbose)
+        result["snapshot"] = mock.offset
+        snapshots.append(result)
+        wall = sum(stage["seconds"] for stage in result["stages"].values())
+        print(f"  {path} snapshot {mock.offset}: {wall:.2f}s, peak RSS {result['peak_rss_mb']:.0f} MiB")
+
+    time.sleep(STATS_SETTLE_SECONDS)
+    writes_after = table_writes(monitor)
+    inserted, updated, deleted = (after - before for after, before in zip(writes_after, writes_before))
+    stages = summarize(snapshots)
+    return {
+        "snapshots": snapshots,
+        "stages": stages,
+        "seconds": round(sum(stage["seconds"] for stage in stages.values()), 4),
+        "peak_rss_mb": max(s["peak_rss_mb"] for s in snapshots),
+        "worker_peak_rss_mb": max(s["worker_peak_rss_mb"] for s in snapshots),
+        "rows_inserted": inserted,
+        "rows_updated": updated,
+        "rows_deleted": deleted,
+    }
+
+def git_commit():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+def print_results(results):
+    print(f"\n{'path':<10} {'stage':<10} {'seconds':>9} {'rows/s':>11} {'WAL MiB':>9} {'peak RSS':>9}")
+    for path, result in results.items():
+        for name, stage in result["stages"].items():
+            rate = f"{stage['rows_per_second']:,}" if stage["rows_per_second"] else "-"
+            print(f"{path:<10} {name:<10} {stage['seconds']:>9.2f} {rate:>11} "
+                  f"{stage['wal_bytes'] / (1 << 20):>9.1f} {stage['peak_rss_mb']:>8.0f}M")
+        print(f"{path:<10} {'total':<10} {result['seconds']:>9.2f} {'':>11} "
+              f"{sum(s['wal_bytes'] for s in result['stages'].values()) / (1 << 20):>9.1f} "
+              f"{result['peak_rss_mb']:>8.0f}M   rows ins/upd/del "
+              f"{result['rows_inserted']:,}/{result['rows_updated']:,}/{result['rows_deleted']:,}")
+        if result["worker_peak_rss_mb"]:
+            print(f"{path:<10} {'workers':<10} {'':>9} {'':>11} {'':>9} {result['worker_peak_rss_mb']:>8.0f}M")
+
+# Settings that must match for timings to be comparable
+COMPARABLE_CONFIG = ("items", "listings", "commodity_listings", "snapshots", "first_snapshot", "seed", "workers")
+
+def print_comparison(previous, results, config):
+    print(f"\nCompared with {previous.get('commit', '?')[:10]} ({previous.get('timestamp', '?')}):")
+    differing = [key for key in COMPARABLE_CONFIG if previous.get("config", {}).get(key) != config.get(key)]
+    if differing:
+        print(f"  warning: runs differ in {', '.join(differing)}; timings are not directly comparable")
+    print(f"{'path':<10} {'stage':<10} {'before s':>9} {'after s':>9} {'change':>8}")
+    for path, result in results.items():
+        old = previous.get("results", {}).get(path)
+        if not old:
+            continue
+        rows = [(name, old["stages"].get(name, {}).get("seconds"), stage["seconds"])
+                for name, stage in result["stages"].items()]
+        rows.append(("total", old.get("seconds"), result["seconds"]))
+        for name, before, after in rows:
+            if not before:
+                continue
+            print(f"{path:<10} {name:<10} {before:>9.2f} {after:>9.2f} {(after / before - 1) * 100:>+7.1f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ingest paths against synthetic snapshots")
+    parser.add_argument("--paths", nargs="+", choices=PATHS, default=list(PATHS))
+    parser.add_argument("--items", type=int, default=20000, help="Synthetic catalog size")
+    parser.add_argument("--listings", type=int, default=200000, help="Listings in the realm auctions feed")
+    parser.add_argument("--commodity-listings", type=int, default=100000, help="Listings in the commodities feed")
+    parser.add_argument("--snapshots", type=int, default=3, help="Consecutive snapshots ingested per path")
+    parser.add_argument("--first-snapshot", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Parse processes for the parallel path")
+    parser.add_argument("--reset", action="store_true", help="Truncate the ingest tables before each path")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/ingest-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Show the ingest log")
+    args = parser.parse_args()
+
+    # Snapshots only change when run_path moves the offset
+    server, mock = start_mock_server(items=args.items, listings=args.listings,
+                                     commodity_listings=args.commodity_listings, seed=args.seed,
+                                     snapshot_seconds=FROZEN_SNAPSHOT_SECONDS)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    # Inherited by the spawned benchmark processes
+    os.environ["BLIZZARD_API_BASE_URL"] = base_url
+    os.environ["BLIZZARD_OAUTH_URL"] = f"{base_url}/oauth/token"
+    os.environ.setdefault("BLIZZARD_CLIENT_ID", "benchmark")
+    os.environ.setdefault("BLIZZARD_SECRET", "benchmark")
+
+    import psycopg2
+    from backend.config import DB_URI
+
+    monitor_conn = psycopg2.connect(DB_URI)
+    monitor_conn.autocommit = True
+    monitor = monitor_conn.cursor()
+
+    commit, dirty = git_commit()
+    print(f"Ingest benchmark at {commit[:10] if commit else 'unknown commit'}{' (dirty)' if dirty else ''}: "
+          f"{args.listings:,} + {args.commodity_listings:,} listings x {args.snapshots} snapshots")
+
+    results = {}
+    try:
+        for path in args.paths:
+            results[path] = run_path(path, mock, base_url, args, monitor)
+    finally:
+        monitor_conn.close()
+        server.shutdown()
+
+    print_results(results)
+
+    report = {
+        "benchmark": "ingest",
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "verbose")},
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    output = args.output
+    if not output:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"ingest-{(commit or 'unknown')[:10]}-{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), results, report["config"])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Serialization benchmark for large API responses.
+
+Compares FastAPI's default path (jsonable_encoder + JSONResponse) against the
+orjson row and columnar paths used by backend/api.py, on synthetic rows shaped
+like /api/auctions and /api/auctions/history.
+
+    python -m benchmarks.bench_serialization --rows 50000 --repeat 5
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from backend.api import AUCTION_SUMMARY_COLUMNS, HISTORY_COLUMNS
+from backend.serialization import rows_response
+
+# Rows are built by column name in the order the API serves them, so a column
+# added to the endpoints without a value here fails loudly instead of being skipped
+
+def make_auction_rows(count):
+    rows = []
+    for item_id in range(count):
+        unit = random.randint(1, 10_000_000)
+        values = {
+            "item_id": item_id, "name": f"Item {item_id}",
+            "icon_url": f"https://render.worldofwarcraft.com/eu/icons/56/item_{item_id}.jpg",
+            "lowest_price": unit * 20, "lowest_unit_price": unit, "total_quantity": random.randint(1, 5000),
+            "auction_count": random.randint(1, 200), "min_unit_price": float(unit), "p25_unit_price": unit * 1.1,
+            "median_unit_price": unit * 1.3, "p75_unit_price": unit * 1.6, "outlier_count": random.randint(0, 3),
+            "tier": random.choice([None, 1, 2, 3]), "total_tiers": random.choice([None, 3]),
+        }
+        rows.append(tuple(values[column] for column in AUCTION_SUMMARY_COLUMNS))
+    return rows
+
+def make_history_rows(count):
+    start = datetime(2026, 1, 1)
+    rows = []
+    for i in range(count):
+        quantity, unit = random.randint(1, 200), random.randint(1, 10**7)
+        listings = random.randint(1, 50)
+        values = {
+            "item_id": random.randint(1, 200_000), "name": f"Item {i}", "icon_url": None,
+            "quantity": quantity, "buyout": unit * quantity, "unit_price": unit, "time_left": "LONG",
+            "listing_count": listings, "total_quantity": quantity * listings, "min_buyout": unit * quantity,
+            "max_buyout": unit * quantity * 3, "max_unit_price": unit * 3,
+            "snapshot_time": start + timedelta(minutes=i),
+        }
+        rows.append(tuple(values[column] for column in HISTORY_COLUMNS))
+    return rows
+
+def default_path(rows, columns):
+    # Row-by-row dict building plus FastAPI's encoder, as the endpoints did before
+    content = [dict(zip(columns, row)) for row in rows]
+    return JSONResponse(jsonable_encoder(content)).body
+
+def orjson_rows(rows, columns):
+    return rows_response(rows, columns, "json").body
+
+def orjson_columnar(rows, columns):
+    return rows_response(rows, columns, "columnar").body
+
+def measure(func, rows, columns, repeat):
+    timings = []
+    body = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = func(rows, columns)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), len(body)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API response serialization")
+    parser.add_argument("--rows", type=int, default=50000, help="Rows per response")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case (median is reported)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    random.seed(42)
+    datasets = {
+        "auctions": (make_auction_rows(args.rows), AUCTION_SUMMARY_COLUMNS),
+        "history": (make_history_rows(args.rows), HISTORY_COLUMNS),
+    }
+    cases = {
+        "default": default_path,
+        "orjson": orjson_rows,
+        "orjson_columnar": orjson_columnar,
+    }
+
+    results = []
+    for dataset, (rows, columns) in datasets.items():
+        for case, func in cases.items():
+            seconds, size = measure(func, rows, columns, args.repeat)
+            results.append({"dataset": dataset, "case": case, "rows": args.rows,
+                            "seconds": round(seconds, 4), "bytes": size})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'dataset':<10} {'case':<16} {'ms':>9} {'MB':>7} {'speedup':>8}")
+    baseline = {}
+    for r in results:
+        baseline.setdefault(r["dataset"], r["seconds"])
+        speedup = baseline[r["dataset"]] / r["seconds"] if r["seconds"] else float("inf")
+        print(f"{r['dataset']:<10} {r['case']:<16} {r['seconds'] * 1000:>9.1f} "
+              f"{r['bytes'] / 1e6:>7.2f} {speedup:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -15,40 +15,17 @@ cd "$(dirname "$0")"
 echo "📦 Activating virtual environment..."
 source venv/bin/activate
 
-# Run the fetcher to get new auction data
+# Fetch, ingest and roll up in one process (shares one token, HTTP session and DB pool)
 echo ""
-echo "📥 Fetching new auction data..."
-echo "-------------------------------"
-python -m backend.fetcher
-
-# Check if fetcher was successful
-if [ $? -eq 0 ]; then
-    echo "✅ Auction data fetch completed successfully!"
+echo "📥 Fetching and ingesting new auction data..."
+echo "---------------------------------------------"
+if python -m backend.daemon --once; then
+    echo "✅ Auction data update completed successfully!"
 else
-    echo "❌ Auction data fetch failed!"
+    echo "❌ Auction data update failed!"
     exit 1
 fi
 
-# Run daily cleanup
-echo ""
-echo "🧹 Running daily cleanup..."
-echo "---------------------------"
-python -m backend.cleanup daily
-
-# Check if cleanup was successful
-if [ $? -eq 0 ]; then
-    echo "✅ Daily cleanup completed successfully!"
-else
-    echo "❌ Daily cleanup failed!"
-    exit 1
-fi
-
-# Show final statistics
-echo ""
-echo "📊 Final database statistics:"
-echo "-----------------------------"
-python -m backend.cleanup stats
-
 echo ""
 echo "🎉 Data update completed successfully!"
 echo "======================================"
@@ -4,6 +4,7 @@ const itemId = urlParams.get('id');
 
 let priceChart = null;
 let currentTimeFilter = 8760; // Default to All Time since we have more historical data
+let liveUpdates = null;
 
 // Initialize the page
 document.addEventListener('DOMContentLoaded', function() {
@@ -14,6 +15,7 @@ document.addEventListener('DOMContentLoaded', function() {
     
     loadItemDetails();
     setupTimeFilters();
+    subscribeToUpdates();
 });
 
 async function loadItemDetails() {
@@ -45,11 +47,7 @@ async function loadItemDetails() {
             tierBadge.style.display = 'none';
         }
         
-        // Update stats
-        const priceInGold = item.lowest_price / 10000;
-        document.getElementById('currentPrice').textContent = `${priceInGold.toFixed(2)}g`;
-        document.getElementById('totalQuantity').textContent = item.total_quantity.toLocaleString();
-        document.getElementById('auctionCount').textContent = item.auction_count;
+        updateItemStats(item);
         
         // Load price history and create chart
         await loadPriceHistory(currentTimeFilter);
@@ -64,9 +62,43 @@ async function loadItemDetails() {
     }
 }
 
+function updateItemStats(item) {
+    const priceInGold = item.lowest_unit_price / 10000;
+    document.getElementById('currentPrice').textContent = `${priceInGold.toFixed(2)}g`;
+    document.getElementById('totalQuantity').textContent = item.total_quantity.toLocaleString();
+    document.getElementById('auctionCount').textContent = item.auction_count;
+}
+
+// Live updates: the server pushes this item's new summary after each ingest
+// that changed it, so the stats update without polling and the chart reloads
+// only when there is something new to show
+function subscribeToUpdates() {
+    if (!window.EventSource) {
+        return;
+    }
+    liveUpdates = new EventSource(`/api/events?item_ids=${itemId}`);
+    liveUpdates.addEventListener('snapshot', (event) => {
+        const snapshot = JSON.parse(event.data);
+        const item = snapshot.items.find(i => String(i.item_id) === itemId);
+        if (item) {
+            updateItemStats(item);
+        } else if (snapshot.removed_item_ids.some(id => String(id) === itemId)) {
+            document.getElementById('currentPrice').textContent = '-';
+            document.getElementById('totalQuantity').textContent = '0';
+            document.getElementById('auctionCount').textContent = '0';
+        } else {
+            return;
+        }
+        loadPriceHistory(currentTimeFilter);
+    });
+}
+
 async function loadPriceHistory(hours) {
     try {
-        const response = await fetch(`/api/auctions/trends?item_id=${itemId}&hours=${hours}`);
+        // No point sending more points than the chart has pixels to draw them
+        const chartWidth = document.getElementById('priceChart').clientWidth || 600;
+        const maxPoints = Math.max(3, Math.min(720, Math.floor(chartWidth / 2)));
+        const response = await fetch(`/api/auctions/trends?item_id=${itemId}&hours=${hours}&max_points=${maxPoints}`);
         const data = await response.json();
         
         if (data.error) {
@@ -85,15 +117,15 @@ async function loadPriceHistory(hours) {
 }
 
 function processChartData(data) {
-    // Sort data by time (oldest first)
-    const sortedData = data.sort((a, b) => new Date(a.hour) - new Date(b.hour));
+    // The API returns buckets oldest first
+    const sortedData = data;
     
     const labels = sortedData.map(item => {
         const date = new Date(item.hour);
         return date.toLocaleDateString() + ' ' + date.toLocaleTimeString([], {hour: '2-digit', minute:'2-digit'});
     });
     
-    const prices = sortedData.map(item => (item.min_price / 10000).toFixed(2));
+    const prices = sortedData.map(item => (item.min_unit_price / 10000).toFixed(2));
     const quantities = sortedData.map(item => item.total_quantity);
     const auctionCounts = sortedData.map(item => item.auction_count);
     
@@ -200,8 +232,8 @@ function updatePriceTable(data) {
     const tbody = document.getElementById('priceTableBody');
     tbody.innerHTML = '';
     
-    // Sort data by time (newest first)
-    const sortedData = data.sort((a, b) => new Date(b.hour) - new Date(a.hour));
+    // Newest first (the API returns buckets oldest first)
+    const sortedData = data.slice().reverse();
     
     sortedData.slice(0, 20).forEach((item, index) => {
         const row = document.createElement('tr');
@@ -209,14 +241,14 @@ function updatePriceTable(data) {
         const date = new Date(item.hour);
         const dateStr = date.toLocaleDateString() + ' ' + date.toLocaleTimeString([], {hour: '2-digit', minute:'2-digit'});
         
-        const priceInGold = (item.min_price / 10000).toFixed(2);
+        const priceInGold = (item.min_unit_price / 10000).toFixed(2);
         
         // Calculate price change
         let priceChangeClass = '';
         let priceChangeText = '';
         if (index < sortedData.length - 1) {
-            const currentPrice = item.min_price;
-            const previousPrice = sortedData[index + 1].min_price;
+            const currentPrice = item.min_unit_price;
+            const previousPrice = sortedData[index + 1].min_unit_price;
             const change = currentPrice - previousPrice;
             const changePercent = ((change / previousPrice) * 100).toFixed(1);
             
@@ -7,6 +7,7 @@ const searchDropdown = document.getElementById("searchDropdown");
 let searchTimeout = null;
 let currentDropdownItems = [];
 let selectedIndex = -1;
+let liveUpdates = null;
 
 // Show welcome message on page load
 function showWelcomeMessage() {
@@ -197,6 +198,7 @@ async function fetchAuctions(query = "") {
         } else {
             renderResults(data);
         }
+        subscribeToUpdates(data);
     } catch (error) {
         console.error("Error fetching auctions:", error);
         resultsDiv.innerHTML = `
@@ -211,36 +213,67 @@ async function fetchAuctions(query = "") {
     }
 }
 
+function renderCard(item) {
+    const priceInGold = item.lowest_unit_price / 10000;
+    const priceDisplay = priceInGold.toFixed(2);
+    
+    // Add tier indicator if this is a tiered item
+    const tierIndicator = item.tier ? `<span class="tier-badge tier-${item.tier}">T${item.tier}</span>` : '';
+    
+    return `
+        <div class="card" data-item-id="${item.item_id}" style="cursor: pointer;" onclick="openItemDetails(${item.item_id})">
+            <div class="item-icon-container">
+                <img src="${item.icon_url}" alt="${item.name}">
+                ${tierIndicator}
+            </div>
+            <div class="info">
+                <h2>${item.name}</h2>
+                <p>Price: ${priceDisplay}g</p>
+                <p>Quantity: ${item.total_quantity}</p>
+                <p>Auctions: ${item.auction_count}</p>
+            </div>
+        </div>
+    `;
+}
+
 function renderResults(auctions) {
     resultsDiv.innerHTML = `
         <div class="results-container">
-            ${auctions.map(item => {
-                const priceInGold = item.lowest_price / 10000;
-                const priceDisplay = priceInGold.toFixed(2);
-                
-                                       // Add tier indicator if this is a tiered item
-                       const tierIndicator = item.tier ? `<span class="tier-badge tier-${item.tier}">T${item.tier}</span>` : '';
-                       
-                       return `
-                           <div class="card" data-item-id="${item.item_id}" style="cursor: pointer;" onclick="openItemDetails(${item.item_id})">
-                               <div class="item-icon-container">
-                                   <img src="${item.icon_url}" alt="${item.name}">
-                                   ${tierIndicator}
-                               </div>
-                               <div class="info">
-                                   <h2>${item.name}</h2>
-                                   <p>Price: ${priceDisplay}g</p>
-                                   <p>Quantity: ${item.total_quantity}</p>
-                                   <p>Auctions: ${item.auction_count}</p>
-                               </div>
-                           </div>
-                       `;
-            }).join('')}
+            ${auctions.map(renderCard).join('')}
         </div>
     `;
 }
 
+// Live updates: after each ingest the server pushes the changed items among
+// those on screen, and their cards are replaced in place (no re-fetch)
+function subscribeToUpdates(auctions) {
+    if (liveUpdates) {
+        liveUpdates.close();
+        liveUpdates = null;
+    }
+    if (!window.EventSource || auctions.length === 0) {
+        return;
+    }
+    const ids = auctions.slice(0, 1000).map(item => item.item_id).join(',');
+    liveUpdates = new EventSource(`/api/events?item_ids=${ids}`);
+    liveUpdates.addEventListener('snapshot', (event) => applySnapshot(JSON.parse(event.data)));
+}
 
+function applySnapshot(snapshot) {
+    snapshot.items.forEach(item => {
+        const card = resultsDiv.querySelector(`.card[data-item-id="${item.item_id}"]`);
+        if (card) {
+            card.outerHTML = renderCard(item);
+        }
+    });
+    // Items whose last listing is gone
+    snapshot.removed_item_ids.forEach(itemId => {
+        const card = resultsDiv.querySelector(`.card[data-item-id="${itemId}"]`);
+        if (card) {
+            card.remove();
+        }
+    });
+}
 
 function openItemDetails(itemId) {
     console.log('Opening item details for ID:', itemId);